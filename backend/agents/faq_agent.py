@@ -1,62 +1,80 @@
 import json
 import os
-import requests
+import time
 from pathlib import Path
 from typing import List, Dict, Any
 
 from backend.core.llm import get_faq_llm
-from backend.core.vectorstore import get_chroma_client
-from backend.config.settings import CHROMA_DB_PATH
+from backend.core.catalog import KBCatalog
+from backend.core.kb_export import fetch_chunks
+from backend.core.completion_cache import with_completion_cache
+from backend.core.concurrency import bounded_map
+from backend.core.context import ContextAssembler, context_budget
+from backend.core.embeddings import get_embedding_service
+from backend.core.rerank import get_reranker
+from backend.core.stackoverflow import get_stackoverflow_cache
+from backend.core.telemetry import get_logger, span
+from backend.core.vectorstore import get_chroma_client, open_collection
+from backend.config.settings import (
+    CHROMA_DB_PATH,
+    COLLECTION_NAME,
+    FAQ_TOPIC_WORKERS,
+    FAQ_ANSWER_WORKERS,
+    RERANK_ENABLED,
+)
+
+logger = get_logger(__name__)
 
 
 class FAQAgent:
-    def __init__(self):
+    def __init__(self, collection=None, llm=None, embedder=None, assembler=None, reranker=None, catalog=None,
+                 stackoverflow=None):
         self.persist_path = CHROMA_DB_PATH
-        self.client = get_chroma_client(self.persist_path)
-        self.collection = self.client.get_collection("fastapi_docs")
-        self.llm = get_faq_llm()
+        # Same embedding model as ingestion; batched retrieval embeds all queries in one call
+        self.embedder = embedder or get_embedding_service()
+        if collection is None:
+            self.client = get_chroma_client(self.persist_path)
+            collection = open_collection(self.client, COLLECTION_NAME, self.embedder)
+        self.collection = collection
+        # Ingest-maintained source statistics, so inspection never scans the collection
+        self.catalog = catalog or KBCatalog()
+        self.llm = llm or with_completion_cache(get_faq_llm())
+        # Packs retrieved chunks into the model's context token budget
+        self.assembler = assembler or ContextAssembler(max_tokens=context_budget(self.llm))
+        # Optional cross-encoder pass over an over-fetched candidate list
+        if reranker is None and RERANK_ENABLED:
+            reranker = get_reranker()
+        self.reranker = reranker
+        # Cached StackOverflow search results (TTL, stale-while-revalidate, quota aware)
+        self.stackoverflow = stackoverflow or get_stackoverflow_cache()
 
         self.data_dir = Path(__file__).parent.parent / "data"
         self.data_dir.mkdir(exist_ok=True)
         self.faqs_path = self.data_dir / "faqs.json"
 
-        print(f"📁 FAQ output path: {self.faqs_path}")
-        print(f"📚 Knowledge Base: Using ChromaDB collection 'fastapi_docs'")
-
-    def inspect_knowledge_base(self):
-        """Inspect what topics are actually in the knowledge base"""
-        docs = self.collection.get(include=["documents", "metadatas"])
-        
-        print("\n" + "=" * 70)
-        print("📚 KNOWLEDGE BASE INSPECTION")
-        print("=" * 70)
-        print(f"   Total documents: {len(docs['documents'])}")
-        
-        # Collect all unique sources
-        sources = set()
-        for meta in docs["metadatas"]:
-            source = meta.get("source", "Unknown")
-            sources.add(source)
-        
-        print(f"   Unique sources: {len(sources)}")
-        print("\n   Available sources:")
-        for i, source in enumerate(sorted(sources), 1):
-            print(f"      {i}. {source}")
-        
-        # Show sample content from first few documents
-        print(f"\n   Sample document previews:")
-        for i, (doc, meta) in enumerate(zip(docs["documents"][:3], docs["metadatas"][:3]), 1):
-            source = meta.get("source", "Unknown")
-            preview = doc[:200].replace('\n', ' ')
-            print(f"      {i}. [{source}] {preview}...")
-        
-        print("=" * 70 + "\n")
-        
+        logger.debug("📁 FAQ output path: %s", self.faqs_path)
+
+    def inspect_knowledge_base(self, num_samples: int = 5):
+        """
+        Inspect what topics are actually in the knowledge base: chunk and
+        source counts plus a preview of the first few sources, all from the
+        catalog.
+        """
+        rows = self.catalog.list_sources()
+        totals = self.catalog.summary()
+        total = totals["chunks"]
+
+        logger.info("📚 Knowledge base: %d documents from %d sources", total, len(rows))
+        logger.debug("📚 Sources: %s", ", ".join(row["source"] for row in rows))
+
         return {
-            "total_documents": len(docs['documents']),
-            "sources": sorted(sources),
-            "documents": docs["documents"],
-            "metadatas": docs["metadatas"]
+            "total_documents": total,
+            "total_bytes": totals["bytes"],
+            "sources": [row["source"] for row in rows],
+            "samples": [
+                {"source": row["source"], "preview": row["preview"] or ""}
+                for row in rows[:num_samples]
+            ],
         }
 
     def extract_topics(self, custom_topics=None):
@@ -64,16 +82,17 @@ class FAQAgent:
         Step 1: Extract 3 topics from documentation or use custom topics
         """
         if custom_topics and len(custom_topics) == 3:
-            print(f"✅ Using custom topics: {custom_topics}")
+            logger.info("✅ Using custom topics: %s", custom_topics)
             return custom_topics
 
-        print("🔍 Extracting topics from knowledge base...")
-
-        # Get sample documents from knowledge base
-        docs = self.collection.get(include=["documents", "metadatas"])
+        logger.info("🔍 Extracting topics from knowledge base...")
 
-        # Use first 10 docs for topic extraction
-        context = "\n\n".join(docs["documents"][:10])
+        # First chunks of up to 10 sources, looked up by id via the catalog,
+        # deduplicated and packed into the budget
+        first_ids = [row["first_chunk_id"] for row in self.catalog.list_sources(limit=10) if row["first_chunk_id"]]
+        docs = fetch_chunks(self.collection, first_ids, ["documents", "metadatas"])
+        passages = [{"document": d, "metadata": m} for d, m in zip(docs["documents"], docs["metadatas"])]
+        context = "\n\n".join(p["text"] for p in self.assembler.assemble(passages))
 
         prompt = f"""Analyze the following FastAPI documentation from our knowledge base and identify the 3 most important topics that developers commonly ask questions about.
 
@@ -90,7 +109,7 @@ Examples of good topics:
 - "Dependency Injection"
 
 Documentation from Knowledge Base:
-{context[:3000]}
+{context}
 
 JSON array of 3 topics:"""
 
@@ -98,84 +117,137 @@ JSON array of 3 topics:"""
 
         try:
             # Extract JSON array from response
-            topics = json.loads(response.strip())
+            with span("json_parse"):
+                topics = json.loads(response.strip())
             if len(topics) >= 3:
                 topics = topics[:3]
-                print(f"✅ Extracted topics from knowledge base: {topics}")
+                logger.info("✅ Extracted topics from knowledge base: %s", topics)
                 return topics
         except Exception as e:
-            print(f"⚠️  Topic extraction failed: {e}, using defaults")
+            logger.warning("⚠️  Topic extraction failed: %s, using defaults", e)
 
         # Fallback topics
         return ["Authentication", "Request Validation", "Database Integration"]
 
-    def fetch_stackoverflow_questions(self, topic: str, num_questions: int = 5) -> List[Dict[str, Any]]:
+    def fetch_stackoverflow_questions_many(self, topics: List[str], num_questions: int = 5) -> Dict[str, List[Dict[str, Any]]]:
         """
-        Fetch top questions from StackOverflow API for a given topic
+        Top StackOverflow questions for each topic, from the local cache
+        (one batched lookup; only missing or expired entries hit the API)
         """
-        print(f"   🌐 Fetching StackOverflow questions for: {topic}")
+        logger.debug("🌐 Looking up StackOverflow questions for: %s", ", ".join(topics))
+        results = self.stackoverflow.search_many([f"FastAPI {topic}" for topic in topics], pagesize=num_questions)
 
-        url = "https://api.stackexchange.com/2.3/search/advanced"
-
-        params = {
-            "order": "desc",
-            "sort": "votes",  # Most upvoted
-            "q": f"FastAPI {topic}",
-            "site": "stackoverflow",
-            "pagesize": num_questions,
-            "filter": "!9_bDDxJY5"  # Includes question body
-        }
-
-        try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-
-            questions = []
-            for item in data.get("items", []):
-                questions.append({
+        questions = {}
+        for topic in topics:
+            questions[topic] = [
+                {
                     "title": item.get("title", ""),
                     "score": item.get("score", 0),
                     "view_count": item.get("view_count", 0),
                     "link": item.get("link", "")
-                })
-
-            print(f"   ✅ Found {len(questions)} StackOverflow questions")
-            return questions
+                }
+                for item in results[f"FastAPI {topic}"]
+            ]
+            logger.debug("✅ Found %d StackOverflow questions for %s", len(questions[topic]), topic)
+        return questions
 
-        except Exception as e:
-            print(f"   ⚠️  StackOverflow API error: {e}")
-            return []
+    def fetch_stackoverflow_questions(self, topic: str, num_questions: int = 5) -> List[Dict[str, Any]]:
+        """
+        Fetch top questions from StackOverflow for a given topic
+        """
+        return self.fetch_stackoverflow_questions_many([topic], num_questions)[topic]
 
     def retrieve_relevant_docs(self, query: str, n_results: int = 5) -> Dict[str, Any]:
         """
         Retrieve relevant documents from knowledge base for a given query
         """
-        print(f"   📚 Retrieving documents from knowledge base for: {query[:60]}...")
+        results = self.retrieve_relevant_docs_many([query], n_results=n_results)[0]
 
-        # Query the vector store for relevant documents
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=n_results,
-            include=["documents", "metadatas", "distances"]
-        )
-
-        print(f"   ✅ Retrieved {len(results['documents'][0])} relevant documents")
+        logger.debug("📚 Retrieved %d documents for: %s", len(results["documents"][0]), query[:60])
         return results
 
-    def answer_question_from_kb(self, question: str, topic: str, strict_mode: bool = True) -> Dict[str, Any]:
+    def retrieve_relevant_docs_many(self, queries: List[str], n_results: int = 5) -> List[Dict[str, Any]]:
+        """
+        Retrieve documents for several queries with a single Chroma query.
+        Each element has the same shape as a single-query result; with a
+        reranker it also has "rerank_scores" and is ordered by them.
+        """
+        if not queries:
+            return []
+
+        query_embeddings = self.embedder.embed_query(list(queries))
+        n_fetch = max(n_results, self.reranker.max_candidates) if self.reranker is not None else n_results
+
+        # Query the vector store for relevant documents
+        with span("vector_query"):
+            results = self.collection.query(
+                query_embeddings=[list(map(float, e)) for e in query_embeddings],
+                n_results=n_fetch,
+                include=["documents", "metadatas", "distances"]
+            )
+
+        if self.reranker is None:
+            return [
+                {"documents": [documents], "metadatas": [metadatas], "distances": [distances]}
+                for documents, metadatas, distances in zip(
+                    results["documents"], results["metadatas"], results["distances"]
+                )
+            ]
+
+        hits = [
+            [
+                {"id": i, "document": d, "metadata": m, "distance": dist}
+                for i, d, m, dist in zip(ids, documents, metadatas, distances)
+            ]
+            for ids, documents, metadatas, distances in zip(
+                results["ids"], results["documents"], results["metadatas"], results["distances"]
+            )
+        ]
+        return [
+            {
+                "documents": [[h["document"] for h in ranked]],
+                "metadatas": [[h["metadata"] for h in ranked]],
+                "distances": [[h["distance"] for h in ranked]],
+                "rerank_scores": [[h["rerank_score"] for h in ranked]],
+            }
+            for ranked in self.reranker.rerank_many(list(queries), hits, top_n=n_results)
+        ]
+
+    def _build_context(self, query: str, documents: List[str], metadatas: List[dict]) -> tuple:
         """
-        Answer a StackOverflow question using ONLY the knowledge base content with citations
+        "[Document N] (Source: ...)" context packed into the token budget:
+        near-duplicates dropped, adjacent chunks merged, off-topic sentences
+        pruned. Returns (context, sources used).
+        """
+        with span("prompt_build"):
+            passages = self.assembler.assemble(
+                [{"document": d, "metadata": m} for d, m in zip(documents, metadatas)],
+                query=query,
+            )
+            context_parts = [
+                f"[Document {i+1}] (Source: {p['metadata'].get('source', 'Unknown')})\n{p['text']}\n"
+                for i, p in enumerate(passages)
+            ]
+        sources = [p["metadata"].get("source", "Unknown") for p in passages]
+        return "\n---\n".join(context_parts), sources
+
+    def answer_question_from_kb(self, question: str, topic: str, strict_mode: bool = True,
+                                kb_results: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Answer a StackOverflow question using ONLY the knowledge base content with citations.
+        Pass `kb_results` when retrieval was already done in a batch.
         """
         mode_label = "STRICT" if strict_mode else "FLEXIBLE"
-        print(f"      🔍 Answering from KB ({mode_label}): {question[:60]}...")
+        logger.debug("🔍 Answering from KB (%s): %s", mode_label, question[:60])
 
         # Retrieve relevant documents for this specific question
-        kb_results = self.retrieve_relevant_docs(f"FastAPI {topic} {question}", n_results=3)
+        if kb_results is None:
+            kb_results = self.retrieve_relevant_docs(f"FastAPI {topic} {question}", n_results=3)
 
         documents = kb_results["documents"][0]
         metadatas = kb_results["metadatas"][0]
         distances = kb_results["distances"][0]
+        rerank_scores = kb_results.get("rerank_scores", [[]])[0]
 
         if not documents:
             return {
@@ -187,15 +259,7 @@ JSON array of 3 topics:"""
             }
 
         # Build context with document sources
-        context_parts = []
-        source_mapping = {}  # Map document numbers to actual source URLs
-
-        for i, (doc, meta) in enumerate(zip(documents, metadatas)):
-            source = meta.get('source', 'Unknown')
-            source_mapping[i+1] = source  # Store mapping for later replacement
-            context_parts.append(f"[Document {i+1}] (Source: {source})\n{doc[:800]}\n")
-
-        context = "\n---\n".join(context_parts)
+        context, used_sources = self._build_context(question, documents, metadatas)
 
         if strict_mode:
             # STRICT MODE: Only answer if information is clearly in the knowledge base
@@ -240,10 +304,10 @@ Answer (helpful and complete):"""
             # Clean up the answer
             answer = answer.replace('Answer:', '').strip()
 
-            # Extract actual source URLs from metadata
-            sources = [meta.get('source', 'Unknown') for meta in metadatas]
+            # Sources of the passages that actually went into the prompt
+            sources = used_sources
 
-            print(f"      ✅ Answer generated with {len(sources)} sources")
+            logger.debug("✅ Answer generated with %d sources", len(sources))
 
             return {
                 "question": question,
@@ -251,11 +315,12 @@ Answer (helpful and complete):"""
                 "sources": sources,
                 "topic": topic,
                 "retrieval_distance": distances[0] if distances else None,
+                "rerank_score": rerank_scores[0] if rerank_scores else None,
                 "stackoverflow_origin": True
             }
 
         except Exception as e:
-            print(f"      ❌ Failed to generate answer: {e}")
+            logger.error("❌ Failed to generate answer: %s", e)
             return {
                 "question": question,
                 "answer": "Error generating answer from knowledge base",
@@ -269,7 +334,7 @@ Answer (helpful and complete):"""
         Generate FAQ questions and answers using ONLY the knowledge base content
         """
         mode_label = "STRICT" if strict_mode else "FLEXIBLE"
-        print(f"   🤖 Generating FAQs from knowledge base for: {topic} ({mode_label})")
+        logger.debug("🤖 Generating FAQs from knowledge base for: %s (%s)", topic, mode_label)
 
         # Prepare context from retrieved documents
         documents = kb_results["documents"][0]
@@ -277,12 +342,7 @@ Answer (helpful and complete):"""
         distances = kb_results["distances"][0]
 
         # Build context with document sources
-        context_parts = []
-        for i, (doc, meta) in enumerate(zip(documents, metadatas)):
-            source = meta.get('source', 'Unknown')
-            context_parts.append(f"[Document {i+1}] (Source: {source})\n{doc}\n")
-
-        context = "\n---\n".join(context_parts)
+        context, _ = self._build_context(topic, documents, metadatas)
 
         if strict_mode:
             # STRICT MODE: Only generate questions that can be answered from the KB
@@ -298,7 +358,7 @@ CRITICAL RULES:
 7. Focus on practical, useful questions that developers would ask
 
 Knowledge Base Documents:
-{context[:4000]}
+{context}
 
 Generate {num_faqs} FAQs in the following JSON format:
 [
@@ -323,7 +383,7 @@ GUIDELINES:
 6. Focus on real-world use cases and best practices
 
 Knowledge Base Documents:
-{context[:4000]}
+{context}
 
 Generate {num_faqs} FAQs in the following JSON format:
 [
@@ -346,7 +406,8 @@ JSON output:"""
             elif "```" in response:
                 response = response.split("```")[1].split("```")[0].strip()
 
-            faqs = json.loads(response)
+            with span("json_parse"):
+                faqs = json.loads(response)
 
             # Add metadata to each FAQ
             for faq in faqs:
@@ -356,12 +417,11 @@ JSON output:"""
                 faq["topic"] = topic
                 faq["retrieval_distance"] = distances[0] if distances else None
 
-            print(f"   ✅ Generated {len(faqs)} FAQs with citations")
+            logger.debug("✅ Generated %d FAQs with citations", len(faqs))
             return faqs
 
         except json.JSONDecodeError as e:
-            print(f"   ⚠️  Failed to parse JSON response: {e}")
-            print(f"   📄 Raw response: {response[:200]}...")
+            logger.warning("⚠️  Failed to parse JSON response: %s (raw: %s...)", e, response[:200])
 
             # Fallback: create simple FAQs with metadata
             return [{
@@ -372,27 +432,108 @@ JSON output:"""
                 "retrieval_distance": distances[0] if distances else None
             }]
         except Exception as e:
-            print(f"   ❌ FAQ generation failed: {e}")
+            logger.error("❌ FAQ generation failed: %s", e)
             return []
 
-    def run(self, custom_topics=None, strict_mode=True):
+    def _process_topic(self, topic: str, so_questions: List[Dict[str, Any]], strict_mode: bool, answer_workers: int):
+        """
+        Answer one topic's StackOverflow questions from the KB.
+        Returns (topic_entry, timings).
+        """
+        logger.info("📌 Topic: %s", topic)
+        timings = {}
+        topic_start = time.perf_counter()
+
+        if not so_questions:
+            logger.info("⚠️  No StackOverflow questions found for %s, generating from KB directly", topic)
+            # Fallback: Generate FAQs directly from knowledge base
+            stage_start = time.perf_counter()
+            kb_results = self.retrieve_relevant_docs(f"FastAPI {topic}", n_results=5)
+            if kb_results["documents"][0]:
+                faqs = self.generate_faqs_from_kb(topic, kb_results, num_faqs=3, strict_mode=strict_mode)
+            else:
+                faqs = []
+            timings["kb_generation"] = round(time.perf_counter() - stage_start, 3)
+            timings["total"] = round(time.perf_counter() - topic_start, 3)
+
+            return {
+                "topic": topic,
+                "faqs": faqs,
+                "question_source": "Generated from KB"
+            }, timings
+
+        # Answer top 3 StackOverflow questions using knowledge base, in parallel
+        top_questions = so_questions[:3]
+        logger.debug("💡 Answering top %d questions from knowledge base...", len(top_questions))
+
+        # One batched retrieval for all questions of this topic
+        stage_start = time.perf_counter()
+        kb_batch = self.retrieve_relevant_docs_many(
+            [f"FastAPI {topic} {q['title']}" for q in top_questions], n_results=3
+        )
+        timings["kb_retrieval"] = round(time.perf_counter() - stage_start, 3)
+
+        stage_start = time.perf_counter()
+        answers = bounded_map(
+            lambda pair: self.answer_question_from_kb(
+                pair[0]["title"], topic, strict_mode=strict_mode, kb_results=pair[1]
+            ),
+            list(zip(top_questions, kb_batch)),
+            max_workers=answer_workers,
+        )
+        timings["answers"] = round(time.perf_counter() - stage_start, 3)
+
+        faqs = []
+        for so_question, faq in zip(top_questions, answers):
+            if faq:
+                # Add StackOverflow metadata
+                faq["stackoverflow_score"] = so_question["score"]
+                faq["stackoverflow_views"] = so_question["view_count"]
+                faq["stackoverflow_link"] = so_question.get("link", "")
+                faqs.append(faq)
+
+        timings["total"] = round(time.perf_counter() - topic_start, 3)
+        logger.info("✅ Topic '%s' completed: %d FAQs generated", topic, len(faqs))
+
+        return {
+            "topic": topic,
+            "faqs": faqs,
+            "question_source": "StackOverflow",
+            "stackoverflow_questions_found": len(so_questions)
+        }, timings
+
+    def run(self, custom_topics=None, strict_mode=True,
+            topic_workers: int = FAQ_TOPIC_WORKERS, answer_workers: int = FAQ_ANSWER_WORKERS):
         """
         Main pipeline:
         1. Inspect knowledge base
         2. Extract topics from KB
-        3. Fetch real questions from StackOverflow
+        3. Fetch real questions from StackOverflow (through the local cache)
         4. Answer questions using KB content with citations
+
+        Steps 1 and 2 run side by side. Questions for all topics come from
+        one cache lookup, so a warm cache means no network calls. Topics and
+        per-topic answers then run concurrently, so latency tracks the
+        slowest topic rather than the sum of all calls.
         """
         mode_label = "STRICT MODE" if strict_mode else "FLEXIBLE MODE"
-        print(f"❓ FAQAgent: Generating FAQs ({mode_label})...")
-        print("=" * 70)
+        logger.info("❓ FAQAgent: Generating FAQs (%s)...", mode_label)
 
-        # Step 0: Inspect knowledge base
-        kb_info = self.inspect_knowledge_base()
+        run_start = time.perf_counter()
+        timings = {}
 
-        # Step 1: Extract or use custom topics
-        topics = self.extract_topics(custom_topics)
-        topics = self.extract_topics(custom_topics)
+        def timed(name, fn):
+            stage_start = time.perf_counter()
+            result = fn()
+            timings[name] = round(time.perf_counter() - stage_start, 3)
+            return result
+
+        # Step 0 + 1: Inspect knowledge base while extracting (or using custom) topics
+        steps = {
+            "inspect_knowledge_base": self.inspect_knowledge_base,
+            "extract_topics": lambda: self.extract_topics(custom_topics),
+        }
+        kb_info, topics = bounded_map(lambda name: timed(name, steps[name]), list(steps), max_workers=2)
 
         faq_output = {
             "topics": [],
@@ -404,64 +545,39 @@ JSON output:"""
             }
         }
 
-        # Step 2-3: For each topic, fetch SO questions and answer from KB
-        for i, topic in enumerate(topics, 1):
-            print(f"\n📌 Topic {i}/{len(topics)}: {topic}")
-
-            # Fetch StackOverflow questions
-            so_questions = self.fetch_stackoverflow_questions(topic, num_questions=5)
-
-            if not so_questions:
-                print(f"   ⚠️  No StackOverflow questions found, generating from KB directly")
-                # Fallback: Generate FAQs directly from knowledge base
-                kb_results = self.retrieve_relevant_docs(f"FastAPI {topic}", n_results=5)
-                if kb_results["documents"][0]:
-                    faqs = self.generate_faqs_from_kb(topic, kb_results, num_faqs=3, strict_mode=strict_mode)
-                else:
-                    faqs = []
-
-                faq_output["topics"].append({
-                    "topic": topic,
-                    "faqs": faqs,
-                    "question_source": "Generated from KB"
-                })
-                continue
-
-            # Answer top 3 StackOverflow questions using knowledge base
-            print(f"   💡 Answering top {min(3, len(so_questions))} questions from knowledge base...")
-            faqs = []
-
-            for so_question in so_questions[:3]:
-                faq = self.answer_question_from_kb(so_question["title"], topic, strict_mode=strict_mode)
-                if faq:
-                    # Add StackOverflow metadata
-                    faq["stackoverflow_score"] = so_question["score"]
-                    faq["stackoverflow_views"] = so_question["view_count"]
-                    faq["stackoverflow_link"] = so_question.get("link", "")
-                    faqs.append(faq)
-
-            faq_output["topics"].append({
-                "topic": topic,
-                "faqs": faqs,
-                "question_source": "StackOverflow",
-                "stackoverflow_questions_found": len(so_questions)
-            })
+        # Step 2: StackOverflow questions for all topics in one cached lookup
+        so_questions = timed("stackoverflow_fetch", lambda: self.fetch_stackoverflow_questions_many(topics, num_questions=5))
 
-            print(f"   ✅ Topic '{topic}' completed: {len(faqs)} FAQs generated")
+        # Step 3: For each topic, answer SO questions from KB
+        stage_start = time.perf_counter()
+        topic_results = bounded_map(
+            lambda topic: self._process_topic(topic, so_questions[topic], strict_mode, answer_workers),
+            topics,
+            max_workers=topic_workers,
+        )
+        timings["topics_total"] = round(time.perf_counter() - stage_start, 3)
+
+        timings["topics"] = {}
+        for topic, (topic_entry, topic_timings) in zip(topics, topic_results):
+            faq_output["topics"].append(topic_entry)
+            timings["topics"][topic] = topic_timings
 
         # Calculate total FAQs
         total_faqs = sum(len(t.get("faqs", [])) for t in faq_output["topics"])
         faq_output["metadata"]["total_faqs"] = total_faqs
 
+        timings["total"] = round(time.perf_counter() - run_start, 3)
+        faq_output["metadata"]["timings_seconds"] = timings
+        faq_output["metadata"]["parallelism"] = {
+            "topic_workers": topic_workers,
+            "answer_workers": answer_workers
+        }
+
         # Save to file
-        with open(self.faqs_path, "w", encoding="utf-8") as f:
+        with span("file_write"), open(self.faqs_path, "w", encoding="utf-8") as f:
             json.dump(faq_output, f, indent=2, ensure_ascii=False)
 
-        print("\n" + "=" * 70)
-        print(f"✅ FAQ generation complete!")
-        print(f"📊 Total: {len(faq_output['topics'])} topics, {total_faqs} FAQs")
-        print(f"❓ Questions from: StackOverflow")
-        print(f"📚 Answers from: Knowledge Base (with citations)")
-        print(f"💾 Saved to: {self.faqs_path}")
+        logger.info("✅ FAQ generation complete: %d topics, %d FAQs, saved to %s",
+                    len(faq_output["topics"]), total_faqs, self.faqs_path)
 
         return faq_output
@@ -1,90 +1,287 @@
-import requests
+import re
+from itertools import chain
+
 from bs4 import BeautifulSoup
-from sentence_transformers import SentenceTransformer
 from tqdm import tqdm
 import os
 
 from backend.config.settings import FASTAPI_DOC_URLS
-from backend.core.vectorstore import get_chroma_client
-from backend.config.settings import CHROMA_DB_PATH
+from backend.core.catalog import KBCatalog, content_hash
+from backend.core.chunking import make_chunker
+from backend.core.embeddings import get_embedding_service
+from backend.core.fetcher import PageFetcher
+from backend.core.ingest_pipeline import IngestionPipeline
+from backend.core.pdf_extract import iter_pdf_pages
+from backend.core.sparse_index import get_sparse_index
+from backend.core.telemetry import get_logger
+from backend.core.vectorstore import get_chroma_client, open_collection
+from backend.config.settings import CHROMA_DB_PATH, COLLECTION_NAME, SPARSE_INDEX_ENABLED
+
+logger = get_logger(__name__)
 
 class IngestionAgent:
-    def __init__(self):
-        self.embedder = SentenceTransformer("all-MiniLM-L6-v2")
+    def __init__(self, embedder=None, collection=None, catalog=None, fetcher=None, chunker=None, sparse_index=None):
+        self.embedder = embedder or get_embedding_service()
+        self.chunker = chunker or make_chunker(self.embedder)
         self.persist_path = CHROMA_DB_PATH
 
-        os.makedirs(self.persist_path, exist_ok=True)
+        if collection is None:
+            os.makedirs(self.persist_path, exist_ok=True)
+            self.client = get_chroma_client(self.persist_path)
+            collection = open_collection(self.client, COLLECTION_NAME, self.embedder, create=True)
+        self.collection = collection
 
-        self.client = get_chroma_client(self.persist_path)
-        self.collection = self.client.get_or_create_collection(
-            name="fastapi_docs"
-        )
+        # Per-source / per-chunk content hashes for incremental re-ingestion
+        self.catalog = catalog or KBCatalog()
+        self.fetcher = fetcher or PageFetcher()
+        # BM25 index kept in step with every Chroma write
+        if sparse_index is None and SPARSE_INDEX_ENABLED:
+            sparse_index = get_sparse_index()
+        self.sparse_index = sparse_index
 
-    def scrape_page(self, url: str) -> str:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
+        # Callbacks run after every write, e.g. to invalidate answer caches
+        self.on_change = []
 
-        soup = BeautifulSoup(response.text, "html.parser")
+    def _notify_change(self):
+        for callback in self.on_change:
+            callback()
+
+    @staticmethod
+    def parse_html(html: str) -> str:
+        """
+        Extract page text, keeping the structure the chunker relies on:
+        headings become "# ..." lines, <pre> blocks become ``` fences and
+        block elements are separated by blank lines.
+        """
+        soup = BeautifulSoup(html, "html.parser")
 
         # Remove nav, footer, sidebar
         for tag in soup(["nav", "footer", "aside", "script", "style"]):
             tag.decompose()
 
-        return soup.get_text(separator=" ", strip=True)
+        for pre in soup.find_all("pre"):
+            pre.replace_with(f"\n\n```\n{pre.get_text().strip()}\n```\n\n")
+        for heading in soup.find_all(["h1", "h2", "h3", "h4", "h5", "h6"]):
+            level = int(heading.name[1])
+            heading.replace_with(f"\n\n{'#' * level} {heading.get_text(' ', strip=True)}\n\n")
+        for br in soup.find_all("br"):
+            br.replace_with("\n")
+        for block in soup.find_all(["p", "li", "tr", "div", "section", "article", "blockquote", "table", "dt", "dd"]):
+            block.insert_before("\n\n")
+            block.insert_after("\n\n")
 
-    def chunk_text(self, text: str, chunk_size: int = 1000):
-        chunks = []
-        for i in range(0, len(text), chunk_size):
-            chunks.append(text[i:i + chunk_size])
-        return chunks
+        text = soup.get_text()
+        # Collapse whitespace inside lines but leave code blocks untouched
+        parts = re.split(r"(```.*?```)", text, flags=re.S)
+        for i in range(0, len(parts), 2):
+            lines = (re.sub(r"[ \t\r\f\v]+", " ", line).strip() for line in parts[i].split("\n"))
+            parts[i] = re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+        return re.sub(r"\n{3,}", "\n\n", "".join(parts)).strip()
 
-    def run(self):
-        print("🚀 IngestionAgent: Scraping FastAPI documentation...")
+    def fetch_page(self, url: str, etag: str = None, last_modified: str = None) -> dict:
+        """
+        Conditional GET. Returns {"not_modified": True} on 304, otherwise the
+        parsed text plus the response's ETag/Last-Modified validators.
+        """
+        page = self.fetcher.fetch(url, etag=etag, last_modified=last_modified)
+        return self._parse_fetched(page)
 
-        doc_id = 0
-        total_chunks = 0
+    def _parse_fetched(self, page: dict) -> dict:
+        result = {
+            "not_modified": page["not_modified"],
+            "etag": page["etag"],
+            "last_modified": page["last_modified"],
+        }
+        if page["html"] is not None:
+            result["text"] = self.parse_html(page["html"])
+        return result
 
-        for url in FASTAPI_DOC_URLS:
-            page_name = url.split("/")[-2]
-            text = self.scrape_page(url)
-            chunks = self.chunk_text(text)
+    def scrape_page(self, url: str) -> str:
+        return self.fetch_page(url)["text"]
 
-            embeddings = self.embedder.encode(chunks).tolist()
+    def chunk_text(self, text: str):
+        return list(self.iter_chunks([text]))
 
-            ids = [f"{page_name}_{i}" for i in range(len(chunks))]
-            metadatas = [{"source": page_name, "url": url} for _ in chunks]
+    def iter_chunks(self, segments):
+        """
+        Yield chunks from an iterable of text segments (e.g. PDF pages)
+        without joining them into one string first.
+        """
+        return self.chunker.iter_chunks(segments)
 
-            self.collection.add(
-                documents=chunks,
-                embeddings=embeddings,
-                ids=ids,
-                metadatas=metadatas
-            )
+    @staticmethod
+    def page_name(url: str) -> str:
+        return url.rstrip("/").split("/")[-1]
 
-            total_chunks += len(chunks)
-            print(f"✅ {page_name}: {len(chunks)} chunks")
+    def run(self):
+        logger.info("🚀 IngestionAgent: Scraping FastAPI documentation...")
 
-            doc_id += 1
+        totals = {"pages": 0, "unchanged": 0, "failed": 0, "chunks": 0, "embedded": 0, "deleted": 0}
 
-        print(f"🎉 Indexed {total_chunks} total chunks!")
+        for stats in self.ingest_urls(FASTAPI_DOC_URLS):
+            totals["pages"] += 1
 
-    def ingest_url(self, url: str):
-        """Scrape and ingest content from a URL."""
-        page_name = url.split("/")[-2]
-        text = self.scrape_page(url)
-        self.ingest_text(text, source=page_name, url=url)
+            if "error" in stats:
+                totals["failed"] += 1
+                logger.error("❌ %s: %s", stats["source"], stats["error"])
+                continue
 
-    def ingest_text(self, text: str, source: str, url: str = None):
-        """Ingest raw text into the database."""
-        chunks = self.chunk_text(text)
-        embeddings = self.embedder.encode(chunks).tolist()
+            totals["unchanged"] += int(stats["unchanged"])
+            totals["chunks"] += stats["chunks"]
+            totals["embedded"] += stats["embedded"]
+            totals["deleted"] += stats["deleted"]
 
-        ids = [f"{source}_{i}" for i in range(len(chunks))]
-        metadatas = [{"source": source, "url": url} for _ in chunks]
+            if stats["unchanged"]:
+                logger.debug("⏭️  %s: unchanged", stats["source"])
+            else:
+                logger.info("✅ %s: %d chunks (%d re-embedded, %d deleted)",
+                            stats["source"], stats["chunks"], stats["embedded"], stats["deleted"])
 
-        self.collection.add(
-            documents=chunks,
-            embeddings=embeddings,
-            ids=ids,
-            metadatas=metadatas
+        logger.info(
+            "🎉 Indexed %d total chunks! %d/%d pages unchanged, %d chunks embedded, %d deleted, %d failed",
+            totals["chunks"], totals["unchanged"], totals["pages"], totals["embedded"], totals["deleted"], totals["failed"],
         )
+        return totals
+
+    def ingest_url(self, url: str) -> dict:
+        """Scrape and ingest content from a URL, skipping it if unchanged."""
+        return self.ingest_urls([url])[0]
+
+    def ingest_urls(self, urls, on_result=None) -> list:
+        """
+        Fetch many URLs concurrently and stream the pages into the ingestion
+        pipeline as they arrive, so parsing/embedding overlaps with the
+        remaining downloads. Returns one stats dict per URL.
+        """
+        return self.ingest_documents(self._url_documents(urls), on_result=on_result)
+
+    def _url_documents(self, urls):
+        if not urls:
+            return
+        validators = {}
+        for url in urls:
+            known = self.catalog.get_source(self.page_name(url)) or {}
+            validators[url] = (known.get("etag"), known.get("last_modified"))
+
+        for page in self.fetcher.fetch_many(validators.keys(), validators):
+            yield self._fetched_document(page)
+
+    def _fetched_document(self, page: dict) -> dict:
+        url = page["url"]
+        source = self.page_name(url)
+        doc = {"source": source, "url": url}
+
+        if "error" in page:
+            return dict(doc, error=str(page["error"]))
+
+        # 304 for a page we already indexed: nothing to parse or embed.
+        # Without catalog state, fall through and re-check the cached body.
+        if page["not_modified"] and (self.catalog.get_source(source) or page["html"] is None):
+            return dict(doc, unchanged=True)
+
+        try:
+            parsed = self._parse_fetched(page)
+        except Exception as e:
+            return dict(doc, error=str(e))
+
+        return dict(doc, text=parsed["text"], etag=parsed["etag"], last_modified=parsed["last_modified"])
+
+    def ingest_documents(self, documents, on_result=None) -> list:
+        """
+        Run documents (see IngestionPipeline) through the streaming
+        chunk -> embed -> write pipeline, batching embeddings and Chroma
+        writes across documents.
+        """
+        return IngestionPipeline(self).run(documents, on_result=on_result)
+
+    @staticmethod
+    def _file_documents(files):
+        """Documents for uploaded files spooled to disk ({"path", "filename", "kind"})."""
+        for f in files:
+            try:
+                if f["kind"] == "pdf":
+                    # Pages are extracted in a process pool and streamed into the chunker
+                    yield {"source": f["filename"], "segments": iter_pdf_pages(f["path"])}
+                    continue
+                with open(f["path"], "r", encoding="utf-8") as fh:
+                    text = fh.read()
+            except Exception as e:
+                yield {"source": f["filename"], "error": str(e)}
+                continue
+            yield {"source": f["filename"], "text": text}
+
+    @staticmethod
+    def _raw_text_documents(raw_texts):
+        for text in raw_texts:
+            # Key raw inputs by content so separate texts don't overwrite each other
+            yield {"source": f"raw_input_{content_hash(text)[:12]}", "text": text}
+
+    def run_job(self, payload: dict, job=None) -> dict:
+        """
+        Handler for background ingestion jobs (see backend.core.jobs).
+
+        `payload` is {"urls": [...], "files": [spooled uploads],
+        "raw_texts": [...]}. Everything goes through one pipeline run;
+        progress is reported per finished document and cancellation is
+        checked before each new document and between the pages of streamed
+        ones (PDFs), so a large upload stops promptly. Re-running a job after a restart
+        is cheap because unchanged documents are skipped by content hash.
+        """
+        urls = payload.get("urls") or []
+        files = payload.get("files") or []
+        raw_texts = payload.get("raw_texts") or []
+        total = len(urls) + len(files) + len(raw_texts)
+        done = 0
+
+        if job is not None:
+            job.report(0, total, "Ingesting")
+
+        def documents():
+            for doc in chain(self._url_documents(urls), self._file_documents(files), self._raw_text_documents(raw_texts)):
+                if job is not None:
+                    job.check_cancelled()
+                    if doc.get("segments") is not None:
+                        doc = dict(doc, segments=job.cancellable(doc["segments"]))
+                yield doc
+
+        def on_result(result):
+            nonlocal done
+            done += 1
+            if job is not None:
+                job.report(done, message=f"Ingested {result['source']}")
+
+        details = self.ingest_documents(documents(), on_result=on_result)
+        return {"documents": total, "details": details}
+
+    @staticmethod
+    def _unchanged(source: str, known: dict) -> dict:
+        return {
+            "source": source,
+            "unchanged": True,
+            "chunks": known.get("chunk_count", 0),
+            "embedded": 0,
+            "deleted": 0,
+        }
+
+    def _existing_chunk_ids(self, source: str) -> set:
+        """Chunk ids currently stored for `source`, from the catalog or, if
+        the source predates the catalog, from the collection itself."""
+        hashes = self.catalog.get_chunk_hashes(source)
+        if hashes:
+            return set(hashes)
+        return set(self.collection.get(where={"source": source}, include=[])["ids"])
+
+    def ingest_text(self, text: str, source: str, url: str = None,
+                    etag: str = None, last_modified: str = None) -> dict:
+        """
+        Ingest raw text into the database incrementally: unchanged text is
+        skipped, only new/changed chunks are embedded (via upsert), and
+        chunks that no longer exist are deleted.
+        """
+        return self.ingest_documents([{
+            "source": source,
+            "text": text,
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+        }])[0]
@@ -1,6 +1,24 @@
+import asyncio
+
+from backend.core.concurrency import bounded_map
+from backend.core.context import ContextAssembler, context_budget
+from backend.core.embeddings import get_embedding_service
+from backend.core.rerank import get_reranker
+from backend.core.retrieval import HybridRetriever
+from backend.core.sparse_index import get_sparse_index
+from backend.core.telemetry import get_logger, span
 from backend.core.llm import get_llm
-from backend.core.vectorstore import get_chroma_client
-from backend.config.settings import CHROMA_DB_PATH
+from backend.core.vectorstore import get_chroma_client, open_collection
+from backend.config.settings import (
+    CHROMA_DB_PATH,
+    COLLECTION_NAME,
+    RETRIEVAL_MODE,
+    SPARSE_INDEX_ENABLED,
+    RAG_CANDIDATES,
+    RERANK_ENABLED,
+)
+
+logger = get_logger(__name__)
 
 
 RAG_PROMPT_TEMPLATE = """You are a helpful FastAPI expert assistant.
@@ -15,49 +33,222 @@ Answer:"""
 
 
 class RAGAgent:
-    def __init__(self):
+    def __init__(self, collection=None, llm=None, embedder=None, answer_cache=None,
+                 sparse_index=None, retrieval_mode: str = RETRIEVAL_MODE, assembler=None, reranker=None):
         self.persist_path = CHROMA_DB_PATH
-        self.client = get_chroma_client(self.persist_path)
-        self.collection = self.client.get_collection("fastapi_docs")
-        self.llm = get_llm()
+        # Same embedding model as ingestion, for retrieval and the semantic cache tier
+        self.embedder = embedder or get_embedding_service()
+        if collection is None:
+            self.client = get_chroma_client(self.persist_path)
+            collection = open_collection(self.client, COLLECTION_NAME, self.embedder)
+        self.collection = collection
+        self.llm = llm or get_llm()
+        self.answer_cache = answer_cache
 
-    def retrieve_context(self, question: str, top_k: int = 3) -> tuple:
-        """
-        Retrieve relevant documentation chunks from ChromaDB based on the question.
-        Returns: (context_string, sources_list)
-        """
-        results = self.collection.query(
-            query_texts=[question],
-            n_results=top_k,
-            include=["documents", "metadatas"]
+        if sparse_index is None and SPARSE_INDEX_ENABLED:
+            sparse_index = get_sparse_index()
+        if reranker is None and RERANK_ENABLED:
+            reranker = get_reranker()
+        self.retriever = HybridRetriever(
+            self.collection, self.embedder, sparse_index, mode=retrieval_mode, reranker=reranker
         )
+        # Packs retrieved chunks into the model's context token budget
+        self.assembler = assembler or ContextAssembler(max_tokens=context_budget(self.llm))
 
+    def _format_context(self, question: str, hits: list) -> tuple:
         context_parts = []
         sources = []
-        for doc, metadata in zip(results["documents"][0], results["metadatas"][0]):
-            source = metadata.get("source", "unknown")
-            context_parts.append(f"[{source}] {doc}")
-            if source not in sources:
-                sources.append(source)
+        with span("prompt_build"):
+            for passage in self.assembler.assemble(hits, query=question):
+                source = passage["source"]
+                context_parts.append(f"[{source}] {passage['text']}")
+                if source not in sources:
+                    sources.append(source)
 
         return "\n\n".join(context_parts), sources
 
-    def run(self, question: str) -> dict:
+    def retrieve_context(self, question: str, top_k: int = RAG_CANDIDATES, query_embedding=None, mode: str = None) -> tuple:
         """
-        Answer a question about FastAPI using RAG approach.
+        Retrieve relevant documentation chunks based on the question and
+        pack the best of the `top_k` candidates into the context budget.
+        `mode` is "dense", "sparse" or "hybrid" (default: the agent's mode).
+        Returns: (context_string, sources_list)
+        """
+        embeddings = [query_embedding] if query_embedding is not None else None
+        return self.retrieve_context_many([question], top_k=top_k, query_embeddings=embeddings, mode=mode)[0]
+
+    def retrieve_context_many(self, questions: list, top_k: int = RAG_CANDIDATES, query_embeddings=None, mode: str = None) -> list:
+        """
+        Retrieve context for several questions with one vectorized encoder
+        call, one multi-query Chroma search and/or one BM25 pass.
+        Returns: [(context_string, sources_list), ...] in question order
         """
-        print(f"🔍 RAGAgent: Processing question: {question}")
+        hits = self.retriever.search_many(list(questions), top_k=top_k, mode=mode, query_embeddings=query_embeddings)
+        return [self._format_context(question, question_hits) for question, question_hits in zip(questions, hits)]
 
-        # Retrieve relevant context from ChromaDB
-        context, sources = self.retrieve_context(question)
+    def _caches(self, mode: str = None) -> bool:
+        """Cached answers were built with the default retrieval mode only."""
+        return self.answer_cache is not None and (mode is None or mode == self.retriever.mode)
 
-        # Generate answer using Gemini
-        prompt = RAG_PROMPT_TEMPLATE.format(context=context, question=question)
-        answer = self.llm(prompt)
+    def _kb_version(self):
+        """
+        Cheap token identifying the current state of the knowledge base.
+        In-process ingestion also invalidates the cache explicitly; the count
+        catches ingestion done by other processes.
+        """
+        return self.collection.count()
 
-        return {
+    def _lookup_cache(self, question: str, embedding=None, version=None, mode: str = None):
+        """
+        Returns (cached_result_or_None, question_embedding_or_None, kb_version).
+        kb_version is None when the answer must not be cached.
+        """
+        if not self._caches(mode):
+            return None, embedding, None
+
+        if embedding is None:
+            embedding = self.embedder.embed_query([question])[0]
+        if version is None:
+            version = self._kb_version()
+        cached = self.answer_cache.get(question, embedding=embedding, version=version)
+        if cached is not None:
+            logger.debug("⚡ RAGAgent: %s cache hit for: %s", cached["cached"], question)
+        return cached, embedding, version
+
+    def _store_cache(self, question: str, result: dict, embedding, version):
+        if self.answer_cache is not None and version is not None:
+            self.answer_cache.put(question, result, embedding=embedding, version=version)
+
+    def _finish(self, question: str, answer: str, context: str, sources: list, embedding, version) -> dict:
+        result = {
             "question": question,
             "answer": answer.strip(),
             "sources": sources,
             "context": context
         }
+        self._store_cache(question, result, embedding, version)
+        return result
+
+    def run(self, question: str, mode: str = None) -> dict:
+        """
+        Answer a question about FastAPI using RAG approach.
+        """
+        logger.debug("🔍 RAGAgent: Processing question: %s", question)
+
+        cached, embedding, version = self._lookup_cache(question, mode=mode)
+        if cached is not None:
+            return cached
+
+        # Retrieve relevant context (vector search, BM25 or both)
+        context, sources = self.retrieve_context(question, query_embedding=embedding, mode=mode)
+
+        # Generate answer using the LLM
+        prompt = RAG_PROMPT_TEMPLATE.format(context=context, question=question)
+        answer = self.llm(prompt)
+
+        return self._finish(question, answer, context, sources, embedding, version)
+
+    async def arun(self, question: str, mode: str = None) -> dict:
+        """
+        Async variant of run(): retrieval runs in a worker thread and the
+        LLM call is awaited, so no thread is held while the model generates.
+        """
+        logger.debug("🔍 RAGAgent: Processing question: %s", question)
+
+        cached, embedding, version = await asyncio.to_thread(self._lookup_cache, question, mode=mode)
+        if cached is not None:
+            return cached
+
+        context, sources = await asyncio.to_thread(self.retrieve_context, question, query_embedding=embedding, mode=mode)
+
+        prompt = RAG_PROMPT_TEMPLATE.format(context=context, question=question)
+        answer = await self.llm.ainvoke(prompt)
+
+        return self._finish(question, answer, context, sources, embedding, version)
+
+    def _prepare_many(self, questions: list, mode: str = None):
+        """
+        Shared first half of run_many/arun_many: batch-embed, check the cache
+        and batch-retrieve context for the misses.
+        Returns (results, pending) where results has cached answers filled in
+        and pending is [(index, embedding, version, context, sources), ...].
+        """
+        embeddings = self.embedder.embed_query(list(questions))
+        version = self._kb_version() if self._caches(mode) else None
+
+        results = [None] * len(questions)
+        misses = []
+        for i, (question, embedding) in enumerate(zip(questions, embeddings)):
+            cached, _, _ = self._lookup_cache(question, embedding=embedding, version=version, mode=mode)
+            if cached is not None:
+                results[i] = cached
+            else:
+                misses.append(i)
+
+        miss_embeddings = [embeddings[i] for i in misses]
+        contexts = self.retrieve_context_many([questions[i] for i in misses], query_embeddings=miss_embeddings, mode=mode)
+
+        pending = [
+            (i, embeddings[i], version, context, sources)
+            for i, (context, sources) in zip(misses, contexts)
+        ]
+        return results, pending
+
+    def run_many(self, questions: list, max_workers: int = 4, mode: str = None) -> list:
+        """
+        Answer several questions: one batched retrieval, then concurrent
+        generation. Results are returned in question order.
+        """
+        logger.debug("🔍 RAGAgent: Processing batch of %d questions", len(questions))
+        results, pending = self._prepare_many(questions, mode)
+
+        def generate(item):
+            i, embedding, version, context, sources = item
+            prompt = RAG_PROMPT_TEMPLATE.format(context=context, question=questions[i])
+            return self._finish(questions[i], self.llm(prompt), context, sources, embedding, version)
+
+        for (i, *_), result in zip(pending, bounded_map(generate, pending, max_workers=max_workers)):
+            results[i] = result
+        return results
+
+    async def arun_many(self, questions: list, mode: str = None) -> list:
+        """
+        Async variant of run_many(); generation concurrency is bounded by
+        the LLM client's own limiter.
+        """
+        logger.debug("🔍 RAGAgent: Processing batch of %d questions", len(questions))
+        results, pending = await asyncio.to_thread(self._prepare_many, questions, mode)
+
+        async def generate(item):
+            i, embedding, version, context, sources = item
+            prompt = RAG_PROMPT_TEMPLATE.format(context=context, question=questions[i])
+            answer = await self.llm.ainvoke(prompt)
+            return self._finish(questions[i], answer, context, sources, embedding, version)
+
+        for (i, *_), result in zip(pending, await asyncio.gather(*(generate(item) for item in pending))):
+            results[i] = result
+        return results
+
+    async def astream(self, question: str, mode: str = None):
+        """
+        Stream an answer: yields ("sources", [...]) once retrieval is done,
+        then ("token", text) for every generated token.
+        """
+        logger.debug("🔍 RAGAgent: Streaming answer for: %s", question)
+
+        cached, embedding, version = await asyncio.to_thread(self._lookup_cache, question, mode=mode)
+        if cached is not None:
+            yield "sources", cached["sources"]
+            yield "token", cached["answer"]
+            return
+
+        context, sources = await asyncio.to_thread(self.retrieve_context, question, query_embedding=embedding, mode=mode)
+        yield "sources", sources
+
+        prompt = RAG_PROMPT_TEMPLATE.format(context=context, question=question)
+        tokens = []
+        async for token in self.llm.astream(prompt):
+            tokens.append(token)
+            yield "token", token
+
+        self._finish(question, "".join(tokens), context, sources, embedding, version)
@@ -1,22 +1,41 @@
+import hashlib
 import json
 import os
 from pathlib import Path
 
 from backend.core.llm import get_llm
+from backend.core.catalog import KBCatalog, content_hash
+from backend.core.kb_export import fetch_chunks
+from backend.core.completion_cache import with_completion_cache
 from backend.core.prompts import (
     EXECUTIVE_SUMMARY_PROMPT,
+    SECTION_REDUCE_PROMPT,
     SECTION_SUMMARY_PROMPT
 )
+from backend.core.summary_tree import SummaryCheckpoint, TreeSummarizer
+from backend.core.telemetry import get_logger, span
 from backend.core.vectorstore import get_chroma_client
-from backend.config.settings import CHROMA_DB_PATH
+from backend.config.settings import CHROMA_DB_PATH, COLLECTION_NAME, SUMMARY_MAX_WORKERS
+
+logger = get_logger(__name__)
+
+# Chunk texts held in memory per tree wave, and per Chroma get()
+WAVE_CHUNKS = 2000
+FETCH_BATCH_SIZE = 500
 
 
 class SummaryAgent:
-    def __init__(self):
+    def __init__(self, collection=None, llm=None, catalog=None, checkpoint=None):
         self.persist_path = CHROMA_DB_PATH
-        self.client = get_chroma_client(self.persist_path)
-        self.collection = self.client.get_collection("fastapi_docs")
-        self.llm = get_llm()
+        if collection is None:
+            self.client = get_chroma_client(self.persist_path)
+            collection = self.client.get_collection(COLLECTION_NAME)
+        self.collection = collection
+        # Sources and their chunk ids come from the ingest-maintained catalog
+        self.catalog = catalog or KBCatalog()
+        self.llm = llm or with_completion_cache(get_llm())
+        # Finished summary tree nodes, for resuming interrupted runs
+        self.checkpoint = checkpoint or SummaryCheckpoint()
 
         # Get absolute path to data directory
         self.data_dir = Path(__file__).parent.parent / "data"
@@ -24,88 +43,143 @@ class SummaryAgent:
 
         self.exec_summary_path = self.data_dir / "executive_summary.txt"
         self.summaries_path = self.data_dir / "summaries.json"
-
-        print(f"📁 Data directory: {self.data_dir}")
-        print(f"📄 Executive summary path: {self.exec_summary_path}")
-        print(f"📄 Summaries JSON path: {self.summaries_path}")
-
-    def run(self):
-        print("📝 SummaryAgent: Generating summaries...")
-
-        docs = self.collection.get(include=["documents", "metadatas"])
-        print(f"📊 Total documents retrieved: {len(docs['documents'])}")
-
-        # -------- Executive Summary (map-reduce style) --------
-        print("🔄 Generating executive summary...")
-        partial_summaries = []
-
-        for i, doc in enumerate(docs["documents"][:8]):
-            print(f"   Processing doc {i+1}/8 for executive summary...")
-            prompt = EXECUTIVE_SUMMARY_PROMPT + "\n" + doc[:1000]
-            summary = self.llm(prompt)
-            partial_summaries.append(summary)
-            print(f"   ✓ Doc {i+1} processed")
-
-        print("🔄 Creating final executive summary...")
-        executive_summary = self.llm(
-            EXECUTIVE_SUMMARY_PROMPT + "\n" + " ".join(partial_summaries)
-        )
-
-        with open(self.exec_summary_path, "w", encoding="utf-8") as f:
-            f.write(executive_summary)
-        print(f"✅ Executive summary saved to: {self.exec_summary_path}")
+        # Content hash each stored section summary was generated from
+        self.state_path = self.data_dir / "summaries_state.json"
+
+        logger.debug("📁 Data directory: %s", self.data_dir)
+
+    def _load_json(self, path: Path, default):
+        if not path.exists():
+            return default
+        with open(path, "r", encoding="utf-8") as f, span("json_parse"):
+            return json.load(f)
+
+    def _save(self, section_summaries: dict, state: dict):
+        """Write summaries.json (sections in source order) and its hash state."""
+        with span("file_write"):
+            with open(self.summaries_path, "w", encoding="utf-8") as f:
+                json.dump(section_summaries, f, indent=2, ensure_ascii=False)
+            with open(self.state_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, indent=2)
+
+    def _section_leaves(self, sources: list) -> dict:
+        """Every chunk of `sources` as (content hash, text) leaves, in position order."""
+        rows = self.catalog.section_chunks(sources)
+        ids = [chunk_id for source in sources for chunk_id, _ in rows[source]]
+        texts = {}
+        for start in range(0, len(ids), FETCH_BATCH_SIZE):
+            page = fetch_chunks(self.collection, ids[start:start + FETCH_BATCH_SIZE], ["documents"])
+            texts.update(zip(page["ids"], page["documents"]))
+        return {
+            source: [(h, texts[chunk_id]) for chunk_id, h in rows[source] if chunk_id in texts]
+            for source in sources
+        }
+
+    def run(self, max_workers: int = SUMMARY_MAX_WORKERS, incremental: bool = False) -> dict:
+        """
+        Summarize every source from all of its chunks with a tree reduce
+        (backend.core.summary_tree), then tree-reduce the section summaries
+        into the executive summary.
+
+        With `incremental`, a section is re-summarized only when its content
+        hash (catalog.section_hashes) differs from the one its stored summary
+        was made from, summaries of sources no longer in the knowledge base
+        are dropped, and the executive summary is regenerated only if any
+        section summary changed. Failed sections get no hash, so they are
+        retried on the next run. Tree nodes are checkpointed as they finish:
+        an interrupted run resumes from them when rerun with `incremental`,
+        while a full run starts from an empty checkpoint.
+        """
+        logger.info("📝 SummaryAgent: Generating summaries (%s)...", "incremental" if incremental else "full")
+
+        sources = {row["source"]: row for row in self.catalog.list_sources() if row["first_chunk_id"]}
+        hashes = self.catalog.section_hashes()
+        logger.info("📊 %d sources in the knowledge base", len(sources))
+
+        if incremental:
+            previous = self._load_json(self.summaries_path, {})
+            state = self._load_json(self.state_path, {"sections": {}, "executive": None})
+        else:
+            previous, state = {}, {"sections": {}, "executive": None}
+            self.checkpoint.clear()
+        state["sections"] = {s: h for s, h in state["sections"].items() if s in sources}
 
         # -------- Section Summaries --------
-        print("🔄 Generating section summaries...")
-
-        # Load existing summaries if file exists (for resuming)
-        if self.summaries_path.exists():
-            with open(self.summaries_path, "r", encoding="utf-8") as f:
-                section_summaries = json.load(f)
-            print(f"📂 Loaded {len(section_summaries)} existing summaries")
+        section_summaries, pending = {}, []
+        for source in sources:
+            if source in previous and state["sections"].get(source) == hashes.get(source):
+                section_summaries[source] = previous[source]
+            else:
+                section_summaries[source] = None  # keeps source order in the output
+                pending.append(source)
+        removed = [s for s in previous if s not in sources]
+        logger.info("🔄 Summarizing %d section(s), %d unchanged, %d removed",
+                    len(pending), len(sources) - len(pending), len(removed))
+
+        tree = TreeSummarizer(self.llm, self.checkpoint, max_workers=max_workers)
+
+        def section_done(source, summary, error):
+            section_summaries[source] = summary
+            if error is None:
+                state["sections"][source] = hashes.get(source)
+                logger.debug("✓ Section %s processed and saved", source)
+            else:
+                state["sections"].pop(source, None)
+                logger.error("❌ Error processing %s: %s", source, error)
+
+            # Write after each summary so an interrupted run keeps its progress
+            self._save({k: v for k, v in section_summaries.items() if v is not None}, state)
+
+        # Sections go through the tree in waves, so only a bounded number of
+        # chunk texts are held in memory at once
+        wave, wave_chunks = [], 0
+        for i, source in enumerate(pending):
+            wave.append(source)
+            wave_chunks += sources[source]["chunk_count"]
+            if wave_chunks >= WAVE_CHUNKS or i == len(pending) - 1:
+                # Sources with no stored chunks finish at once with an empty
+                # summary, so their hash is recorded and later runs skip them
+                tree.summarize(self._section_leaves(wave), SECTION_SUMMARY_PROMPT, SECTION_REDUCE_PROMPT, on_done=section_done)
+                wave, wave_chunks = [], 0
+        section_summaries = {k: v for k, v in section_summaries.items() if v is not None}
+
+        # -------- Executive Summary (tree reduce over section summaries) --------
+        summarized = {s: section_summaries[s] for s in section_summaries
+                      if s in state["sections"] and section_summaries[s]}
+        executive_key = hashlib.sha256(
+            json.dumps(sorted(state["sections"].items())).encode("utf-8")
+        ).hexdigest()
+        regenerate = (not incremental or state.get("executive") != executive_key
+                      or not self.exec_summary_path.exists())
+
+        if regenerate and summarized:
+            logger.info("🔄 Creating executive summary from %d section summaries...", len(summarized))
+            leaves = [(content_hash(f"{source}\n{summary}"), f"{source}: {summary}")
+                      for source, summary in summarized.items()]
+            executive_summary, error = tree.summarize(
+                {"executive": leaves}, EXECUTIVE_SUMMARY_PROMPT, EXECUTIVE_SUMMARY_PROMPT
+            )["executive"]
+            if error is None:
+                with span("file_write"), open(self.exec_summary_path, "w", encoding="utf-8") as f:
+                    f.write(executive_summary)
+                state["executive"] = executive_key
+                logger.info("✅ Executive summary saved to: %s", self.exec_summary_path)
+            else:
+                regenerate = False
+                logger.error("❌ Error generating executive summary: %s", error)
         else:
-            section_summaries = {}
-
-        # Group documents by unique sections
-        sections_data = {}
-        for doc, meta in zip(docs["documents"], docs["metadatas"]):
-            section = meta.get("source", "unknown")
-            if section not in sections_data:
-                sections_data[section] = []
-            sections_data[section].append(doc)
-
-        print(f"📊 Found {len(sections_data)} unique sections: {list(sections_data.keys())}")
-
-        # Generate summary for each unique section (use first doc from each section)
-        for i, (section, section_docs) in enumerate(sections_data.items(), 1):
-            # Skip if already processed
-            if section in section_summaries:
-                print(f"   ⏭️  Section {i}/{len(sections_data)}: {section} (already exists, skipping)")
-                continue
-
-            print(f"   Processing section {i}/{len(sections_data)}: {section}...")
-
-            try:
-                # Use the first chunk from this section (or combine multiple if needed)
-                doc_text = section_docs[0][:800]
-                prompt = SECTION_SUMMARY_PROMPT + "\n" + doc_text
-                summary = self.llm(prompt)
-                section_summaries[section] = summary
-
-                # Write to file immediately after each summary
-                with open(self.summaries_path, "w", encoding="utf-8") as f:
-                    json.dump(section_summaries, f, indent=2, ensure_ascii=False)
-
-                print(f"   ✓ Section {section} processed and saved")
-            except Exception as e:
-                print(f"   ❌ Error processing {section}: {str(e)}")
-                section_summaries[section] = f"Error generating summary: {str(e)}"
-
-                # Save even on error so we don't retry failed sections
-                with open(self.summaries_path, "w", encoding="utf-8") as f:
-                    json.dump(section_summaries, f, indent=2, ensure_ascii=False)
-
-        print(f"✅ Section summaries saved to: {self.summaries_path}")
-        print(f"✅ Total sections: {len(section_summaries)}")
-
-        print("✅ All summaries completed!")
+            regenerate = False
+            logger.info("⏭️  Executive summary unchanged")
+
+        self._save(section_summaries, state)
+        logger.info("✅ Section summaries saved to: %s (%d sections)", self.summaries_path, len(section_summaries))
+
+        return {
+            "sections": len(section_summaries),
+            "summarized": len(pending),
+            "unchanged": len(sources) - len(pending),
+            "removed": len(removed),
+            "executive_updated": regenerate,
+            "llm_calls": tree.stats["llm_calls"],
+            "reused_nodes": tree.stats["reused_nodes"],
+        }
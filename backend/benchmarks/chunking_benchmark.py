@@ -0,0 +1,158 @@
+"""
+Compare the legacy fixed-size chunker with the structured chunker on
+retrieval hit-rate and prompt size.
+
+For each corpus sentence sampled as a "fact", a query is built by dropping
+some of its words. A query is a hit when one of the top-k retrieved chunks
+contains the whole sentence, so chunkers that cut sentences are penalised.
+Prompt size is the total size of the top-k chunks that would be sent to
+the LLM.
+
+Usage:
+    python -m backend.benchmarks.chunking_benchmark [--html-dir DIR] [--top-k 3]
+        [--queries 200] [--output results.json]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import time
+
+import numpy as np
+
+from backend.agents.ingestion_agent import IngestionAgent
+from backend.core.chunking import FixedSizeChunker, StructuredChunker, approx_token_count, tokenizer_counter
+from backend.core.embeddings import get_embedding_service
+from backend.config.settings import HTML_CACHE_DIR
+
+TOPICS = ["path parameters", "query parameters", "request body", "dependencies", "security",
+          "middleware", "background tasks", "response model", "file uploads", "OAuth2 scopes"]
+VERBS = ["declares", "validates", "converts", "documents", "injects", "returns", "serializes", "overrides"]
+OBJECTS = ["a Pydantic model", "the OpenAPI schema", "an UploadFile", "a Depends callable",
+           "the JSON response", "a BackgroundTasks instance", "a status code", "the request headers"]
+
+
+def synthetic_corpus(num_docs: int = 30, seed: int = 0) -> list:
+    """Markdown-like pages with headings, prose and code, shaped like the FastAPI tutorial."""
+    rng = random.Random(seed)
+    docs = []
+    for d in range(num_docs):
+        topic = TOPICS[d % len(TOPICS)]
+        lines = [f"# {topic.title()} part {d}", ""]
+        for section in range(rng.randint(2, 5)):
+            lines += [f"## {topic.title()} section {section}", ""]
+            for _ in range(rng.randint(2, 4)):
+                sentences = [
+                    f"When using {topic}, FastAPI {rng.choice(VERBS)} {rng.choice(OBJECTS)} "
+                    f"for item {rng.randint(1, 10_000)} in handler {rng.randint(1, 500)}."
+                    for _ in range(rng.randint(3, 7))
+                ]
+                lines += [" ".join(sentences), ""]
+            lines += ["```", "from fastapi import FastAPI, Depends", "app = FastAPI()", "",
+                      f"@app.get('/{topic.replace(' ', '-')}/{section}')",
+                      f"def handler_{d}_{section}():", f"    return {{'section': {section}}}", "```", ""]
+        docs.append("\n".join(lines))
+    return docs
+
+
+def load_corpus(html_dir: str) -> list:
+    pages = []
+    if html_dir and os.path.isdir(html_dir):
+        for name in sorted(os.listdir(html_dir)):
+            if name.endswith(".html"):
+                with open(os.path.join(html_dir, name), "r", encoding="utf-8") as f:
+                    pages.append(IngestionAgent.parse_html(f.read()))
+    return pages or synthetic_corpus()
+
+
+def sample_queries(corpus: list, n: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    sentences = []
+    for doc in corpus:
+        prose = re.sub(r"```.*?```", " ", doc, flags=re.S)
+        for sentence in re.split(r"(?<=[.!?])\s+", prose):
+            sentence = sentence.strip()
+            if len(sentence.split()) >= 8 and not sentence.startswith("#"):
+                sentences.append(sentence)
+    rng.shuffle(sentences)
+
+    queries = []
+    for sentence in sentences[:n]:
+        words = sentence.split()
+        kept = [w for w in words if rng.random() > 0.4] or words
+        queries.append({"query": " ".join(kept), "answer": sentence})
+    return queries
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def evaluate(name: str, chunker, corpus: list, queries: list, embedder, top_k: int, count_tokens) -> dict:
+    start = time.perf_counter()
+    chunks = [chunk for doc in corpus for chunk in chunker.iter_chunks([doc])]
+    chunk_seconds = time.perf_counter() - start
+
+    chunk_vectors = _normalized(embedder.encode(chunks))
+    query_vectors = _normalized(embedder.encode([q["query"] for q in queries]))
+    scores = query_vectors @ chunk_vectors.T
+    top = np.argsort(-scores, axis=1)[:, :top_k]
+
+    normalize = lambda text: re.sub(r"\s+", " ", text)
+    norm_chunks = [normalize(c) for c in chunks]
+    hits, prompt_chars, prompt_tokens = 0, [], []
+    for q, idx in zip(queries, top):
+        retrieved = [norm_chunks[i] for i in idx]
+        hits += any(normalize(q["answer"]) in c for c in retrieved)
+        prompt_chars.append(sum(len(chunks[i]) for i in idx))
+        prompt_tokens.append(sum(count_tokens(chunks[i]) for i in idx))
+
+    chunk_tokens = [count_tokens(c) for c in chunks]
+    return {
+        "chunker": name,
+        "num_chunks": len(chunks),
+        "avg_chunk_tokens": round(float(np.mean(chunk_tokens)), 1),
+        "max_chunk_tokens": int(max(chunk_tokens)),
+        "chunking_seconds": round(chunk_seconds, 4),
+        f"hit_rate_at_{top_k}": round(hits / len(queries), 4),
+        "avg_prompt_chars": round(float(np.mean(prompt_chars)), 1),
+        "avg_prompt_tokens": round(float(np.mean(prompt_tokens)), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--html-dir", default=HTML_CACHE_DIR, help="raw HTML pages to use as corpus (default: scrape cache)")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--output", help="write JSON results to this file as well as stdout")
+    args = parser.parse_args()
+
+    embedder = get_embedding_service()
+    tokenizer = embedder.tokenizer
+    count_tokens = tokenizer_counter(tokenizer) if tokenizer is not None else approx_token_count
+
+    corpus = load_corpus(args.html_dir)
+    queries = sample_queries(corpus, args.queries)
+
+    results = {
+        "corpus_documents": len(corpus),
+        "queries": len(queries),
+        "top_k": args.top_k,
+        "results": [
+            evaluate("fixed_1000_chars", FixedSizeChunker(1000), corpus, queries, embedder, args.top_k, count_tokens),
+            evaluate("structured", StructuredChunker(count_tokens=count_tokens), corpus, queries, embedder, args.top_k, count_tokens),
+        ],
+    }
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""
+Ingestion throughput, retrieval latency and /ask end-to-end latency on a
+local mock stack.
+
+A synthetic FastAPI-docs-like corpus of about --chunks chunks (1k to 1M) is
+streamed through IngestionAgent.ingest_documents in one pipeline run, the
+way uploads and crawls are ingested, into a throwaway Chroma collection, catalog and BM25 index in a temporary
+directory; the real knowledge base is never touched. Then:
+  - retrieval: RAGAgent.retrieve_context latency per retrieval mode, cold
+    (query not yet embedded) and warm (query embedding cached)
+  - ask: the app's /ask endpoint is served by uvicorn on a local port and
+    loaded with --requests questions at each --concurrency level, once with
+    MockLLM and once with OpenRouterLLM pointed at a local OpenRouter
+    stand-in that sleeps --llm-latency-ms (+ up to --llm-jitter-ms) per
+    completion
+All latencies are reported as p50/p95/p99 in milliseconds, as JSON.
+
+The OpenRouter client keeps its production rate limits, so the stand-in run
+measures them too; raise LLM_REQUESTS_PER_SECOND / LLM_BURST /
+LLM_MAX_IN_FLIGHT in the environment to measure the rest of the stack.
+Run from the repository root (the app serves backend/data).
+
+Usage:
+    python -m backend.benchmarks.latency_benchmark [--chunks 1000] [--queries 200]
+        [--requests 200] [--concurrency 1,8,32] [--llm-latency-ms 300]
+        [--llm-jitter-ms 100] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+import httpx
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from backend.agents.ingestion_agent import IngestionAgent
+from backend.agents.rag_agent import RAGAgent
+from backend.benchmarks.chunking_benchmark import sample_queries, synthetic_corpus
+from backend.core.catalog import KBCatalog
+from backend.core.embeddings import get_embedding_service
+from backend.core.llm import MockLLM, OpenRouterLLM
+from backend.core.retrieval import RETRIEVAL_MODES
+from backend.core.sparse_index import SparseIndex
+from backend.core.vectorstore import get_chroma_client, open_collection
+from backend.config.settings import (
+    LLM_MODEL,
+    LLM_REQUESTS_PER_SECOND,
+    LLM_BURST,
+    LLM_MAX_IN_FLIGHT,
+)
+
+DOCS_PER_BATCH = 100
+SAMPLE_DOCS = 200
+
+
+def latency_summary(latencies_ms: list) -> dict:
+    if not latencies_ms:
+        return {"count": 0}
+    values = np.asarray(latencies_ms, dtype=float)
+    return {
+        "count": len(latencies_ms),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+def iter_synthetic_documents(seed: int = 0):
+    """Endless stream of (source, text) pages from the chunking benchmark's generator."""
+    batch = 0
+    while True:
+        for i, text in enumerate(synthetic_corpus(DOCS_PER_BATCH, seed=seed + batch)):
+            yield f"synthetic_{batch * DOCS_PER_BATCH + i:07d}", text
+        batch += 1
+
+
+# -------- ingestion --------
+
+def ingest_corpus(agent: IngestionAgent, target_chunks: int) -> tuple:
+    """
+    Stream synthetic pages through one ingest_documents run until at least
+    `target_chunks` chunks are stored. Pages already queued in the pipeline
+    when the target is reached are still ingested, so the corpus overshoots
+    slightly.
+    """
+    sample = []
+    progress = {"chunks": 0, "documents": 0, "next_report": max(1, target_chunks // 10)}
+
+    def documents():
+        for source, text in iter_synthetic_documents():
+            if progress["chunks"] >= target_chunks:
+                return
+            if len(sample) < SAMPLE_DOCS:
+                sample.append(text)
+            yield {"source": source, "text": text}
+
+    def on_result(result):
+        if "error" in result:
+            raise RuntimeError(f"Ingesting {result['source']} failed: {result['error']}")
+        progress["chunks"] += result.get("chunks", 0)
+        progress["documents"] += 1
+        if progress["chunks"] >= progress["next_report"]:
+            print(f"📥 Ingested {progress['chunks']}/{target_chunks} chunks ({progress['documents']} documents)")
+            progress["next_report"] += max(1, target_chunks // 10)
+
+    start = time.perf_counter()
+    agent.ingest_documents(documents(), on_result=on_result)
+    seconds = time.perf_counter() - start
+    chunks, docs = progress["chunks"], progress["documents"]
+
+    stats = {
+        "documents": docs,
+        "chunks": chunks,
+        "seconds": round(seconds, 3),
+        "chunks_per_second": round(chunks / seconds, 2) if seconds else None,
+        "documents_per_second": round(docs / seconds, 2) if seconds else None,
+    }
+    return stats, sample
+
+
+# -------- retrieval --------
+
+def bench_retrieval(agent: RAGAgent, questions: list) -> dict:
+    results = {}
+    for mode in RETRIEVAL_MODES:
+        results[mode] = {}
+        # First pass encodes every query; the second hits the embedding cache
+        agent.embedder.clear_cache()
+        for phase in ("cold", "warm"):
+            latencies = []
+            for question in questions:
+                start = time.perf_counter()
+                agent.retrieve_context(question, mode=mode)
+                latencies.append((time.perf_counter() - start) * 1000)
+            results[mode][phase] = latency_summary(latencies)
+    return results
+
+
+# -------- local servers --------
+
+def openrouter_stub(latency_ms: float, jitter_ms: float, seed: int = 0) -> FastAPI:
+    """
+    Minimal OpenRouter /chat/completions stand-in: waits latency_ms plus up
+    to jitter_ms, then answers (as SSE deltas when "stream" is set).
+    """
+    app = FastAPI()
+    rng = random.Random(seed)
+    answer = ("Declare the parameter with a type annotation and FastAPI validates, "
+              "converts and documents it in the OpenAPI schema.")
+
+    @app.post("/api/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        delay = (latency_ms + rng.uniform(0, jitter_ms)) / 1000
+
+        if not payload.get("stream"):
+            await asyncio.sleep(delay)
+            return {
+                "model": payload.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}}],
+            }
+
+        words = answer.split(" ")
+
+        async def events():
+            for i, word in enumerate(words):
+                await asyncio.sleep(delay / len(words))
+                delta = {"choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}}]}
+                yield f"data: {json.dumps(delta)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+class LocalServer:
+    """Serves an ASGI app with uvicorn on a free local port, in a background thread."""
+
+    def __init__(self, app):
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", lifespan="off"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("Local benchmark server failed to start")
+            time.sleep(0.01)
+        return self
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.servers[0].sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+# -------- /ask load --------
+
+async def load_ask(url: str, questions: list, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async with httpx.AsyncClient(base_url=url, timeout=120,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def ask(i: int):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/ask", json={"question": questions[i % len(questions)]})
+                    ok = response.status_code == 200 and response.json().get("status") == "success"
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append((time.perf_counter() - start) * 1000)
+                errors += not ok
+
+        start = time.perf_counter()
+        await asyncio.gather(*(ask(i) for i in range(requests)))
+        seconds = time.perf_counter() - start
+
+    return dict(
+        latency_summary(latencies),
+        concurrency=concurrency,
+        errors=errors,
+        requests_per_second=round(requests / seconds, 2) if seconds else None,
+    )
+
+
+def _provide(agent):
+    # A parameterless dependency; FastAPI would read arguments as query params
+    return lambda: agent
+
+
+def bench_ask(agents: dict, questions: list, requests: int, concurrency_levels: list) -> dict:
+    # Imported here: the app module wires up routes and static files on import
+    from backend.test_app import app, rag_agent_dep
+
+    results = {}
+    with LocalServer(app) as server:
+        for name, agent in agents.items():
+            app.dependency_overrides[rag_agent_dep] = _provide(agent)
+            results[name] = [
+                asyncio.run(load_ask(server.url, questions, requests, concurrency))
+                for concurrency in concurrency_levels
+            ]
+        app.dependency_overrides.pop(rag_agent_dep, None)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=1000, help="approximate corpus size in chunks (1k-1M)")
+    parser.add_argument("--queries", type=int, default=200, help="retrieve_context calls per mode and phase")
+    parser.add_argument("--requests", type=int, default=200, help="/ask requests per concurrency level")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated /ask concurrency levels")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0, help="OpenRouter stand-in base latency")
+    parser.add_argument("--llm-jitter-ms", type=float, default=100.0, help="OpenRouter stand-in random extra latency")
+    parser.add_argument("--output", help="write JSON results to this file as well as stdout")
+    args = parser.parse_args()
+    concurrency_levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    embedder = get_embedding_service()
+
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as workdir:
+        collection = open_collection(get_chroma_client(os.path.join(workdir, "chroma_db")),
+                                     "latency_benchmark", embedder, create=True)
+        catalog = KBCatalog(os.path.join(workdir, "kb_catalog.sqlite3"))
+        sparse_index = SparseIndex(os.path.join(workdir, "sparse_index"))
+        ingestion_agent = IngestionAgent(embedder=embedder, collection=collection, catalog=catalog,
+                                         sparse_index=sparse_index)
+
+        ingestion, sample = ingest_corpus(ingestion_agent, args.chunks)
+        questions = [q["query"] for q in sample_queries(sample, max(args.queries, args.requests))]
+
+        with LocalServer(openrouter_stub(args.llm_latency_ms, args.llm_jitter_ms)) as stub:
+            openrouter = OpenRouterLLM(api_key="benchmark", model=LLM_MODEL)
+            openrouter.api_base = f"{stub.url}/api/v1"
+            agents = {
+                name: RAGAgent(collection=collection, llm=llm, embedder=embedder, sparse_index=sparse_index)
+                for name, llm in (("mock", MockLLM()), ("openrouter_stub", openrouter))
+            }
+            try:
+                retrieval = bench_retrieval(agents["mock"], questions[:args.queries])
+                ask = bench_ask(agents, questions[:args.requests], args.requests, concurrency_levels)
+            finally:
+                openrouter.close()
+
+        catalog.close()
+
+    results = {
+        "config": {
+            "target_chunks": args.chunks,
+            "queries": len(questions[:args.queries]),
+            "requests": args.requests,
+            "concurrency": concurrency_levels,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms,
+            "llm_requests_per_second": LLM_REQUESTS_PER_SECOND,
+            "llm_burst": LLM_BURST,
+            "llm_max_in_flight": LLM_MAX_IN_FLIGHT,
+        },
+        "ingestion": ingestion,
+        "retrieval": retrieval,
+        "ask": ask,
+    }
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
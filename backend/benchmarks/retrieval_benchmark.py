@@ -0,0 +1,142 @@
+"""
+Compare dense, sparse (BM25) and hybrid (RRF) retrieval on recall and latency.
+
+The corpus is chunked with the structured chunker and indexed into a
+throwaway in-memory Chroma collection and a temporary BM25 index. Two query
+sets are evaluated:
+  - exact_term: identifiers that occur in only a few chunks (e.g.
+    "handler_12_3", "item 4821"), the case dense retrieval struggles with
+  - paraphrase: corpus sentences with some words dropped
+A query is a hit when one of the top-k chunks is relevant (contains the
+identifier / the whole sentence). Latency is measured per single query.
+
+Usage:
+    python -m backend.benchmarks.retrieval_benchmark [--html-dir DIR] [--top-k 3]
+        [--queries 200] [--output results.json]
+"""
+import argparse
+import json
+import random
+import re
+import tempfile
+import time
+
+import chromadb
+import numpy as np
+
+from backend.benchmarks.chunking_benchmark import load_corpus, sample_queries
+from backend.core.chunking import make_chunker
+from backend.core.embeddings import get_embedding_service
+from backend.core.retrieval import RETRIEVAL_MODES, HybridRetriever
+from backend.core.sparse_index import SparseIndex
+from backend.config.settings import HTML_CACHE_DIR
+
+_IDENTIFIER_RE = re.compile(r"\b(handler_\d+_\d+|item \d+|handler \d+)\b")
+
+
+def build_indexes(chunks: list, embedder, index_dir: str):
+    client = chromadb.EphemeralClient()
+    collection = client.create_collection("retrieval_benchmark", embedding_function=embedder)
+    sparse_index = SparseIndex(index_dir)
+
+    ids = [f"chunk_{i}" for i in range(len(chunks))]
+    embeddings = embedder.encode(chunks)
+    for start in range(0, len(chunks), 1000):
+        end = start + 1000
+        collection.add(
+            ids=ids[start:end],
+            documents=chunks[start:end],
+            embeddings=[list(map(float, e)) for e in embeddings[start:end]],
+        )
+        sparse_index.add(ids[start:end], chunks[start:end])
+    sparse_index.flush()
+    return collection, sparse_index, ids
+
+
+def exact_term_queries(chunks: list, ids: list, n: int, seed: int = 2) -> list:
+    """Identifiers occurring in at most 3 chunks, with those chunks as the relevant set."""
+    occurrences = {}
+    for chunk_id, chunk in zip(ids, chunks):
+        for term in set(_IDENTIFIER_RE.findall(chunk)):
+            occurrences.setdefault(term, set()).add(chunk_id)
+    rare = sorted(term for term, where in occurrences.items() if len(where) <= 3)
+    random.Random(seed).shuffle(rare)
+    return [{"query": term, "relevant": occurrences[term]} for term in rare[:n]]
+
+
+def paraphrase_queries(corpus: list, chunks: list, ids: list, n: int) -> list:
+    normalize = lambda text: re.sub(r"\s+", " ", text)
+    norm_chunks = [normalize(c) for c in chunks]
+    queries = []
+    for q in sample_queries(corpus, n):
+        answer = normalize(q["answer"])
+        relevant = {chunk_id for chunk_id, chunk in zip(ids, norm_chunks) if answer in chunk}
+        if relevant:
+            queries.append({"query": q["query"], "relevant": relevant})
+    return queries
+
+
+def evaluate(retriever: HybridRetriever, queries: list, mode: str, top_k: int) -> dict:
+    hits, latencies = 0, []
+    for q in queries:
+        start = time.perf_counter()
+        results = retriever.search_many([q["query"]], top_k=top_k, mode=mode)[0]
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += any(hit["id"] in q["relevant"] for hit in results)
+
+    return {
+        f"recall_at_{top_k}": round(hits / len(queries), 4) if queries else None,
+        "latency_ms_p50": round(float(np.percentile(latencies, 50)), 3) if latencies else None,
+        "latency_ms_p95": round(float(np.percentile(latencies, 95)), 3) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--html-dir", default=HTML_CACHE_DIR, help="raw HTML pages to use as corpus (default: scrape cache)")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--output", help="write JSON results to this file as well as stdout")
+    args = parser.parse_args()
+
+    embedder = get_embedding_service()
+    chunker = make_chunker(embedder)
+    corpus = load_corpus(args.html_dir)
+    chunks = [chunk for doc in corpus for chunk in chunker.iter_chunks([doc])]
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        start = time.perf_counter()
+        collection, sparse_index, ids = build_indexes(chunks, embedder, index_dir)
+        index_seconds = time.perf_counter() - start
+        retriever = HybridRetriever(collection, embedder, sparse_index)
+
+        query_sets = {
+            "exact_term": exact_term_queries(chunks, ids, args.queries),
+            "paraphrase": paraphrase_queries(corpus, chunks, ids, args.queries),
+        }
+        # Query embeddings are cached by the service; warm it so dense
+        # latencies measure search rather than first-time encoding
+        for queries in query_sets.values():
+            embedder.embed_query([q["query"] for q in queries])
+
+        results = {
+            "corpus_documents": len(corpus),
+            "chunks": len(chunks),
+            "index_seconds": round(index_seconds, 3),
+            "top_k": args.top_k,
+            "query_sets": {name: len(queries) for name, queries in query_sets.items()},
+            "results": {
+                mode: {name: evaluate(retriever, queries, mode, args.top_k) for name, queries in query_sets.items()}
+                for mode in RETRIEVAL_MODES
+            },
+        }
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import json
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -6,9 +7,6 @@ from dotenv import load_dotenv
 env_path = Path(__file__).parent.parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
-print(f"🔧 Loading .env from: {env_path}")
-print(f"🔧 .env file exists: {env_path.exists()}")
-
 FASTAPI_DOC_URLS = [
     "https://fastapi.tiangolo.com/tutorial/first-steps/",
     "https://fastapi.tiangolo.com/tutorial/path-params/",
@@ -29,11 +27,124 @@ OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
 OPENROUTER_API_BASE = "https://openrouter.ai/api/v1"
 LLM_MODEL = "arcee-ai/trinity-mini:free"
 
-print(f"🔧 OPENROUTER_API_KEY loaded: {OPENROUTER_API_KEY[:40] if OPENROUTER_API_KEY else 'NOT FOUND'}...")
-print(f"🔧 API Base: {OPENROUTER_API_BASE}")
-print(f"🔧 Model: {LLM_MODEL}")
-
 # Use Mock LLM for testing (no API key needed)
 USE_MOCK_LLM = os.getenv("USE_MOCK_LLM", "false").lower() == "true"
 
-print(f"🔧 USE_MOCK_LLM: {USE_MOCK_LLM}")
+# Knowledge base collection and embedding model shared by all agents
+COLLECTION_NAME = "fastapi_docs"
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# Load models and run a dummy query at startup so the first request is warm
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+
+# OpenRouter client pooling and rate limiting
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "10"))
+LLM_REQUESTS_PER_SECOND = float(os.getenv("LLM_REQUESTS_PER_SECOND", "1"))
+LLM_BURST = int(os.getenv("LLM_BURST", "1"))
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "4"))
+
+# Answer cache in front of RAGAgent (exact + semantic tiers)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512"))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+
+# Memoized LLM completions for the summary and FAQ pipelines
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "false").lower() == "true"
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+
+# Parallel LLM calls in the summary map phase (the LLM rate limiter still applies)
+SUMMARY_MAX_WORKERS = int(os.getenv("SUMMARY_MAX_WORKERS", "4"))
+# Tree-reduce summaries: approximate tokens of input per LLM call and the
+# most summaries merged by one call
+SUMMARY_BATCH_TOKENS = int(os.getenv("SUMMARY_BATCH_TOKENS", "1500"))
+SUMMARY_MAX_FANOUT = int(os.getenv("SUMMARY_MAX_FANOUT", "8"))
+
+# Parallelism for the FAQ pipeline (topics in flight, KB answers per topic)
+FAQ_TOPIC_WORKERS = int(os.getenv("FAQ_TOPIC_WORKERS", "3"))
+FAQ_ANSWER_WORKERS = int(os.getenv("FAQ_ANSWER_WORKERS", "3"))
+
+# StackOverflow questions for FAQs: cached locally, fresh for SO_CACHE_TTL
+# seconds, then served stale and refreshed in the background for up to
+# SO_STALE_TTL more. SO_BACKEND is "api", "record" (api, saving responses
+# to SO_FIXTURE_PATH) or "replay" (recorded responses only, no network).
+# No API calls are made while quota_remaining is below SO_MIN_QUOTA.
+SO_BACKEND = os.getenv("SO_BACKEND", "api")
+SO_API_KEY = os.getenv("SO_API_KEY", "")
+SO_CACHE_TTL = int(os.getenv("SO_CACHE_TTL", str(24 * 3600)))
+SO_STALE_TTL = int(os.getenv("SO_STALE_TTL", str(7 * 24 * 3600)))
+SO_MIN_QUOTA = int(os.getenv("SO_MIN_QUOTA", "10"))
+SO_TIMEOUT = float(os.getenv("SO_TIMEOUT", "10"))
+SO_FIXTURE_PATH = os.getenv(
+    "SO_FIXTURE_PATH", os.path.join(os.path.dirname(CHROMA_DB_PATH), "stackoverflow_fixtures.json")
+)
+
+# Scraping: pooled concurrent fetches with retries and a raw HTML cache
+SCRAPE_MAX_WORKERS = int(os.getenv("SCRAPE_MAX_WORKERS", "8"))
+SCRAPE_PER_HOST_LIMIT = int(os.getenv("SCRAPE_PER_HOST_LIMIT", "4"))
+SCRAPE_RETRIES = int(os.getenv("SCRAPE_RETRIES", "3"))
+SCRAPE_BACKOFF = float(os.getenv("SCRAPE_BACKOFF", "0.5"))
+SCRAPE_TIMEOUT = float(os.getenv("SCRAPE_TIMEOUT", "10"))
+HTML_CACHE_DIR = os.path.join(os.path.dirname(CHROMA_DB_PATH), "html_cache")
+
+# Streaming ingestion pipeline: embedding batch size across documents,
+# Chroma upsert batch size and bounded queue depth between stages
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "256"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "4"))
+
+# Chunking: "structured" (sentence/heading/code aware, token bounded) or "fixed" (legacy 1000 chars)
+CHUNKER = os.getenv("CHUNKER", "structured")
+# all-MiniLM-L6-v2 truncates input at 256 word pieces
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "256"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+
+# Background ingestion jobs
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+JOBS_DB_PATH = os.path.join(os.path.dirname(CHROMA_DB_PATH), "jobs.sqlite3")
+JOB_UPLOAD_DIR = os.path.join(os.path.dirname(CHROMA_DB_PATH), "job_uploads")
+
+# PDF extraction (process pool, pages split into ranges)
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+
+# Shared embedding service ("torch" or "onnx"; EMBEDDING_ONNX_FILE picks e.g. an int8 export)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "")
+EMBED_QUERY_CACHE_SIZE = int(os.getenv("EMBED_QUERY_CACHE_SIZE", "1024"))
+
+# Sparse (BM25) index and hybrid retrieval ("dense", "sparse" or "hybrid")
+SPARSE_INDEX_ENABLED = os.getenv("SPARSE_INDEX_ENABLED", "true").lower() == "true"
+SPARSE_INDEX_DIR = os.path.join(os.path.dirname(CHROMA_DB_PATH), "sparse_index")
+# Same-size segments merged at a time, chunks buffered before a new segment
+# is written, and pending chunks that force a flush
+SPARSE_MERGE_FACTOR = int(os.getenv("SPARSE_MERGE_FACTOR", "8"))
+SPARSE_BUFFER_MAX_DOCS = int(os.getenv("SPARSE_BUFFER_MAX_DOCS", "500"))
+SPARSE_SEGMENT_MAX_DOCS = int(os.getenv("SPARSE_SEGMENT_MAX_DOCS", "5000"))
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+RRF_K = int(os.getenv("RRF_K", "60"))
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+
+# Prompt context assembly: token budget per model (CONTEXT_TOKEN_BUDGETS is a
+# JSON object of model name -> budget, falling back to CONTEXT_TOKEN_BUDGET)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "800"))
+CONTEXT_TOKEN_BUDGETS = json.loads(os.getenv("CONTEXT_TOKEN_BUDGETS", "{}"))
+CONTEXT_DEDUPE_THRESHOLD = float(os.getenv("CONTEXT_DEDUPE_THRESHOLD", "0.8"))
+RAG_CANDIDATES = int(os.getenv("RAG_CANDIDATES", "6"))
+
+# Optional cross-encoder reranking of retrieved candidates
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "30"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "32"))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "10000"))
+
+# Logging and telemetry. DEBUG records (per-request detail) are additionally
+# sampled at LOG_SAMPLE_RATE; TIMING_HEADER_ENABLED adds a Server-Timing
+# header with the per-request span breakdown
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+TIMING_HEADER_ENABLED = os.getenv("TIMING_HEADER_ENABLED", "false").lower() == "true"
@@ -0,0 +1,128 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+
+class AnswerCache:
+    """
+    Two-tier cache for RAG answers.
+
+    Tier 1 is an exact match on the normalized question. Tier 2 reuses an
+    answer when the new question's embedding has cosine similarity of at
+    least `similarity_threshold` with a cached question.
+
+    Entries expire after `ttl_seconds` and the least recently used entry is
+    evicted once `max_entries` is reached. Every lookup carries a knowledge
+    base version token; when it changes, the whole cache is dropped.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600, similarity_threshold: float = 0.95):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+
+        self._entries = OrderedDict()  # normalized question -> (result, unit embedding or None, created_at)
+        self._lock = threading.Lock()
+        self._version = None
+        self._counters = {
+            "exact_hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    @staticmethod
+    def normalize(question: str) -> str:
+        question = re.sub(r"\s+", " ", question.strip().lower())
+        return question.rstrip("?!. ")
+
+    @staticmethod
+    def _unit(embedding) -> Optional[np.ndarray]:
+        if embedding is None:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_version(self, version):
+        # Caller holds the lock
+        if version is not None and version != self._version:
+            if self._entries:
+                self._counters["invalidations"] += 1
+            self._entries.clear()
+            self._version = version
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - created_at > self.ttl_seconds
+
+    def get(self, question: str, embedding=None, version=None) -> Optional[dict]:
+        """
+        Return a copy of the cached result with a `cached` field set to
+        "exact" or "semantic", or None on a miss.
+        """
+        key = self.normalize(question)
+        query = self._unit(embedding)
+
+        with self._lock:
+            self._check_version(version)
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                result, _, created_at = entry
+                if not self._expired(created_at):
+                    self._entries.move_to_end(key)
+                    self._counters["exact_hits"] += 1
+                    return dict(result, question=question, cached="exact")
+                del self._entries[key]
+
+            if query is not None:
+                best_key, best_score = None, self.similarity_threshold
+                for cached_key, (_, cached_vector, created_at) in self._entries.items():
+                    if cached_vector is None or self._expired(created_at):
+                        continue
+                    score = float(np.dot(query, cached_vector))
+                    if score >= best_score:
+                        best_key, best_score = cached_key, score
+                if best_key is not None:
+                    self._entries.move_to_end(best_key)
+                    self._counters["semantic_hits"] += 1
+                    result = self._entries[best_key][0]
+                    return dict(result, question=question, cached="semantic", similarity=round(best_score, 4))
+
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, question: str, result: dict, embedding=None, version=None):
+        key = self.normalize(question)
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (dict(result), self._unit(embedding), time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def invalidate(self):
+        """Drop every entry, e.g. after the knowledge base changed."""
+        with self._lock:
+            if self._entries:
+                self._counters["invalidations"] += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self._counters["exact_hits"] + self._counters["semantic_hits"]
+            lookups = hits + self._counters["misses"]
+            return {
+                **self._counters,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "similarity_threshold": self.similarity_threshold,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,233 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from backend.config.settings import CHROMA_DB_PATH
+
+KB_CATALOG_PATH = os.path.join(os.path.dirname(CHROMA_DB_PATH), "kb_catalog.sqlite3")
+PREVIEW_CHARS = 200
+
+# Columns added to `sources` after the table was first released; created on
+# open when an older catalog file lacks them
+_SOURCE_COLUMNS = {
+    "preview": "TEXT",
+    "byte_size": "INTEGER NOT NULL DEFAULT 0",
+    "first_chunk_id": "TEXT",
+}
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class KBCatalog:
+    """
+    Small SQLite table describing what has been ingested into the Chroma
+    collection: one row per source (page/file) with its HTTP validators,
+    content hash, chunk count, size in bytes, first chunk id, a preview and
+    last-updated time, and one row per chunk with its content hash.
+
+    IngestionAgent uses it to skip unchanged pages, re-embed only changed
+    chunks and delete chunks that disappeared. Because it is kept in step
+    with every write, it also answers "what is in the knowledge base"
+    (source counts, previews, chunk id pages) without scanning Chroma.
+    """
+
+    def __init__(self, path: str = KB_CATALOG_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sources (
+                source TEXT PRIMARY KEY,
+                url TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                chunk_count INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                id TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                content_hash TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks(source, position);
+            """
+        )
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(sources)")}
+        for column, declaration in _SOURCE_COLUMNS.items():
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE sources ADD COLUMN {column} {declaration}")
+        self._conn.commit()
+
+    def get_source(self, source: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM sources WHERE source = ?", (source,)).fetchone()
+        return dict(row) if row else None
+
+    def get_chunk_hashes(self, source: str) -> Dict[str, str]:
+        """Map of chunk id -> content hash for one source."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, content_hash FROM chunks WHERE source = ?", (source,)
+            ).fetchall()
+        return {row["id"]: row["content_hash"] for row in rows}
+
+    def record_source(self, source: str, url: Optional[str], page_hash: str,
+                      chunks: List[tuple], etag: Optional[str] = None, last_modified: Optional[str] = None,
+                      preview: Optional[str] = None, byte_size: int = 0):
+        """
+        Replace the catalog entry for `source`.
+        `chunks` is a list of (chunk_id, position, content_hash); `preview`
+        is the start of the first chunk and `byte_size` the UTF-8 size of
+        the source text.
+        """
+        if preview is not None:
+            preview = preview[:PREVIEW_CHARS]
+        first_chunk_id = min(chunks, key=lambda row: row[1])[0] if chunks else None
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    """
+                    INSERT OR REPLACE INTO sources
+                        (source, url, etag, last_modified, content_hash, chunk_count, updated_at,
+                         preview, byte_size, first_chunk_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (source, url, etag, last_modified, page_hash, len(chunks), time.time(),
+                     preview, byte_size, first_chunk_id),
+                )
+                self._conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+                self._conn.executemany(
+                    "INSERT INTO chunks (id, source, position, content_hash) VALUES (?, ?, ?, ?)",
+                    [(chunk_id, source, position, h) for chunk_id, position, h in chunks],
+                )
+
+    def touch_source(self, source: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Refresh validators/timestamp for a source whose content did not change."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    """
+                    UPDATE sources
+                    SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified), updated_at = ?
+                    WHERE source = ?
+                    """,
+                    (etag, last_modified, time.time(), source),
+                )
+
+    # -------- knowledge base statistics --------
+
+    def summary(self) -> dict:
+        """Source, chunk and byte totals."""
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT COUNT(*) AS sources, COALESCE(SUM(chunk_count), 0) AS chunks,
+                       COALESCE(SUM(byte_size), 0) AS bytes, MAX(updated_at) AS updated_at
+                FROM sources
+                """
+            ).fetchone()
+        return dict(row)
+
+    def list_sources(self, limit: Optional[int] = None) -> List[dict]:
+        """
+        Per-source rows (source, url, content_hash, chunk_count, byte_size,
+        first_chunk_id, preview, updated_at) ordered by source.
+        """
+        # Rows written before first_chunk_id existed fall back to an indexed
+        # lookup on chunks(source, position)
+        query = """
+            SELECT source, url, content_hash, chunk_count, byte_size, preview, updated_at,
+                   COALESCE(first_chunk_id, (
+                       SELECT id FROM chunks WHERE chunks.source = sources.source ORDER BY position LIMIT 1
+                   )) AS first_chunk_id
+            FROM sources ORDER BY source
+        """
+        params = ()
+        if limit is not None:
+            query += " LIMIT ?"
+            params = (limit,)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def section_hashes(self) -> Dict[str, str]:
+        """
+        Per-source digest of its chunk hashes in position order: changes
+        exactly when some chunk of the source was added, edited or removed.
+        """
+        digests = {}
+        with self._lock:
+            rows = self._conn.execute("SELECT source, content_hash FROM chunks ORDER BY source, position")
+            for row in rows:
+                digests.setdefault(row["source"], hashlib.sha256()).update(row["content_hash"].encode("ascii"))
+        return {source: digest.hexdigest() for source, digest in digests.items()}
+
+    def section_chunks(self, sources: List[str]) -> Dict[str, List[tuple]]:
+        """(chunk_id, content_hash) rows of each of `sources`, in position order."""
+        chunks = {source: [] for source in sources}
+        with self._lock:
+            for source in sources:
+                rows = self._conn.execute(
+                    "SELECT id, content_hash FROM chunks WHERE source = ? ORDER BY position", (source,)
+                ).fetchall()
+                chunks[source] = [(row["id"], row["content_hash"]) for row in rows]
+        return chunks
+
+    def chunk_ids_page(self, after: Optional[str] = None, limit: int = 100) -> List[str]:
+        """Chunk ids in id order, starting after `after` (keyset pagination)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM chunks WHERE id > ? ORDER BY id LIMIT ?", (after or "", limit)
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    def rebuild(self, collection, batch_size: int = 1000) -> int:
+        """
+        Catalog sources that are in `collection` but not here (knowledge
+        bases ingested before the catalog existed). Their page hash is left
+        empty, so the next ingest of such a source re-diffs its chunks.
+        Returns the number of sources added.
+        """
+        with self._lock:
+            known = {row["source"] for row in self._conn.execute("SELECT source FROM sources")}
+
+        found = {}  # source -> {"url", "chunks": [(id, position, hash)], "first": (position, text)}
+        offset = 0
+        while True:
+            page = collection.get(limit=batch_size, offset=offset, include=["documents", "metadatas"])
+            if not page["ids"]:
+                break
+            for chunk_id, document, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                metadata = metadata or {}
+                source = metadata.get("source", "unknown")
+                if source in known:
+                    continue
+                entry = found.setdefault(source, {"url": metadata.get("url"), "chunks": [], "first": None, "bytes": 0})
+                entry["bytes"] += len((document or "").encode("utf-8"))
+                position = metadata.get("chunk", len(entry["chunks"]))
+                entry["chunks"].append((chunk_id, position, metadata.get("content_hash") or content_hash(document or "")))
+                if entry["first"] is None or position < entry["first"][0]:
+                    entry["first"] = (position, document or "")
+            offset += len(page["ids"])
+
+        for source, entry in found.items():
+            # Byte size counts chunk text, so it includes the chunker's overlap
+            self.record_source(source, entry["url"], "", entry["chunks"], preview=entry["first"][1],
+                               byte_size=entry["bytes"])
+        return len(found)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,281 @@
+import re
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from backend.config.settings import CHUNKER, CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS
+
+_APPROX_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'`(\[])")
+_HEADING_RE = re.compile(r"^#{1,6}\s")
+# No unit may average more characters per token than this
+MAX_CHARS_PER_TOKEN = 8
+
+
+def approx_token_count(text: str) -> int:
+    """Word/punctuation count; a close lower bound for WordPiece tokens."""
+    return len(_APPROX_TOKEN_RE.findall(text))
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split prose on sentence-ending punctuation followed by a new sentence."""
+    return _SENTENCE_END_RE.split(text)
+
+
+def tokenizer_counter(tokenizer) -> Callable[[str], int]:
+    """Token counter backed by a HuggingFace tokenizer (e.g. SentenceTransformer.tokenizer)."""
+    def count(text: str) -> int:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+    return count
+
+
+def iter_lines(segments: Iterable[str], max_chars: Optional[int] = None) -> Iterator[str]:
+    """
+    Split a stream of text segments into lines without joining the segments.
+    Lines longer than `max_chars` are broken at the last space before the
+    limit, so text without newlines is still streamed.
+    """
+    partial = ""
+    for segment in segments:
+        lines = (partial + segment).split("\n")
+        partial = lines.pop()
+        yield from lines
+        while max_chars and len(partial) > max_chars:
+            cut = partial.rfind(" ", 0, max_chars) + 1 or max_chars
+            yield partial[:cut]
+            partial = partial[cut:]
+    if partial:
+        yield partial
+
+
+class FixedSizeChunker:
+    """The original chunker: slice every `chunk_size` characters, no overlap."""
+
+    def __init__(self, chunk_size: int = 1000):
+        self.chunk_size = chunk_size
+
+    def iter_chunks(self, segments: Iterable[str]) -> Iterator[str]:
+        buffer = ""
+        for segment in segments:
+            buffer += segment
+            offset = 0
+            while len(buffer) - offset >= self.chunk_size:
+                yield buffer[offset:offset + self.chunk_size]
+                offset += self.chunk_size
+            # Trim once per segment rather than once per chunk
+            buffer = buffer[offset:]
+        if buffer:
+            yield buffer
+
+
+class StructuredChunker:
+    """
+    Sentence, heading and code-block aware chunker with token-counted limits.
+
+    Input is streamed line by line and turned into units:
+      - markdown headings ("# ...") start a new chunk
+      - fenced code blocks (```) are kept whole when they fit, otherwise
+        split on line boundaries and rejoined line by line within a chunk
+      - paragraphs are split into sentences
+      - anything still too long is split into words, and single words
+        into characters
+    Units are packed greedily into chunks of at most `max_tokens`; the last
+    `overlap_tokens` worth of units is repeated at the start of the next
+    chunk within the same section. Every unit is token-counted once, so the
+    whole pass is linear in the input size.
+    """
+
+    def __init__(self, max_tokens: int = CHUNK_MAX_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+                 count_tokens: Optional[Callable[[str], int]] = None, special_tokens: int = 2):
+        # Leave room for [CLS]/[SEP] added by the embedding model
+        self.max_tokens = max(8, max_tokens - special_tokens)
+        self.overlap_tokens = max(0, min(overlap_tokens, self.max_tokens // 2))
+        self.count_tokens = count_tokens or approx_token_count
+
+    def _tokens(self, text: str) -> int:
+        """
+        Token count, but at least one token per MAX_CHARS_PER_TOKEN
+        characters: runs without spaces (minified code, base64, URLs) count
+        as one word-level token however long they are.
+        """
+        return max(self.count_tokens(text), -(-len(text) // MAX_CHARS_PER_TOKEN))
+
+    # -------- unit extraction --------
+
+    def _iter_blocks(self, segments: Iterable[str]) -> Iterator[Tuple[str, str, Optional[int], int]]:
+        """
+        Yield (kind, text, tokens, block) blocks: heading, code or paragraph.
+        A paragraph or code block that would grow past max_tokens is yielded
+        in pieces before the line that overflows it, so unbroken text or an
+        unterminated fence never buffers the whole document; `block`
+        numbers the source block, so its pieces can be joined back up. Code
+        pieces come with their token count; the rest are counted later.
+        """
+        paragraph: List[str] = []
+        code: Optional[List[str]] = None
+        buffered = 0
+        block = 0
+
+        for line in iter_lines(segments, max_chars=self.max_tokens * MAX_CHARS_PER_TOKEN):
+            stripped = line.strip()
+
+            if code is not None:
+                tokens = self._tokens(line)
+                if code and buffered + tokens > self.max_tokens:
+                    yield "code", "\n".join(code), buffered, block
+                    code, buffered = [], 0
+                code.append(line)
+                buffered += tokens
+                if stripped.startswith("```"):
+                    yield "code", "\n".join(code), buffered, block
+                    code, buffered = None, 0
+                continue
+
+            if stripped.startswith("```"):
+                if paragraph:
+                    yield "paragraph", " ".join(paragraph), None, block
+                    paragraph = []
+                code, buffered, block = [line], self._tokens(line), block + 1
+            elif _HEADING_RE.match(stripped):
+                if paragraph:
+                    yield "paragraph", " ".join(paragraph), None, block
+                    paragraph = []
+                block += 1
+                yield "heading", stripped, None, block
+            elif not stripped:
+                if paragraph:
+                    yield "paragraph", " ".join(paragraph), None, block
+                    paragraph = []
+            else:
+                # approx_token_count is a lower bound, so this never splits a paragraph that fits
+                tokens = max(approx_token_count(stripped), -(-len(stripped) // MAX_CHARS_PER_TOKEN))
+                if paragraph and buffered + tokens > self.max_tokens:
+                    yield "paragraph", " ".join(paragraph), None, block
+                    paragraph, buffered = [], 0
+                elif not paragraph:
+                    block, buffered = block + 1, 0
+                paragraph.append(stripped)
+                buffered += tokens
+
+        if code:
+            yield "code", "\n".join(code), buffered, block
+        if paragraph:
+            yield "paragraph", " ".join(paragraph), None, block
+
+    def _hard_cut(self, word: str, tokens: int) -> Iterator[Tuple[str, int]]:
+        """Cut a single oversized word into pieces of at most max_tokens, by characters."""
+        size = max(1, len(word) * self.max_tokens // tokens)
+        start = 0
+        while start < len(word):
+            piece = word[start:start + size]
+            piece_tokens = self._tokens(piece)
+            while piece_tokens > self.max_tokens and len(piece) > 1:
+                piece = piece[:max(1, len(piece) * self.max_tokens // piece_tokens)]
+                piece_tokens = self._tokens(piece)
+            yield piece, piece_tokens
+            start += len(piece)
+
+    def _split_oversized(self, text: str, separator: str) -> Iterator[Tuple[str, int]]:
+        """Split a unit that exceeds max_tokens on `separator` (lines, then words, then characters)."""
+        parts = text.split(separator)
+        current, current_tokens = [], 0
+        for part in parts:
+            tokens = self._tokens(part)
+            if tokens > self.max_tokens:
+                # A single line that is still too long falls back to words,
+                # and a single word to characters
+                if current:
+                    yield separator.join(current), current_tokens
+                    current, current_tokens = [], 0
+                if separator == " ":
+                    yield from self._hard_cut(part, tokens)
+                else:
+                    yield from self._split_oversized(part, " ")
+                continue
+            if current and current_tokens + tokens > self.max_tokens:
+                yield separator.join(current), current_tokens
+                current, current_tokens = [], 0
+            current.append(part)
+            current_tokens += tokens
+        if current:
+            yield separator.join(current), current_tokens
+
+    def _iter_units(self, segments: Iterable[str]) -> Iterator[Tuple[str, str, int, int]]:
+        """Yield (kind, text, tokens, block) units no larger than max_tokens."""
+        for kind, text, tokens, block in self._iter_blocks(segments):
+            if kind == "paragraph":
+                pieces = [(piece, None) for piece in split_sentences(text)]
+            else:
+                pieces = [(text, tokens)]
+
+            for piece, tokens in pieces:
+                if tokens is None:
+                    tokens = self._tokens(piece)
+                if tokens <= self.max_tokens:
+                    yield kind, piece, tokens, block
+                else:
+                    separator = "\n" if kind == "code" else " "
+                    for part, part_tokens in self._split_oversized(piece, separator):
+                        yield kind, part, part_tokens, block
+
+    # -------- packing --------
+
+    @staticmethod
+    def _join(units: List[Tuple[str, str, int, int]]) -> str:
+        out = []
+        out_kind, out_block = None, None
+        for kind, text, _, block in units:
+            if out:
+                if kind == "code" and out_kind == "code" and block == out_block:
+                    out.append("\n")
+                elif kind in ("heading", "code") or out_kind in ("heading", "code"):
+                    out.append("\n\n")
+                else:
+                    out.append(" ")
+            out.append(text)
+            out_kind, out_block = kind, block
+        return "".join(out)
+
+    def iter_chunks(self, segments: Iterable[str]) -> Iterator[str]:
+        current: List[Tuple[str, str, int, int]] = []
+        current_tokens = 0
+        fresh = 0  # units in `current` that are not overlap from the previous chunk
+
+        for unit in self._iter_units(segments):
+            kind, _, tokens, _ = unit
+
+            if kind == "heading":
+                # New section: flush and don't carry overlap across it
+                if fresh:
+                    yield self._join(current)
+                current, current_tokens, fresh = [], 0, 0
+            elif current and current_tokens + tokens > self.max_tokens:
+                if fresh:
+                    yield self._join(current)
+                # Carry trailing units (up to overlap_tokens) into the next chunk
+                overlap, overlap_tokens = [], 0
+                for prev in reversed(current):
+                    if overlap_tokens + prev[2] > self.overlap_tokens or overlap_tokens + prev[2] + tokens > self.max_tokens:
+                        break
+                    overlap.insert(0, prev)
+                    overlap_tokens += prev[2]
+                current, current_tokens, fresh = overlap, overlap_tokens, 0
+
+            current.append(unit)
+            current_tokens += tokens
+            fresh += 1
+
+        if fresh:
+            yield self._join(current)
+
+
+def make_chunker(embedder=None, kind: str = CHUNKER):
+    """
+    Build the configured chunker. With an embedder that exposes a
+    tokenizer (SentenceTransformer does), token limits are counted with the
+    embedding model's own tokenizer.
+    """
+    if kind == "fixed":
+        return FixedSizeChunker()
+
+    tokenizer = getattr(embedder, "tokenizer", None)
+    count_tokens = tokenizer_counter(tokenizer) if tokenizer is not None else None
+    return StructuredChunker(count_tokens=count_tokens)
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from backend.config.settings import (
+    CHROMA_DB_PATH,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_BYPASS,
+    LLM_CACHE_MAX_ENTRIES,
+)
+
+LLM_CACHE_PATH = os.path.join(os.path.dirname(CHROMA_DB_PATH), "llm_cache.sqlite3")
+
+
+class CompletionCache:
+    """
+    Content-addressed store of LLM completions in a local SQLite file.
+
+    Keys are the SHA-256 of (model, prompt, generation params). When the
+    table grows past `max_entries`, the least recently used rows are deleted.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                completion TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_completions_last_access ON completions(last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, prompt: str, params: dict) -> str:
+        blob = json.dumps({"model": model, "prompt": prompt, "params": params}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT completion FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE completions SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, model: str, completion: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, model, completion, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, model, completion, now, now),
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM completions WHERE key IN (SELECT key FROM completions ORDER BY last_access LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+        return {"path": self.path, "entries": count, "max_entries": self.max_entries}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedLLM:
+    """
+    Wraps OpenRouterLLM/MockLLM and memoizes invoke()/ainvoke() results in
+    a CompletionCache. Streaming calls pass straight through.
+
+    With `bypass=True` (or `bypass_cache=True` per call) cached results are
+    ignored but fresh completions are still written back, which refreshes
+    the cache.
+    """
+
+    def __init__(self, llm, cache: CompletionCache, bypass: bool = LLM_CACHE_BYPASS):
+        self.llm = llm
+        self.cache = cache
+        self.bypass = bypass
+        self.model = getattr(llm, "model", type(llm).__name__)
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, prompt: str) -> str:
+        return self.cache.make_key(self.model, prompt, getattr(self.llm, "generation_params", {}))
+
+    def _lookup(self, key: str, bypass_cache: bool) -> Optional[str]:
+        if self.bypass or bypass_cache:
+            return None
+        completion = self.cache.get(key)
+        if completion is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return completion
+
+    def invoke(self, prompt: str, bypass_cache: bool = False) -> str:
+        key = self._key(prompt)
+        completion = self._lookup(key, bypass_cache)
+        if completion is not None:
+            return completion
+        completion = self.llm.invoke(prompt)
+        if completion:
+            self.cache.put(key, self.model, completion)
+        return completion
+
+    async def ainvoke(self, prompt: str, bypass_cache: bool = False) -> str:
+        key = self._key(prompt)
+        completion = self._lookup(key, bypass_cache)
+        if completion is not None:
+            return completion
+        completion = await self.llm.ainvoke(prompt)
+        if completion:
+            self.cache.put(key, self.model, completion)
+        return completion
+
+    def stream(self, prompt: str):
+        return self.llm.stream(prompt)
+
+    def astream(self, prompt: str):
+        return self.llm.astream(prompt)
+
+    def __call__(self, prompt: str) -> str:
+        return self.invoke(prompt)
+
+    def close(self):
+        self.llm.close()
+
+
+_completion_cache = None
+_completion_cache_lock = threading.Lock()
+
+
+def get_completion_cache() -> CompletionCache:
+    """Return the process-wide completion cache."""
+    global _completion_cache
+    with _completion_cache_lock:
+        if _completion_cache is None:
+            _completion_cache = CompletionCache()
+        return _completion_cache
+
+
+def with_completion_cache(llm):
+    """Wrap `llm` in a CachedLLM unless LLM_CACHE_ENABLED is off."""
+    if not LLM_CACHE_ENABLED:
+        return llm
+    return CachedLLM(llm, get_completion_cache())
@@ -0,0 +1,35 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, List, Optional
+
+
+def bounded_map(fn: Callable, items: Iterable, max_workers: int = 4, on_result: Optional[Callable] = None) -> List:
+    """
+    Apply `fn` to every item using at most `max_workers` threads.
+
+    Results are returned in input order regardless of completion order.
+    `on_result(index, item, result)` is called in the calling thread as
+    each item finishes, so callbacks never run concurrently with each
+    other (useful for incremental, crash-resumable writes).
+
+    The first exception raised by `fn` propagates after in-flight work is
+    finished; pending items are cancelled.
+    """
+    items = list(items)
+    results = [None] * len(items)
+    if not items:
+        return results
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as pool:
+        futures = {pool.submit(fn, item): i for i, item in enumerate(items)}
+        try:
+            for future in as_completed(futures):
+                i = futures[future]
+                results[i] = future.result()
+                if on_result is not None:
+                    on_result(i, items[i], results[i])
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    return results
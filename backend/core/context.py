@@ -0,0 +1,189 @@
+import re
+from typing import Callable, List, Optional
+
+from backend.core.chunking import approx_token_count, split_sentences
+from backend.core.sparse_index import tokenize
+from backend.config.settings import CONTEXT_TOKEN_BUDGET, CONTEXT_TOKEN_BUDGETS, CONTEXT_DEDUPE_THRESHOLD
+
+_SHINGLE_SIZE = 3
+_BLOCK_RE = re.compile(r"(```.*?```)", re.S)
+
+
+def context_budget(llm=None, default: int = CONTEXT_TOKEN_BUDGET) -> int:
+    """Context token budget for the model behind `llm` (CONTEXT_TOKEN_BUDGETS)."""
+    model = getattr(llm, "model", None)
+    return int(CONTEXT_TOKEN_BUDGETS.get(model, default))
+
+
+def _shingles(text: str) -> set:
+    words = text.lower().split()
+    if len(words) < _SHINGLE_SIZE:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + _SHINGLE_SIZE]) for i in range(len(words) - _SHINGLE_SIZE + 1)}
+
+
+def _overlap_length(left: str, right: str, probe_chars: int = 24, max_chars: int = 4000) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right`."""
+    probe = right[:probe_chars]
+    if not probe:
+        return 0
+    start = max(0, len(left) - max_chars)
+    idx = left.find(probe, start)
+    while idx != -1:
+        if right.startswith(left[idx:]):
+            return len(left) - idx
+        idx = left.find(probe, idx + 1)
+    return 0
+
+
+class ContextAssembler:
+    """
+    Turns ranked retrieval hits into prompt context that fits a token budget.
+
+    Passages are dicts {"document", "metadata"} in relevance order. They are:
+      1. deduplicated: a passage whose word 3-gram Jaccard similarity with an
+         already kept one is >= `dedupe_threshold` is dropped
+      2. merged: chunks of the same source with consecutive "chunk" positions
+         are joined, with the chunker's overlap removed
+      3. pruned: with a query, sentences sharing no term with it are dropped
+         unless they neighbour one that does (code blocks and headings are
+         kept, as are passages with no matching sentence at all)
+      4. packed best-first into `max_tokens`; the passage that doesn't fit
+         is cut at a sentence boundary
+    Returns [{"source", "text", "metadata", "chunks", "tokens"}] in relevance
+    order.
+    """
+
+    def __init__(self, max_tokens: int = CONTEXT_TOKEN_BUDGET, count_tokens: Optional[Callable[[str], int]] = None,
+                 dedupe_threshold: float = CONTEXT_DEDUPE_THRESHOLD, min_tail_tokens: int = 32):
+        self.max_tokens = max_tokens
+        self.count_tokens = count_tokens or approx_token_count
+        self.dedupe_threshold = dedupe_threshold
+        self.min_tail_tokens = min_tail_tokens
+
+    # -------- steps --------
+
+    def _dedupe(self, passages: List[dict]) -> List[dict]:
+        kept, kept_shingles = [], []
+        for passage in passages:
+            shingles = _shingles(passage["document"])
+            duplicate = any(
+                len(shingles & other) / max(1, len(shingles | other)) >= self.dedupe_threshold
+                for other in kept_shingles
+            )
+            if not duplicate:
+                kept.append(passage)
+                kept_shingles.append(shingles)
+        return kept
+
+    @staticmethod
+    def _merge_adjacent(passages: List[dict]) -> List[dict]:
+        groups = []  # {"source", "metadata", "parts": {position: text}, "rank"}
+        by_source = {}
+        for rank, passage in enumerate(passages):
+            metadata = passage.get("metadata") or {}
+            source = metadata.get("source", "unknown")
+            position = metadata.get("chunk")
+            group = None
+            if position is not None:
+                for candidate in by_source.get(source, []):
+                    if position - 1 in candidate["parts"] or position + 1 in candidate["parts"]:
+                        group = candidate
+                        break
+            if group is None:
+                group = {"source": source, "metadata": metadata, "parts": {}, "rank": rank}
+                groups.append(group)
+                by_source.setdefault(source, []).append(group)
+            group["parts"][position if position is not None else -rank - 1] = passage["document"]
+
+        merged = []
+        for group in groups:
+            positions = sorted(group["parts"])
+            text = group["parts"][positions[0]]
+            for position in positions[1:]:
+                part = group["parts"][position]
+                overlap = _overlap_length(text, part)
+                text += part[overlap:] if overlap else "\n\n" + part
+            merged.append({
+                "source": group["source"],
+                "metadata": group["metadata"],
+                "chunks": [p for p in positions if p >= 0],
+                "text": text,
+            })
+        return merged
+
+    @staticmethod
+    def _units(text: str) -> List[tuple]:
+        """(is_protected, text) units: code blocks and headings are protected."""
+        units = []
+        for i, block in enumerate(_BLOCK_RE.split(text)):
+            if i % 2:
+                units.append((True, block))
+                continue
+            for paragraph in block.split("\n\n"):
+                paragraph = paragraph.strip()
+                if not paragraph:
+                    continue
+                if paragraph.startswith("#"):
+                    units.append((True, paragraph))
+                else:
+                    units.extend((False, sentence) for sentence in split_sentences(paragraph))
+        return units
+
+    @staticmethod
+    def _join(units: List[tuple]) -> str:
+        out = []
+        for i, (protected, unit) in enumerate(units):
+            if i:
+                out.append("\n\n" if protected or units[i - 1][0] else " ")
+            out.append(unit)
+        return "".join(out)
+
+    def _prune(self, text: str, query_terms: set) -> str:
+        units = self._units(text)
+        matches = [not protected and bool(query_terms & set(tokenize(unit))) for protected, unit in units]
+        if not any(matches):
+            return text
+
+        keep = []
+        for i, (protected, unit) in enumerate(units):
+            near_match = matches[i] or (i > 0 and matches[i - 1]) or (i + 1 < len(units) and matches[i + 1])
+            if protected or near_match:
+                keep.append((protected, unit))
+        return self._join(keep)
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        out, used = [], 0
+        for protected, unit in self._units(text):
+            tokens = self.count_tokens(unit)
+            if used + tokens > max_tokens:
+                break
+            out.append((protected, unit))
+            used += tokens
+        return self._join(out)
+
+    # -------- entry point --------
+
+    def assemble(self, passages: List[dict], query: Optional[str] = None, max_tokens: Optional[int] = None) -> List[dict]:
+        budget = self.max_tokens if max_tokens is None else max_tokens
+        passages = [p for p in passages if p.get("document")]
+        merged = self._merge_adjacent(self._dedupe(passages))
+
+        query_terms = set(tokenize(query)) if query else set()
+        packed, used = [], 0
+        for passage in merged:
+            text = self._prune(passage["text"], query_terms) if query_terms else passage["text"]
+            tokens = self.count_tokens(text)
+            remaining = budget - used
+            if tokens > remaining:
+                if remaining < self.min_tail_tokens:
+                    break
+                text = self._truncate(text, remaining)
+                if not text:
+                    break
+                tokens = self.count_tokens(text)
+            packed.append(dict(passage, text=text, tokens=tokens))
+            used += tokens
+            if used >= budget:
+                break
+        return packed
@@ -0,0 +1,167 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+from chromadb.utils.embedding_functions import register_embedding_function
+
+from backend.core.telemetry import get_logger, span
+from backend.config.settings import (
+    EMBEDDING_MODEL,
+    EMBEDDING_BACKEND,
+    EMBEDDING_ONNX_FILE,
+    EMBED_BATCH_SIZE,
+    EMBED_QUERY_CACHE_SIZE,
+)
+
+logger = get_logger(__name__)
+
+
+@register_embedding_function
+class EmbeddingService(EmbeddingFunction[Documents]):
+    """
+    The one embedding model used for both indexing and querying.
+
+    It is registered as the collection's Chroma embedding function, so
+    `query_texts=` lookups and documents added without embeddings go through
+    the same model as the ingestion pipeline instead of Chroma's bundled
+    default. Callers that embed explicitly use:
+      - encode(texts): document embeddings, batched
+      - embed_query(texts): query embeddings, served from an LRU cache
+        keyed by the exact query text
+
+    backend="onnx" runs the model through ONNX Runtime on CPU;
+    `onnx_file` selects a specific export such as an int8-quantized one
+    (e.g. "onnx/model_qint8_avx512_vnni.onnx"). If the ONNX backend can't
+    be loaded, the default PyTorch backend is used instead.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL, backend: str = EMBEDDING_BACKEND,
+                 onnx_file: str = EMBEDDING_ONNX_FILE, batch_size: int = EMBED_BATCH_SIZE,
+                 cache_size: int = EMBED_QUERY_CACHE_SIZE):
+        self.model_name = model_name
+        self.backend = backend
+        self.onnx_file = onnx_file
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+
+        self._model = self._load_model()
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _load_model(self):
+        # Imported here so importing this module doesn't pull in torch
+        from sentence_transformers import SentenceTransformer
+
+        if self.backend == "onnx":
+            model_kwargs = {"file_name": self.onnx_file} if self.onnx_file else None
+            try:
+                return SentenceTransformer(self.model_name, backend="onnx", model_kwargs=model_kwargs)
+            except Exception as e:
+                logger.warning("⚠️ ONNX embedding backend unavailable (%s), falling back to PyTorch", e)
+                self.backend = "torch"
+        return SentenceTransformer(self.model_name)
+
+    @property
+    def tokenizer(self):
+        """The model's tokenizer, used by the chunker to count tokens."""
+        return getattr(self._model, "tokenizer", None)
+
+    # -------- embedding --------
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Embed documents in batches of `batch_size`."""
+        if not texts:
+            return np.zeros((0, self.dimension()), dtype=np.float32)
+        with span("embed"):
+            return np.asarray(self._model.encode(list(texts), batch_size=self.batch_size))
+
+    def embed_query(self, input: Documents) -> Embeddings:
+        """
+        Embed queries, reusing cached vectors for repeated questions. All
+        cache misses are encoded in one batch.
+        """
+        texts = list(input)
+        vectors = [None] * len(texts)
+        missing = {}
+
+        with self._cache_lock:
+            for i, text in enumerate(texts):
+                cached = self._cache.get(text)
+                if cached is not None:
+                    self._cache.move_to_end(text)
+                    vectors[i] = cached
+                    self.hits += 1
+                else:
+                    missing.setdefault(text, []).append(i)
+                    self.misses += 1
+
+        if missing:
+            encoded = self.encode(list(missing))
+            with self._cache_lock:
+                for text, vector in zip(missing, encoded):
+                    for i in missing[text]:
+                        vectors[i] = vector
+                    if self.cache_size > 0:
+                        self._cache[text] = vector
+                        self._cache.move_to_end(text)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return vectors
+
+    def __call__(self, input: Documents) -> Embeddings:
+        return list(self.encode(list(input)))
+
+    def dimension(self) -> int:
+        return self._model.get_sentence_embedding_dimension()
+
+    def stats(self) -> dict:
+        with self._cache_lock:
+            return {
+                "backend": self.backend,
+                "query_cache_entries": len(self._cache),
+                "query_cache_hits": self.hits,
+                "query_cache_misses": self.misses,
+            }
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+
+    # -------- Chroma embedding function protocol --------
+
+    @staticmethod
+    def name() -> str:
+        return "fastapi_assistant_embeddings"
+
+    def default_space(self) -> str:
+        return "l2"
+
+    def get_config(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name, "backend": self.backend, "onnx_file": self.onnx_file}
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "EmbeddingService":
+        return EmbeddingService(
+            model_name=config.get("model_name", EMBEDDING_MODEL),
+            backend=config.get("backend", EMBEDDING_BACKEND),
+            onnx_file=config.get("onnx_file", EMBEDDING_ONNX_FILE),
+        )
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_embedding_service() -> EmbeddingService:
+    """Return the process-wide embedding service, loading the model on first use."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = EmbeddingService()
+    return _service
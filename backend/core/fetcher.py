@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from backend.config.settings import (
+    SCRAPE_MAX_WORKERS,
+    SCRAPE_PER_HOST_LIMIT,
+    SCRAPE_RETRIES,
+    SCRAPE_BACKOFF,
+    SCRAPE_TIMEOUT,
+    HTML_CACHE_DIR,
+)
+from backend.core.telemetry import get_logger
+
+logger = get_logger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class PageFetcher:
+    """
+    Pooled, concurrent HTTP fetcher for documentation pages.
+
+    - one requests.Session with a connection pool sized for `max_workers`
+    - at most `per_host_limit` concurrent requests per host
+    - retries with exponential backoff on connection errors, 429 and 5xx
+      (honouring Retry-After)
+    - raw HTML cached on disk together with its ETag/Last-Modified, so
+      conditional requests work even without other state and a 304 still
+      yields the page body
+
+    fetch() returns a dict:
+        {"url", "status", "html", "etag", "last_modified", "not_modified", "from_cache"}
+    """
+
+    def __init__(self, max_workers: int = SCRAPE_MAX_WORKERS, per_host_limit: int = SCRAPE_PER_HOST_LIMIT,
+                 retries: int = SCRAPE_RETRIES, backoff: float = SCRAPE_BACKOFF,
+                 timeout: float = SCRAPE_TIMEOUT, cache_dir: Optional[str] = HTML_CACHE_DIR):
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._host_limits = defaultdict(lambda: threading.Semaphore(per_host_limit))
+        self._host_limits_lock = threading.Lock()
+
+    # -------- on-disk raw HTML cache --------
+
+    def _cache_paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key + ".html"), os.path.join(self.cache_dir, key + ".json")
+
+    def _read_cache(self, url: str) -> Optional[dict]:
+        if not self.cache_dir:
+            return None
+        html_path, meta_path = self._cache_paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(html_path, "r", encoding="utf-8") as f:
+                meta["html"] = f.read()
+            return meta
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self, url: str, html: str, etag: Optional[str], last_modified: Optional[str]):
+        if not self.cache_dir:
+            return
+        html_path, meta_path = self._cache_paths(url)
+        # Write body first and rename, so a crash never leaves a half-written page
+        tmp_path = html_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(html)
+        os.replace(tmp_path, html_path)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "etag": etag, "last_modified": last_modified, "fetched_at": time.time()}, f)
+
+    # -------- fetching --------
+
+    def _host_limit(self, url: str) -> threading.Semaphore:
+        host = urlsplit(url).netloc
+        with self._host_limits_lock:
+            return self._host_limits[host]
+
+    def _get(self, url: str, headers: dict) -> requests.Response:
+        """GET with retries and exponential backoff."""
+        for attempt in range(self.retries + 1):
+            try:
+                with self._host_limit(url):
+                    response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * (2 ** attempt)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    return response
+                retry_after = response.headers.get("Retry-After", "")
+                delay = float(retry_after) if retry_after.isdigit() else self.backoff * (2 ** attempt)
+            logger.warning("🔁 Retrying %s in %.1fs (attempt %d/%d)", url, delay, attempt + 2, self.retries + 1)
+            time.sleep(delay)
+
+    def fetch(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> dict:
+        """
+        Conditional GET of one page. Validators default to the cached copy's.
+        """
+        cached = self._read_cache(url)
+        if cached and not etag and not last_modified:
+            etag, last_modified = cached.get("etag"), cached.get("last_modified")
+
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        response = self._get(url, headers)
+
+        if response.status_code == 304:
+            return {
+                "url": url,
+                "status": 304,
+                "html": cached["html"] if cached else None,
+                "etag": etag,
+                "last_modified": last_modified,
+                "not_modified": True,
+                "from_cache": cached is not None,
+            }
+
+        response.raise_for_status()
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        self._write_cache(url, response.text, etag, last_modified)
+
+        return {
+            "url": url,
+            "status": response.status_code,
+            "html": response.text,
+            "etag": etag,
+            "last_modified": last_modified,
+            "not_modified": False,
+            "from_cache": False,
+        }
+
+    def fetch_many(self, urls: Iterable[str], validators: Optional[Dict[str, tuple]] = None) -> Iterator[dict]:
+        """
+        Fetch pages concurrently and yield results as they complete, so the
+        caller can parse and embed one page while others are downloading.
+
+        `validators` maps url -> (etag, last_modified). A failed fetch yields
+        {"url": ..., "error": exception} instead of raising.
+        """
+        validators = validators or {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {
+                pool.submit(self.fetch, url, *validators.get(url, (None, None))): url
+                for url in urls
+            }
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    yield future.result()
+                except Exception as e:
+                    yield {"url": url, "error": e}
+
+    def close(self):
+        self.session.close()
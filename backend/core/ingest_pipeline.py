@@ -0,0 +1,275 @@
+import hashlib
+import queue
+import threading
+from typing import Callable, Iterable, List, Optional
+
+from backend.core.catalog import PREVIEW_CHARS, content_hash
+from backend.config.settings import EMBED_BATCH_SIZE, WRITE_BATCH_SIZE, INGEST_QUEUE_SIZE
+
+_DONE = object()
+
+
+class IngestionPipeline:
+    """
+    Streaming ingestion: chunk stage -> embed stage -> write stage, connected
+    by bounded queues so a slow stage applies backpressure upstream and
+    memory stays flat however much is ingested.
+
+    - chunk stage (caller's producer thread) walks the input documents,
+      chunks them and diffs every chunk against the catalog; only new or
+      changed chunks go downstream
+    - embed stage groups chunks from *any* documents into fixed-size
+      batches for the encoder
+    - write stage bulk-upserts embedded chunks into Chroma (and the BM25
+      index) and, once all of a document's chunks are written, deletes its
+      stale chunks and records it in the catalog
+
+    Documents are dicts:
+        {"source": str, "text": str | None, "segments": iterable of str | None,
+         "url": str | None, "etag": ..., "last_modified": ...,
+         "unchanged": bool (skip, already known), "error": str (report only)}
+    """
+
+    def __init__(self, agent, embed_batch_size: int = EMBED_BATCH_SIZE,
+                 write_batch_size: int = WRITE_BATCH_SIZE, queue_size: int = INGEST_QUEUE_SIZE):
+        self.agent = agent
+        self.embed_batch_size = embed_batch_size
+        self.write_batch_size = write_batch_size
+        # Chunk queue is measured in chunks, the embedded queue in batches
+        self._chunks = queue.Queue(maxsize=embed_batch_size * queue_size)
+        self._embedded = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._stop = threading.Event()
+
+    # -------- stages --------
+
+    def _put(self, q: queue.Queue, item):
+        """Blocking put that gives up if another stage failed."""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue):
+        """Blocking get that returns _DONE if another stage failed."""
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _fail(self, e: BaseException):
+        if self._error is None:
+            self._error = e
+        self._stop.set()
+
+    def _chunk_stage(self, documents: Iterable[dict]):
+        agent = self.agent
+        catalog = agent.catalog
+        try:
+            for doc in documents:
+                if self._stop.is_set():
+                    return
+                source = doc["source"]
+
+                if doc.get("error") or doc.get("unchanged"):
+                    self._put(self._chunks, ("doc", doc))
+                    continue
+
+                known = catalog.get_source(source)
+                text = doc.get("text")
+                if text is not None and known and known["content_hash"] == content_hash(text):
+                    self._put(self._chunks, ("doc", dict(doc, unchanged=True)))
+                    continue
+
+                segments = [text] if text is not None else doc["segments"]
+                previous_hashes = catalog.get_chunk_hashes(source)
+                existing_ids = set(previous_hashes) or agent._existing_chunk_ids(source)
+                page_digest = hashlib.sha256()
+                chunk_rows = []
+                changed = 0
+                preview = None
+                byte_size = 0
+
+                def hashed(segments):
+                    nonlocal byte_size
+                    for segment in segments:
+                        encoded = segment.encode("utf-8")
+                        page_digest.update(encoded)
+                        byte_size += len(encoded)
+                        yield segment
+
+                for position, chunk in enumerate(agent.iter_chunks(hashed(segments))):
+                    chunk_id = f"{source}_{position}"
+                    h = content_hash(chunk)
+                    chunk_rows.append((chunk_id, position, h))
+                    if preview is None:
+                        preview = chunk[:PREVIEW_CHARS]
+                    if previous_hashes.get(chunk_id) == h:
+                        continue
+
+                    metadata = {"source": source, "chunk": position, "content_hash": h}
+                    if doc.get("url"):
+                        metadata["url"] = doc["url"]
+                    changed += 1
+                    if not self._put(self._chunks, ("chunk", (chunk_id, chunk, metadata))):
+                        return
+
+                seen = {row[0] for row in chunk_rows}
+                self._put(self._chunks, ("doc", dict(
+                    doc,
+                    text=None,
+                    segments=None,
+                    page_hash=page_digest.hexdigest(),
+                    chunk_rows=chunk_rows,
+                    preview=preview,
+                    byte_size=byte_size,
+                    changed=changed,
+                    stale_ids=sorted(existing_ids - seen),
+                )))
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._put(self._chunks, _DONE)
+
+    def _embed_stage(self):
+        buffer = []  # chunks and doc markers, in arrival order
+        pending_chunks = 0
+
+        def flush():
+            nonlocal buffer, pending_chunks
+            chunks = [item[1] for item in buffer if item[0] == "chunk"]
+            markers = [item for item in buffer if item[0] == "doc"]
+            if chunks:
+                embeddings = self.agent.embedder.encode([text for _, text, _ in chunks]).tolist()
+                if not self._put(self._embedded, ("batch", chunks, embeddings)):
+                    return False
+            # A doc marker always follows its own chunks, so after the batch
+            # is out every marker in the buffer is complete
+            for marker in markers:
+                if not self._put(self._embedded, marker):
+                    return False
+            buffer, pending_chunks = [], 0
+            return True
+
+        try:
+            while True:
+                item = self._get(self._chunks)
+                if item is _DONE:
+                    break
+                buffer.append(item)
+                if item[0] == "chunk":
+                    pending_chunks += 1
+                    if pending_chunks >= self.embed_batch_size and not flush():
+                        return
+            if not self._stop.is_set():
+                flush()
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._put(self._embedded, _DONE)
+
+    def _write_stage(self, results: List[dict], on_result: Optional[Callable[[dict], None]]):
+        agent = self.agent
+        ids, documents, metadatas, embeddings = [], [], [], []
+        waiting_docs = []
+
+        def flush():
+            nonlocal ids, documents, metadatas, embeddings, waiting_docs
+            if ids:
+                agent.collection.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+                if agent.sparse_index is not None:
+                    agent.sparse_index.add(ids, documents)
+            # Only now are all chunks of these documents durable
+            for doc in waiting_docs:
+                result = self._finalize(doc)
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
+            ids, documents, metadatas, embeddings, waiting_docs = [], [], [], [], []
+
+        try:
+            while True:
+                item = self._get(self._embedded)
+                if item is _DONE:
+                    break
+                if item[0] == "batch":
+                    _, chunks, batch_embeddings = item
+                    for (chunk_id, text, metadata), embedding in zip(chunks, batch_embeddings):
+                        ids.append(chunk_id)
+                        documents.append(text)
+                        metadatas.append(metadata)
+                        embeddings.append(embedding)
+                    if len(ids) >= self.write_batch_size:
+                        flush()
+                else:
+                    waiting_docs.append(item[1])
+            if not self._stop.is_set():
+                flush()
+        except BaseException as e:
+            self._fail(e)
+
+    def _finalize(self, doc: dict) -> dict:
+        agent = self.agent
+        source = doc["source"]
+
+        if doc.get("error"):
+            return {"source": source, "url": doc.get("url"), "error": doc["error"]}
+
+        if doc.get("unchanged"):
+            agent.catalog.touch_source(source, etag=doc.get("etag"), last_modified=doc.get("last_modified"))
+            return agent._unchanged(source, agent.catalog.get_source(source) or {})
+
+        if doc["stale_ids"]:
+            agent.collection.delete(ids=doc["stale_ids"])
+            if agent.sparse_index is not None:
+                agent.sparse_index.delete(doc["stale_ids"])
+
+        agent.catalog.record_source(
+            source, doc.get("url"), doc["page_hash"], doc["chunk_rows"],
+            etag=doc.get("etag"), last_modified=doc.get("last_modified"),
+            preview=doc.get("preview"), byte_size=doc.get("byte_size", 0),
+        )
+        return {
+            "source": source,
+            "unchanged": False,
+            "chunks": len(doc["chunk_rows"]),
+            "embedded": doc["changed"],
+            "deleted": len(doc["stale_ids"]),
+        }
+
+    # -------- entry point --------
+
+    def run(self, documents: Iterable[dict], on_result: Optional[Callable[[dict], None]] = None) -> List[dict]:
+        """
+        Ingest `documents` (any iterable, consumed lazily) and return one
+        stats dict per document in input order. `on_result` is called from
+        the write stage with each document's stats as soon as it is durable.
+        """
+        results = []
+        threads = [
+            threading.Thread(target=self._chunk_stage, args=(documents,), name="ingest-chunk", daemon=True),
+            threading.Thread(target=self._embed_stage, name="ingest-embed", daemon=True),
+            threading.Thread(target=self._write_stage, args=(results, on_result), name="ingest-write", daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Persist the BM25 postings for everything written to Chroma
+        if self.agent.sparse_index is not None:
+            self.agent.sparse_index.flush()
+
+        # Notify even when a later document failed (or the run was
+        # cancelled): whatever was written before that is already visible
+        if any(r.get("embedded") or r.get("deleted") for r in results):
+            self.agent._notify_change()
+
+        if self._error is not None:
+            raise self._error
+        return results
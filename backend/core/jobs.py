@@ -0,0 +1,238 @@
+import json
+import os
+import queue
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Iterable, Optional
+
+from backend.core.telemetry import get_logger
+from backend.config.settings import INGEST_WORKERS, JOBS_DB_PATH, JOB_UPLOAD_DIR
+
+logger = get_logger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobStore:
+    """SQLite-backed job table, so queued/running jobs survive a restart."""
+
+    def __init__(self, path: str = JOBS_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                progress INTEGER NOT NULL DEFAULT 0,
+                total INTEGER NOT NULL DEFAULT 0,
+                message TEXT,
+                result TEXT,
+                error TEXT,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def _to_dict(row) -> dict:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def create(self, kind: str, payload: dict, total: int = 0, job_id: Optional[str] = None) -> dict:
+        now = time.time()
+        job_id = job_id or uuid.uuid4().hex
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload, total, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(payload), total, now, now),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, limit: int = 50) -> list:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def update(self, job_id: str, **fields):
+        if "result" in fields and fields["result"] is not None:
+            fields["result"] = json.dumps(fields["result"])
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def unfinished(self) -> list:
+        """Queued and interrupted (running) jobs, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING)
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobContext:
+    """Handed to job handlers for progress reporting and cancellation checks."""
+
+    def __init__(self, manager: "JobManager", job_id: str):
+        self.manager = manager
+        self.job_id = job_id
+        self.upload_dir = manager.upload_dir_for(job_id)
+
+    def report(self, progress: int, total: Optional[int] = None, message: Optional[str] = None):
+        fields = {"progress": progress}
+        if total is not None:
+            fields["total"] = total
+        if message is not None:
+            fields["message"] = message
+        self.manager.store.update(self.job_id, **fields)
+
+    def cancelled(self) -> bool:
+        job = self.manager.store.get(self.job_id)
+        return bool(job and job["cancel_requested"])
+
+    def check_cancelled(self):
+        if self.cancelled():
+            raise JobCancelled(self.job_id)
+
+    def cancellable(self, items: Iterable):
+        """Yield `items`, checking for cancellation before each one (e.g. the pages of a document)."""
+        for item in items:
+            self.check_cancelled()
+            yield item
+
+
+class JobManager:
+    """
+    Runs jobs from the JobStore on a pool of worker threads.
+
+    `handlers` maps a job kind to `fn(payload, context) -> result dict`.
+    Handlers should call context.report() as they go and
+    context.check_cancelled() between units of work. Jobs left queued or
+    running by a previous process are re-queued on start(), so handlers
+    must be safe to re-run (ingestion is, thanks to content hashing).
+    """
+
+    def __init__(self, handlers: dict, store: Optional[JobStore] = None,
+                 workers: int = INGEST_WORKERS, upload_dir: str = JOB_UPLOAD_DIR):
+        self.handlers = handlers
+        self.store = store or JobStore()
+        self.workers = max(1, workers)
+        self.upload_root = upload_dir
+        self._queue = queue.Queue()
+        self._threads = []
+        self._stopping = threading.Event()
+
+    def upload_dir_for(self, job_id: str) -> str:
+        return os.path.join(self.upload_root, job_id)
+
+    def start(self):
+        if self._threads:
+            return
+        self._stopping.clear()
+
+        resumed = self.store.unfinished()
+        for job_id in resumed:
+            self.store.update(job_id, status=QUEUED, message="Resumed after restart")
+            self._queue.put(job_id)
+        if resumed:
+            logger.info("🔁 Resuming %d unfinished job(s)", len(resumed))
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5):
+        self._stopping.set()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def submit(self, kind: str, payload: dict, total: int = 0, job_id: Optional[str] = None) -> dict:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job = self.store.create(kind, payload, total=total, job_id=job_id)
+        self._queue.put(job["id"])
+        return job
+
+    def new_job_id(self) -> str:
+        """Reserve an id, e.g. to spool uploads into upload_dir_for(id) before submit()."""
+        return uuid.uuid4().hex
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        job = self.store.get(job_id)
+        if job is None or job["status"] in FINISHED:
+            return job
+        self.store.update(job_id, cancel_requested=1)
+        return self.store.get(job_id)
+
+    def _worker(self):
+        while not self._stopping.is_set():
+            job_id = self._queue.get()
+            if job_id is None:
+                break
+            self._run(job_id)
+
+    def _run(self, job_id: str):
+        job = self.store.get(job_id)
+        if job is None or job["status"] in FINISHED:
+            return
+
+        if job["cancel_requested"]:
+            self._finish(job_id, status=CANCELLED, message="Cancelled before start")
+            return
+
+        self.store.update(job_id, status=RUNNING, message="Running")
+        context = JobContext(self, job_id)
+        try:
+            result = self.handlers[job["kind"]](job["payload"], context)
+        except JobCancelled:
+            self._finish(job_id, status=CANCELLED, message="Cancelled")
+        except Exception as e:
+            logger.error("❌ Job %s failed: %s", job_id, e)
+            self._finish(job_id, status=FAILED, error=str(e), message="Failed")
+        else:
+            self._finish(job_id, status=SUCCEEDED, result=result, message="Done")
+
+    def _finish(self, job_id: str, **fields):
+        self.store.update(job_id, **fields)
+        # Spooled uploads are only needed to resume; drop them once finished
+        shutil.rmtree(self.upload_dir_for(job_id), ignore_errors=True)
@@ -0,0 +1,59 @@
+from typing import Iterator, List, Optional
+
+# Projectable chunk fields, in the collection's own include=[...] names
+EXPORT_FIELDS = ("documents", "metadatas", "embeddings")
+_SINGULAR = {"documents": "document", "metadatas": "metadata", "embeddings": "embedding"}
+
+
+def parse_fields(fields: Optional[str], default=("documents", "metadatas")) -> List[str]:
+    """Comma-separated projection, e.g. "documents,metadatas". Ids are always included."""
+    if not fields:
+        return list(default)
+    parsed = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in parsed if f not in EXPORT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)} (expected any of {', '.join(EXPORT_FIELDS)})")
+    return list(dict.fromkeys(parsed))
+
+
+def fetch_chunks(collection, ids: List[str], fields: List[str]) -> dict:
+    """
+    Columnar {"ids", <field>: [...]} for `ids`, in the given order. Ids no
+    longer in the collection are skipped.
+    """
+    columns = {"ids": []}
+    columns.update({field: [] for field in fields})
+    if not ids:
+        return columns
+
+    page = collection.get(ids=ids, include=fields)
+    position = {chunk_id: i for i, chunk_id in enumerate(page["ids"])}
+    for chunk_id in ids:
+        i = position.get(chunk_id)
+        if i is None:
+            continue
+        columns["ids"].append(chunk_id)
+        for field in fields:
+            value = page[field][i]
+            columns[field].append(value.tolist() if field == "embeddings" and hasattr(value, "tolist") else value)
+    return columns
+
+
+def iter_chunks(collection, catalog, fields: List[str], batch_size: int = 500,
+                after: Optional[str] = None) -> Iterator[dict]:
+    """
+    Every chunk as {"id", "document", "metadata", ...} (per `fields`), in
+    id order. Pages of ids come from the catalog, so memory stays bounded
+    by `batch_size` however large the collection is.
+    """
+    while True:
+        ids = catalog.chunk_ids_page(after=after, limit=batch_size)
+        if not ids:
+            return
+        columns = fetch_chunks(collection, ids, fields)
+        for i, chunk_id in enumerate(columns["ids"]):
+            row = {"id": chunk_id}
+            for field in fields:
+                row[_SINGULAR[field]] = columns[field][i]
+            yield row
+        after = ids[-1]
@@ -1,20 +1,46 @@
-import requests
+import asyncio
+import concurrent.futures
 import json
-import time
-from backend.config.settings import OPENROUTER_API_KEY, OPENROUTER_API_BASE, LLM_MODEL, USE_MOCK_LLM
+import queue
+import threading
+
+import httpx
+
+from backend.core.ratelimit import AsyncTokenBucket
+from backend.core.telemetry import get_logger, span
+from backend.config.settings import (
+    OPENROUTER_API_KEY,
+    OPENROUTER_API_BASE,
+    LLM_MODEL,
+    USE_MOCK_LLM,
+    LLM_TIMEOUT,
+    LLM_MAX_CONNECTIONS,
+    LLM_REQUESTS_PER_SECOND,
+    LLM_BURST,
+    LLM_MAX_IN_FLIGHT,
+)
+
+logger = get_logger(__name__)
 
 
 class MockLLM:
     """Mock LLM for testing without API key"""
 
+    model = "mock"
+    generation_params = {}
+
     def __init__(self):
-        print("✅ Mock LLM initialized (no API key required)")
+        logger.info("✅ Mock LLM initialized (no API key required)")
 
     def invoke(self, prompt: str) -> str:
+        with span("llm"):
+            return self._respond(prompt)
+
+    def _respond(self, prompt: str) -> str:
         """
         Return mock responses based on the prompt content
         """
-        print(f"🔄 Mock LLM processing prompt (length: {len(prompt)} chars)")
+        logger.debug("🔄 Mock LLM processing prompt (length: %d chars)", len(prompt))
 
         # Detect what kind of response is needed based on prompt keywords
         prompt_lower = prompt.lower()
@@ -89,23 +115,84 @@ class MockLLM:
             # Generic response
             response = "This is a mock response for testing. In production, replace with actual LLM API."
 
-        print(f"✅ Mock LLM generated response (length: {len(response)} chars)")
+        logger.debug("✅ Mock LLM generated response (length: %d chars)", len(response))
         return response
 
+    async def ainvoke(self, prompt: str) -> str:
+        """Async entry point, mirrors OpenRouterLLM.ainvoke"""
+        return self.invoke(prompt)
+
+    def stream(self, prompt: str):
+        """Yield the mock response word by word, mirrors OpenRouterLLM.stream"""
+        words = self.invoke(prompt).split(" ")
+        for i, word in enumerate(words):
+            yield word if i == 0 else " " + word
+
+    async def astream(self, prompt: str):
+        """Async streaming variant, mirrors OpenRouterLLM.astream"""
+        for token in self.stream(prompt):
+            yield token
+            # Let other tasks run between tokens like a real network stream
+            await asyncio.sleep(0)
+
     def __call__(self, prompt: str) -> str:
         """Make the object callable"""
         return self.invoke(prompt)
 
+    def close(self):
+        pass
+
+
+class _BackgroundLoop:
+    """
+    A single asyncio event loop running in a daemon thread.
+
+    The pooled HTTP client and the rate limiter are bound to this loop, so
+    sync callers (threadpool workers) and async callers (endpoints on the
+    server loop) all share the same connections and the same budget.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="llm-loop", daemon=True)
+        self.thread.start()
+
+    def submit(self, coro) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def in_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+
+_background_loop = None
+_background_loop_lock = threading.Lock()
+
+
+def _get_background_loop() -> _BackgroundLoop:
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None:
+            _background_loop = _BackgroundLoop()
+        return _background_loop
+
 
 class OpenRouterLLM:
-    """Custom wrapper for OpenRouter API"""
+    """
+    Custom wrapper for OpenRouter API.
+
+    Requests go through a pooled keep-alive httpx.AsyncClient and an async
+    token-bucket limiter. Use `await llm.ainvoke(prompt)` from async code and
+    `llm.invoke(prompt)` (or `llm(prompt)`) from sync code.
+    """
 
     def __init__(self, api_key: str, model: str):
         self.api_key = api_key
         self.model = model
         self.api_base = OPENROUTER_API_BASE
-        self.last_request_time = 0
-        self.min_delay = 1  # 1 second between requests
+        self.generation_params = {"max_tokens": 1000, "temperature": 0.7}
 
         if not self.api_key or self.api_key == "":
             raise ValueError(
@@ -114,22 +201,38 @@ class OpenRouterLLM:
                 "OPENROUTER_API_KEY=sk-or-your-actual-key"
             )
 
-        print(f"✅ OpenRouter LLM initialized with model: {self.model}")
-        print(f"✅ API Key loaded: {self.api_key[:30]}...")
-
-    def invoke(self, prompt: str) -> str:
-        """
-        Call OpenRouter API and return the generated text
-        """
-        # Rate limiting: wait if needed
-        elapsed = time.time() - self.last_request_time
-        if elapsed < self.min_delay:
-            wait_time = self.min_delay - elapsed
-            time.sleep(wait_time)
-
-        url = f"{self.api_base}/chat/completions"
+        self._runner = _get_background_loop()
+        self._client = None
+        # Created on the background loop by _get_client()
+        self._limiter = None
+
+        logger.info("✅ OpenRouter LLM initialized with model: %s", self.model)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.api_base,
+                timeout=LLM_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_CONNECTIONS,
+                ),
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                    "HTTP-Referer": "https://fastapi-knowledge-assistant.local",
+                    "X-Title": "FastAPI Knowledge Assistant"
+                },
+            )
+            self._limiter = AsyncTokenBucket(
+                rate=LLM_REQUESTS_PER_SECOND,
+                capacity=LLM_BURST,
+                max_in_flight=LLM_MAX_IN_FLIGHT,
+            )
+        return self._client
 
-        payload = {
+    def _build_payload(self, prompt: str) -> dict:
+        return {
             "model": self.model,
             "messages": [
                 {
@@ -137,57 +240,171 @@ class OpenRouterLLM:
                     "content": prompt
                 }
             ],
-            "max_tokens": 1000,
-            "temperature": 0.7,
+            **self.generation_params,
         }
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "https://fastapi-knowledge-assistant.local",
-            "X-Title": "FastAPI Knowledge Assistant"
-        }
+    async def _complete(self, prompt: str) -> str:
+        """Run one completion. Must execute on the background loop."""
+        client = self._get_client()
+        payload = self._build_payload(prompt)
 
-        print(f"🔄 Calling OpenRouter API with model: {self.model}")
-        print(f"📍 URL: {url}")
-        print(f"🔑 API Key: {self.api_key[:40]}...")
-        print(f"📦 Payload model: {payload['model']}")
+        logger.debug("🔄 Calling OpenRouter API with model: %s", self.model)
 
         try:
-            response = requests.post(url, data=json.dumps(payload), headers=headers, timeout=30)
-            self.last_request_time = time.time()
-
-            print(f"📡 OpenRouter Response Status: {response.status_code}")
-            print(f"📋 Response Headers: {dict(response.headers)}")
+            async with self._limiter:
+                response = await client.post("/chat/completions", json=payload)
 
-            if response.status_code != 200:
-                print(f"❌ Error Response: {response.text}")
-                response.raise_for_status()
+            logger.debug("📡 OpenRouter response status: %d", response.status_code)
+            response.raise_for_status()
 
-            result = response.json()
-            print(f"✅ API Response received successfully")
+            with span("json_parse"):
+                result = response.json()
 
             # Extract the text from OpenRouter response
             if "choices" in result and len(result["choices"]) > 0:
                 content = result["choices"][0].get("message", {}).get("content", "")
-                print(f"✅ Generated content length: {len(content)} characters")
+                logger.debug("✅ Generated content length: %d characters", len(content))
                 return content
 
-            print("⚠️  No choices in response")
+            logger.warning("⚠️  No choices in OpenRouter response")
             return ""
 
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Request Error: {type(e).__name__}")
-            print(f"❌ Error Details: {str(e)}")
-            if hasattr(e, 'response') and e.response is not None:
-                print(f"❌ Response Status: {e.response.status_code}")
-                print(f"❌ Response Body: {e.response.text}")
+        except httpx.HTTPError as e:
+            if isinstance(e, httpx.HTTPStatusError):
+                logger.error("❌ OpenRouter returned %d: %s", e.response.status_code, e.response.text[:500])
+            else:
+                logger.error("❌ OpenRouter request failed: %s: %s", type(e).__name__, e)
             raise
 
+    async def _stream(self, prompt: str, emit):
+        """
+        Run one streaming completion, calling emit(token) for every content
+        delta. Must execute on the background loop.
+        """
+        client = self._get_client()
+        payload = self._build_payload(prompt)
+        payload["stream"] = True
+
+        logger.debug("🔄 Streaming from OpenRouter API with model: %s", self.model)
+
+        async with self._limiter:
+            async with client.stream("POST", "/chat/completions", json=payload) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    logger.error("❌ OpenRouter returned %d: %s", response.status_code, body.decode(errors="replace")[:500])
+                    response.raise_for_status()
+
+                # OpenRouter sends SSE lines: "data: {...}", ": keep-alive comments" and "data: [DONE]"
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    try:
+                        chunk = json.loads(data)
+                    except json.JSONDecodeError:
+                        continue
+                    if "error" in chunk:
+                        raise RuntimeError(f"OpenRouter stream error: {chunk['error']}")
+                    choices = chunk.get("choices") or []
+                    if choices:
+                        token = choices[0].get("delta", {}).get("content")
+                        if token:
+                            emit(token)
+
+    async def astream(self, prompt: str):
+        """
+        Yield generated tokens as they arrive (OpenRouter `stream: true`).
+        """
+        caller_loop = asyncio.get_running_loop()
+        tokens = asyncio.Queue()
+        done = object()
+
+        def put(item):
+            caller_loop.call_soon_threadsafe(tokens.put_nowait, item)
+
+        async def produce():
+            try:
+                await self._stream(prompt, put)
+            except BaseException as e:
+                put(e)
+                raise
+            finally:
+                put(done)
+
+        future = self._runner.submit(produce())
+        try:
+            with span("llm"):
+                while True:
+                    item = await tokens.get()
+                    if item is done:
+                        break
+                    if isinstance(item, BaseException):
+                        raise item
+                    yield item
+        finally:
+            # Stop generating if the consumer went away (e.g. client disconnect)
+            future.cancel()
+
+    def stream(self, prompt: str):
+        """
+        Sync generator over generated tokens, for use from worker threads.
+        """
+        tokens = queue.Queue()
+        done = object()
+
+        async def produce():
+            try:
+                await self._stream(prompt, tokens.put)
+            except BaseException as e:
+                tokens.put(e)
+                raise
+            finally:
+                tokens.put(done)
+
+        future = self._runner.submit(produce())
+        try:
+            with span("llm"):
+                while True:
+                    item = tokens.get()
+                    if item is done:
+                        break
+                    if isinstance(item, BaseException):
+                        raise item
+                    yield item
+        finally:
+            future.cancel()
+
+    async def ainvoke(self, prompt: str) -> str:
+        """
+        Call OpenRouter API without blocking the caller's event loop
+        """
+        with span("llm"):
+            if self._runner.in_loop():
+                return await self._complete(prompt)
+            return await asyncio.wrap_future(self._runner.submit(self._complete(prompt)))
+
+    def invoke(self, prompt: str) -> str:
+        """
+        Call OpenRouter API and return the generated text
+        """
+        with span("llm"):
+            return self._runner.submit(self._complete(prompt)).result()
+
     def __call__(self, prompt: str) -> str:
         """Make the object callable"""
         return self.invoke(prompt)
 
+    async def _aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def close(self):
+        """Close pooled connections."""
+        self._runner.submit(self._aclose()).result()
+
 
 def get_llm():
     """
@@ -195,10 +412,10 @@ def get_llm():
     Uses Mock LLM if USE_MOCK_LLM=true, otherwise OpenRouter.
     """
     if USE_MOCK_LLM:
-        print("🔧 Using Mock LLM (testing mode)")
+        logger.info("🔧 Using Mock LLM (testing mode)")
         return MockLLM()
     else:
-        print("🔧 Using OpenRouter LLM (production mode)")
+        logger.info("🔧 Using OpenRouter LLM (production mode)")
         llm = OpenRouterLLM(api_key=OPENROUTER_API_KEY, model=LLM_MODEL)
         return llm
 
@@ -209,9 +426,9 @@ def get_faq_llm():
     Uses Mock LLM if USE_MOCK_LLM=true, otherwise OpenRouter.
     """
     if USE_MOCK_LLM:
-        print("🔧 Using Mock LLM for FAQ agent (testing mode)")
+        logger.info("🔧 Using Mock LLM for FAQ agent (testing mode)")
         return MockLLM()
     else:
-        print("🔧 Using OpenRouter LLM for FAQ agent (production mode)")
+        logger.info("🔧 Using OpenRouter LLM for FAQ agent (production mode)")
         llm = OpenRouterLLM(api_key=OPENROUTER_API_KEY, model=LLM_MODEL)
         return llm
@@ -0,0 +1,102 @@
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional
+
+from PyPDF2 import PdfReader
+
+from backend.core.telemetry import get_logger
+from backend.config.settings import PDF_WORKERS, PDF_PAGES_PER_TASK
+
+logger = get_logger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pdf_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Process pool shared by all PDF extractions, created on first use.
+    Uses "spawn" so workers don't inherit the server's threads and locks.
+    """
+    global _pool
+    if PDF_WORKERS <= 1:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_pdf_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def page_count(path: str) -> int:
+    return len(PdfReader(path).pages)
+
+
+def extract_page_range(path: str, start: int, end: int) -> List[str]:
+    """Text of pages [start, end). Runs in a pool worker, so it reopens the file."""
+    reader = PdfReader(path)
+    pages = []
+    for i in range(start, min(end, len(reader.pages))):
+        try:
+            pages.append(reader.pages[i].extract_text() or "")
+        except Exception as e:
+            # One malformed page shouldn't sink the whole document
+            logger.warning("⚠️ Could not extract page %d of %s: %s", i + 1, path, e)
+            pages.append("")
+    return pages
+
+
+def iter_pdf_pages(path: str, pages_per_task: int = PDF_PAGES_PER_TASK,
+                   pool: Optional[ProcessPoolExecutor] = None) -> Iterator[str]:
+    """
+    Yield a PDF's text page by page, with a blank line between pages so
+    the chunker sees a paragraph break there, ready to be streamed into
+    the chunker.
+
+    Large PDFs are split into ranges of `pages_per_task` pages extracted in
+    parallel by the process pool. Only a small window of ranges is in
+    flight at a time and results are yielded in page order, so memory
+    stays bounded by the window rather than the document size.
+    """
+    # Open the file eagerly so a corrupt PDF fails here, not mid-stream
+    count = page_count(path)
+    ranges = [(start, min(start + pages_per_task, count)) for start in range(0, count, pages_per_task)]
+    return _with_page_breaks(_iter_ranges(path, ranges, pool or get_pdf_pool()))
+
+
+def _with_page_breaks(pages: Iterator[str]) -> Iterator[str]:
+    for i, page in enumerate(pages):
+        if i:
+            yield "\n\n"
+        yield page
+
+
+def _iter_ranges(path: str, ranges: List[tuple], pool: Optional[ProcessPoolExecutor]) -> Iterator[str]:
+    if pool is None or len(ranges) <= 1:
+        for start, end in ranges:
+            yield from extract_page_range(path, start, end)
+        return
+
+    window = max(2, PDF_WORKERS * 2)
+    pending = deque()
+    next_range = 0
+    try:
+        while pending or next_range < len(ranges):
+            while next_range < len(ranges) and len(pending) < window:
+                start, end = ranges[next_range]
+                pending.append(pool.submit(extract_page_range, path, start, end))
+                next_range += 1
+            yield from pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
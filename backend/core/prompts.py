@@ -9,6 +9,11 @@ Summarize the following FastAPI documentation section
 in 3–4 bullet points focusing on developer usage.
 """
 
+SECTION_REDUCE_PROMPT = """
+Combine the following partial summaries of one FastAPI documentation
+section into 3–4 bullet points focusing on developer usage.
+"""
+
 FAQ_PROMPT = """
 Based on the following FastAPI documentation, generate 6 frequently asked
 developer questions and their concise answers.
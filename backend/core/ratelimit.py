@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+
+class AsyncTokenBucket:
+    """
+    Asyncio token-bucket rate limiter with a cap on in-flight requests.
+
+    `rate` tokens are added per second up to `capacity`; each request takes
+    one token. `max_in_flight` bounds how many requests may be running at
+    once, independently of the refill rate.
+
+    Usage:
+        async with bucket:
+            await do_request()
+    """
+
+    def __init__(self, rate: float, capacity: int = 1, max_in_flight: int = 4):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.max_in_flight = max(1, max_in_flight)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Wait for an in-flight slot and a token."""
+        await self._in_flight.acquire()
+        try:
+            async with self._lock:
+                self._refill()
+                while self._tokens < 1:
+                    await asyncio.sleep((1 - self._tokens) / self.rate)
+                    self._refill()
+                self._tokens -= 1
+        except BaseException:
+            self._in_flight.release()
+            raise
+
+    def release(self):
+        self._in_flight.release()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
@@ -0,0 +1,200 @@
+import os
+import threading
+
+from backend.core.answer_cache import AnswerCache
+from backend.core.catalog import KBCatalog
+from backend.core.completion_cache import with_completion_cache
+from backend.core.embeddings import get_embedding_service
+from backend.core.jobs import JobManager
+from backend.core.llm import get_llm, get_faq_llm
+from backend.core.pdf_extract import shutdown_pdf_pool
+from backend.core.rerank import get_reranker
+from backend.core.sparse_index import get_sparse_index
+from backend.core.stackoverflow import close_stackoverflow_cache, get_stackoverflow_cache
+from backend.core.telemetry import get_logger
+from backend.core.vectorstore import get_chroma_client, open_collection
+from backend.config.settings import (
+    CHROMA_DB_PATH,
+    COLLECTION_NAME,
+    ANSWER_CACHE_ENABLED,
+    ANSWER_CACHE_TTL,
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_SIMILARITY,
+    SPARSE_INDEX_ENABLED,
+    RERANK_ENABLED,
+    LLM_MODEL,
+    USE_MOCK_LLM,
+    OPENROUTER_API_KEY,
+)
+
+logger = get_logger(__name__)
+
+
+class ServiceRegistry:
+    """
+    Process-wide holder for the expensive objects every request needs:
+    the Chroma client/collection, the shared embedding service, the LLM
+    wrappers and the agents built on top of them.
+
+    Everything is built once in start() and then shared read-only across
+    worker threads. Chroma clients and SentenceTransformer inference are
+    thread-safe, and the agents keep no per-request state.
+    """
+
+    def __init__(self, persist_path: str = CHROMA_DB_PATH):
+        self.persist_path = persist_path
+        self._lock = threading.Lock()
+        self._started = False
+
+        self.client = None
+        self.collection = None
+        self.embedder = None
+        self.catalog = None
+        self.sparse_index = None
+        self.reranker = None
+        self.llm = None
+        self.faq_llm = None
+        self.answer_cache = None
+        self.stackoverflow = None
+
+        self.ingestion_agent = None
+        self.rag_agent = None
+        self.summary_agent = None
+        self.faq_agent = None
+        self.job_manager = None
+
+    def start(self):
+        """Build clients, models and agents (idempotent)."""
+        with self._lock:
+            if self._started:
+                return
+
+            from backend.agents.ingestion_agent import IngestionAgent
+            from backend.agents.rag_agent import RAGAgent
+            from backend.agents.summary_agent import SummaryAgent
+            from backend.agents.faq_agent import FAQAgent
+
+            logger.info("🏗️  Building shared services...")
+            logger.info("🔧 LLM: %s (mock: %s, API key %s)", LLM_MODEL, USE_MOCK_LLM,
+                        "set" if OPENROUTER_API_KEY else "NOT FOUND")
+            os.makedirs(self.persist_path, exist_ok=True)
+
+            self.client = get_chroma_client(self.persist_path)
+            # One embedding model for indexing and querying, also registered
+            # with Chroma so query_texts never loads its default model
+            self.embedder = get_embedding_service()
+            self.collection = open_collection(self.client, COLLECTION_NAME, self.embedder, create=True)
+            self.catalog = KBCatalog()
+            # Sources ingested before the catalog existed
+            if self.catalog.summary()["chunks"] < self.collection.count():
+                logger.info("📒 Cataloguing sources missing from the KB catalog...")
+                added = self.catalog.rebuild(self.collection)
+                logger.info("✅ Catalogued %d sources", added)
+            if SPARSE_INDEX_ENABLED:
+                self.sparse_index = get_sparse_index()
+                # Knowledge bases ingested before the BM25 index existed
+                if len(self.sparse_index) == 0 and self.collection.count() > 0:
+                    logger.info("🔎 Building BM25 index from existing collection...")
+                    indexed = self.sparse_index.rebuild(self.collection)
+                    logger.info("✅ BM25 index built over %d chunks", indexed)
+            if RERANK_ENABLED:
+                self.reranker = get_reranker()
+            self.llm = get_llm()
+            self.faq_llm = get_faq_llm()
+            self.stackoverflow = get_stackoverflow_cache()
+            if ANSWER_CACHE_ENABLED:
+                self.answer_cache = AnswerCache(
+                    max_entries=ANSWER_CACHE_MAX_ENTRIES,
+                    ttl_seconds=ANSWER_CACHE_TTL,
+                    similarity_threshold=ANSWER_CACHE_SIMILARITY,
+                )
+
+            self.ingestion_agent = IngestionAgent(
+                embedder=self.embedder,
+                collection=self.collection,
+                catalog=self.catalog,
+                sparse_index=self.sparse_index,
+            )
+            self.rag_agent = RAGAgent(
+                collection=self.collection,
+                llm=self.llm,
+                embedder=self.embedder,
+                answer_cache=self.answer_cache,
+                sparse_index=self.sparse_index,
+                reranker=self.reranker,
+            )
+            if self.answer_cache is not None:
+                self.ingestion_agent.on_change.append(self.answer_cache.invalidate)
+            # Summary/FAQ prompts repeat across runs, so memoize their completions
+            self.summary_agent = SummaryAgent(
+                collection=self.collection, llm=with_completion_cache(self.llm), catalog=self.catalog
+            )
+            self.faq_agent = FAQAgent(
+                collection=self.collection,
+                llm=with_completion_cache(self.faq_llm),
+                embedder=self.embedder,
+                reranker=self.reranker,
+                catalog=self.catalog,
+                stackoverflow=self.stackoverflow,
+            )
+
+            # Background ingestion jobs; resumes anything a previous process left unfinished
+            self.job_manager = JobManager({"ingest": self.ingestion_agent.run_job})
+            self.job_manager.start()
+
+            self._started = True
+            logger.info("✅ Shared services ready")
+
+    def warm_up(self):
+        """
+        Touch every lazily-initialised code path once so the first real
+        request doesn't pay for model loading.
+        """
+        self.start()
+        logger.info("🔥 Warming up embedder and vector store...")
+
+        embedding = self.embedder.encode(["warm-up"])[0]
+
+        if self.collection.count() > 0:
+            self.collection.query(query_embeddings=[list(map(float, embedding))], n_results=1)
+
+        if self.reranker is not None:
+            self.reranker.model.predict([("warm-up", "warm-up")], show_progress_bar=False)
+
+        logger.info("✅ Warm-up complete")
+
+    def close(self):
+        with self._lock:
+            self._started = False
+            if self.job_manager is not None:
+                self.job_manager.stop()
+                self.job_manager.store.close()
+                self.job_manager = None
+            shutdown_pdf_pool()
+            for llm in (self.llm, self.faq_llm):
+                if llm is not None:
+                    llm.close()
+            if self.stackoverflow is not None:
+                close_stackoverflow_cache()
+                self.stackoverflow = None
+            if self.catalog is not None:
+                self.catalog.close()
+                self.catalog = None
+            self.ingestion_agent = None
+            self.rag_agent = None
+            self.summary_agent = None
+            self.faq_agent = None
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ServiceRegistry:
+    """Return the process-wide registry, creating it on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ServiceRegistry()
+    return _registry
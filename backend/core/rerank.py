@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import List
+
+from backend.core.catalog import content_hash
+from backend.core.telemetry import get_logger, record_span
+from backend.config.settings import (
+    RERANK_MODEL,
+    RERANK_CANDIDATES,
+    RERANK_BATCH_SIZE,
+    RERANK_CACHE_SIZE,
+)
+
+logger = get_logger(__name__)
+
+
+class CrossEncoderReranker:
+    """
+    Rescores retrieval candidates with a small CPU cross-encoder.
+
+    At most `max_candidates` hits per query are scored, which bounds the
+    cost of a rerank call regardless of how much the retriever returns. All
+    uncached (query, chunk) pairs of a batch of queries go through one
+    batched predict() call, and scores are cached per (query, chunk content
+    hash) so repeated questions skip the model entirely. Chunk ids are
+    reused when a page is re-ingested, so they can't key the cache.
+
+    Hits are dicts with at least "id" and "document"; reranked hits gain a
+    "rerank_score" and come back best first.
+    """
+
+    def __init__(self, model_name: str = RERANK_MODEL, max_candidates: int = RERANK_CANDIDATES,
+                 batch_size: int = RERANK_BATCH_SIZE, cache_size: int = RERANK_CACHE_SIZE):
+        # Imported here so importing this module doesn't pull in torch
+        from sentence_transformers import CrossEncoder
+
+        self.model_name = model_name
+        self.max_candidates = max_candidates
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.model = CrossEncoder(model_name, device="cpu")
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "pairs_scored": 0, "cache_hits": 0, "total_ms": 0.0, "last_ms": 0.0}
+
+    @staticmethod
+    def _key(query: str, hit: dict) -> tuple:
+        # Ingested chunks carry their content hash; hash the text otherwise
+        h = (hit.get("metadata") or {}).get("content_hash") or content_hash(hit["document"])
+        return query, h
+
+    def rerank(self, query: str, hits: List[dict], top_n: int = None) -> List[dict]:
+        return self.rerank_many([query], [hits], top_n=top_n)[0]
+
+    def rerank_many(self, queries: List[str], hits_per_query: List[List[dict]], top_n: int = None) -> List[List[dict]]:
+        start = time.perf_counter()
+        candidates = [hits[:self.max_candidates] for hits in hits_per_query]
+
+        scores = [[None] * len(hits) for hits in candidates]
+        missing = []  # (query index, hit index)
+        with self._lock:
+            for qi, (query, hits) in enumerate(zip(queries, candidates)):
+                for hi, hit in enumerate(hits):
+                    key = self._key(query, hit)
+                    cached = self._cache.get(key)
+                    if cached is not None:
+                        self._cache.move_to_end(key)
+                        scores[qi][hi] = cached
+                    else:
+                        missing.append((qi, hi))
+            self._stats["cache_hits"] += sum(len(hits) for hits in candidates) - len(missing)
+
+        if missing:
+            pairs = [(queries[qi], candidates[qi][hi]["document"]) for qi, hi in missing]
+            predicted = self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+            with self._lock:
+                for (qi, hi), score in zip(missing, predicted):
+                    score = float(score)
+                    scores[qi][hi] = score
+                    self._cache[self._key(queries[qi], candidates[qi][hi])] = score
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        reranked = []
+        for hits, hit_scores in zip(candidates, scores):
+            ranked = sorted(
+                (dict(hit, rerank_score=score) for hit, score in zip(hits, hit_scores)),
+                key=lambda hit: hit["rerank_score"],
+                reverse=True,
+            )
+            reranked.append(ranked[:top_n] if top_n else ranked)
+
+        elapsed = time.perf_counter() - start
+        record_span("rerank", elapsed)
+        elapsed_ms = elapsed * 1000
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["pairs_scored"] += len(missing)
+            self._stats["total_ms"] += elapsed_ms
+            self._stats["last_ms"] = elapsed_ms
+        logger.debug("⚖️  Reranked %d candidates (%d scored) in %.1f ms",
+                     sum(len(h) for h in candidates), len(missing), elapsed_ms)
+        return reranked
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cache_entries"] = len(self._cache)
+        stats["avg_ms"] = stats["total_ms"] / stats["calls"] if stats["calls"] else 0.0
+        stats["model"] = self.model_name
+        stats["max_candidates"] = self.max_candidates
+        return stats
+
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> CrossEncoderReranker:
+    """Return the process-wide reranker, loading the model on first use."""
+    global _reranker
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                _reranker = CrossEncoderReranker()
+    return _reranker
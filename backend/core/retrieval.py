@@ -0,0 +1,113 @@
+from typing import Dict, List, Optional, Tuple
+
+from backend.core.telemetry import span
+from backend.config.settings import RETRIEVAL_MODE, RRF_K, HYBRID_CANDIDATES
+
+RETRIEVAL_MODES = ("dense", "sparse", "hybrid")
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """
+    Fuse ranked id lists: score(id) = sum over lists of 1 / (k + rank).
+    Only ranks are used, so BM25 and vector scores never need calibrating
+    against each other.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, start=1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridRetriever:
+    """
+    Dense (Chroma), sparse (BM25) or hybrid (both, fused with RRF) chunk
+    retrieval for a batch of queries.
+
+    Hits are dicts {"id", "document", "metadata"}. Without a sparse index,
+    or while it is still empty, every mode falls back to dense.
+
+    With a `reranker` (see backend.core.rerank), up to its max_candidates
+    hits are fetched and rescored, and the best `top_k` of those returned
+    (with a "rerank_score").
+    """
+
+    def __init__(self, collection, embedder, sparse_index=None, mode: str = RETRIEVAL_MODE,
+                 candidates: int = HYBRID_CANDIDATES, reranker=None):
+        self.collection = collection
+        self.embedder = embedder
+        self.sparse_index = sparse_index
+        self.mode = self.resolve_mode(mode)
+        self.candidates = candidates
+        self.reranker = reranker
+
+    @staticmethod
+    def resolve_mode(mode: Optional[str], default: str = "dense") -> str:
+        mode = mode or default
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {mode} (expected one of {', '.join(RETRIEVAL_MODES)})")
+        return mode
+
+    def effective_mode(self, mode: Optional[str] = None) -> str:
+        mode = self.resolve_mode(mode, self.mode)
+        if mode != "dense" and (self.sparse_index is None or len(self.sparse_index) == 0):
+            return "dense"
+        return mode
+
+    def _dense(self, queries: List[str], n_results: int, query_embeddings=None) -> List[List[dict]]:
+        if query_embeddings is None:
+            query_embeddings = self.embedder.embed_query(list(queries))
+        with span("vector_query"):
+            results = self.collection.query(
+                query_embeddings=[list(map(float, e)) for e in query_embeddings],
+                n_results=n_results,
+                include=["documents", "metadatas"]
+            )
+        return [
+            [{"id": i, "document": d, "metadata": m} for i, d, m in zip(ids, documents, metadatas)]
+            for ids, documents, metadatas in zip(results["ids"], results["documents"], results["metadatas"])
+        ]
+
+    def _fetch(self, ids: List[str], known: Dict[str, dict]) -> Dict[str, dict]:
+        """Documents/metadata for ids not already returned by the dense query."""
+        missing = [i for i in dict.fromkeys(ids) if i not in known]
+        if missing:
+            with span("vector_query"):
+                page = self.collection.get(ids=missing, include=["documents", "metadatas"])
+            for i, d, m in zip(page["ids"], page["documents"], page["metadatas"]):
+                known[i] = {"id": i, "document": d, "metadata": m}
+        return known
+
+    def search_many(self, queries: List[str], top_k: int = 3, mode: Optional[str] = None,
+                    query_embeddings=None) -> List[List[dict]]:
+        if not queries:
+            return []
+        mode = self.effective_mode(mode)
+
+        if self.reranker is None:
+            return self._search(queries, top_k, mode, query_embeddings)
+
+        n_fetch = max(top_k, self.reranker.max_candidates)
+        hits = self._search(queries, n_fetch, mode, query_embeddings)
+        return self.reranker.rerank_many(queries, hits, top_n=top_k)
+
+    def _search(self, queries: List[str], top_k: int, mode: str, query_embeddings=None) -> List[List[dict]]:
+        if mode == "dense":
+            return self._dense(queries, top_k, query_embeddings)
+
+        n_candidates = max(top_k, self.candidates) if mode == "hybrid" else top_k
+        with span("sparse_query"):
+            sparse = [[chunk_id for chunk_id, _ in hits] for hits in self.sparse_index.search_many(queries, n_candidates)]
+
+        if mode == "sparse":
+            known = self._fetch([i for ids in sparse for i in ids], {})
+            return [[known[i] for i in ids if i in known] for ids in sparse]
+
+        dense = self._dense(queries, n_candidates, query_embeddings)
+        known = {hit["id"]: hit for hits in dense for hit in hits}
+        fused = [
+            [chunk_id for chunk_id, _ in reciprocal_rank_fusion([[h["id"] for h in dense_hits], sparse_ids])[:top_k]]
+            for dense_hits, sparse_ids in zip(dense, sparse)
+        ]
+        known = self._fetch([i for ids in fused for i in ids], known)
+        return [[known[i] for i in ids if i in known] for ids in fused]
@@ -0,0 +1,531 @@
+import json
+import math
+import os
+import re
+import shutil
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from backend.config.settings import (
+    SPARSE_INDEX_DIR,
+    SPARSE_MERGE_FACTOR,
+    SPARSE_SEGMENT_MAX_DOCS,
+    SPARSE_BUFFER_MAX_DOCS,
+)
+
+_WORD_RE = re.compile(r"[A-Za-z0-9_]+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z0-9]+|[A-Z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is it of on or "
+    "that the this to use using was what when where which why with you your".split()
+)
+MANIFEST = "manifest.json"
+BUFFER = "buffer.jsonl"
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased word tokens without stopwords. Identifiers are kept whole
+    and also split on camelCase/snake_case, so "UploadFile" matches both
+    "UploadFile" and "upload file".
+    """
+    tokens = []
+    for word in _WORD_RE.findall(text):
+        lower = word.lower()
+        if lower not in STOPWORDS:
+            tokens.append(lower)
+        parts = [p.lower() for piece in word.split("_") for p in _CAMEL_RE.findall(piece)]
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if len(p) > 1 and p not in STOPWORDS)
+    return tokens
+
+
+def _load_array(path: str) -> np.ndarray:
+    array = np.load(path, mmap_mode="r")
+    # Zero-length arrays can't be memory-mapped on every platform
+    return array if array.size else np.load(path)
+
+
+class _Segment:
+    """
+    One immutable segment. On disk:
+      meta.json          chunk ids (local doc index -> id) and the vocabulary
+                         (term -> [offset, length] into the postings arrays)
+      postings_docs.npy  int32 local doc indices, grouped by term
+      postings_tfs.npy   uint16 term frequencies, parallel to postings_docs
+      doc_lengths.npy    int32 token count per local doc
+    The arrays are memory-mapped, so only the postings a query touches are
+    paged in. Buffered flushes are served as in-memory segments of the
+    same shape (from_docs).
+    """
+
+    def __init__(self, chunk_ids: List[str], vocab: dict, doc_ids: np.ndarray, tfs: np.ndarray,
+                 doc_lengths: np.ndarray, name: str = None):
+        self.name = name
+        self.chunk_ids = chunk_ids
+        self.vocab = vocab
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_lengths = doc_lengths
+        self._positions = None
+
+    def __len__(self):
+        return len(self.chunk_ids)
+
+    @classmethod
+    def load(cls, path: str) -> "_Segment":
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(
+            meta["chunk_ids"],
+            meta["vocab"],
+            _load_array(os.path.join(path, "postings_docs.npy")),
+            _load_array(os.path.join(path, "postings_tfs.npy")),
+            _load_array(os.path.join(path, "doc_lengths.npy")),
+            name=os.path.basename(path),
+        )
+
+    @classmethod
+    def from_docs(cls, docs: List[Tuple[str, Counter, int]]) -> "_Segment":
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for local_id, (_, counts, _) in enumerate(docs):
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((local_id, tf))
+
+        vocab = {}
+        doc_ids, tfs = [], []
+        offset = 0
+        for term in sorted(postings):
+            entries = postings[term]
+            vocab[term] = [offset, len(entries)]
+            doc_ids.extend(d for d, _ in entries)
+            tfs.extend(min(tf, 65535) for _, tf in entries)
+            offset += len(entries)
+
+        return cls(
+            [chunk_id for chunk_id, _, _ in docs],
+            vocab,
+            np.asarray(doc_ids, dtype=np.int32),
+            np.asarray(tfs, dtype=np.uint16),
+            np.asarray([length for _, _, length in docs], dtype=np.int32),
+        )
+
+    @classmethod
+    def merged(cls, segments: List["_Segment"], live: List[np.ndarray]) -> "_Segment":
+        """
+        The live docs of `segments` (oldest first) as one segment, built
+        from their postings arrays without decoding individual documents.
+        """
+        chunk_ids, lengths = [], []
+        term_index: Dict[str, int] = {}
+        terms, docs, tfs = [], [], []
+        base = 0
+        for segment, mask in zip(segments, live):
+            mask = np.asarray(mask, dtype=bool)
+            # Old local doc index -> merged doc index (valid where mask is set)
+            remap = np.cumsum(mask, dtype=np.int64) - 1 + base
+            chunk_ids.extend(np.asarray(segment.chunk_ids, dtype=object)[mask].tolist())
+            lengths.append(np.asarray(segment.doc_lengths)[mask])
+
+            # Postings are stored grouped by term in offset order
+            entries = sorted(segment.vocab.items(), key=lambda item: item[1][0])
+            counts = np.fromiter((length for _, (_, length) in entries), dtype=np.int64, count=len(entries))
+            global_ids = np.fromiter(
+                (term_index.setdefault(term, len(term_index)) for term, _ in entries), dtype=np.int64, count=len(entries)
+            )
+            segment_docs = np.asarray(segment.doc_ids)
+            keep = mask[segment_docs]
+            terms.append(np.repeat(global_ids, counts)[keep])
+            docs.append(remap[segment_docs[keep]])
+            tfs.append(np.asarray(segment.tfs)[keep])
+            base += int(mask.sum())
+
+        names = list(term_index)
+        order = sorted(range(len(names)), key=names.__getitem__)
+        rank = np.empty(len(names), dtype=np.int64)
+        rank[order] = np.arange(len(names))
+
+        terms = rank[np.concatenate(terms)] if terms else np.zeros(0, dtype=np.int64)
+        docs = np.concatenate(docs) if docs else np.zeros(0, dtype=np.int64)
+        tfs = np.concatenate(tfs) if tfs else np.zeros(0, dtype=np.uint16)
+        sort = np.lexsort((docs, terms))
+        terms, docs, tfs = terms[sort], docs[sort], tfs[sort]
+
+        term_counts = np.bincount(terms, minlength=len(names))
+        offsets = np.concatenate(([0], np.cumsum(term_counts)[:-1])) if len(names) else term_counts
+        vocab = {
+            names[order[r]]: [int(offsets[r]), int(term_counts[r])]
+            for r in range(len(names)) if term_counts[r]
+        }
+        return cls(
+            chunk_ids,
+            vocab,
+            docs.astype(np.int32),
+            tfs.astype(np.uint16),
+            np.concatenate(lengths).astype(np.int32) if lengths else np.zeros(0, dtype=np.int32),
+        )
+
+    def save(self, path: str):
+        tmp = path + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        np.save(os.path.join(tmp, "postings_docs.npy"), np.asarray(self.doc_ids, dtype=np.int32))
+        np.save(os.path.join(tmp, "postings_tfs.npy"), np.asarray(self.tfs, dtype=np.uint16))
+        np.save(os.path.join(tmp, "doc_lengths.npy"), np.asarray(self.doc_lengths, dtype=np.int32))
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"chunk_ids": self.chunk_ids, "vocab": self.vocab}, f)
+        os.replace(tmp, path)
+
+    @property
+    def positions(self) -> Dict[str, int]:
+        """Chunk id -> local doc index (built on first use)."""
+        if self._positions is None:
+            self._positions = {chunk_id: i for i, chunk_id in enumerate(self.chunk_ids)}
+        return self._positions
+
+
+def _shadow_masks(segments: List[_Segment]) -> List[np.ndarray]:
+    """Liveness per segment when newer segments shadow older versions of a chunk."""
+    masks = [None] * len(segments)
+    seen = set()
+    for i in range(len(segments) - 1, -1, -1):
+        segment = segments[i]
+        masks[i] = np.fromiter((cid not in seen for cid in segment.chunk_ids), dtype=bool, count=len(segment))
+        seen.update(segment.chunk_ids)
+    return masks
+
+
+def _mask_ids(segments: List[_Segment], masks: List[np.ndarray], chunk_ids: Iterable[str]) -> List[np.ndarray]:
+    """Copies of `masks` with `chunk_ids` cleared, looked up by id rather than by scanning segments."""
+    chunk_ids = list(chunk_ids)
+    masked = []
+    for segment, mask in zip(segments, masks):
+        hits = [i for i in (segment.positions.get(cid) for cid in chunk_ids) if i is not None]
+        if hits:
+            mask = mask.copy()
+            mask[hits] = False
+        masked.append(mask)
+    return masked
+
+
+class _Snapshot:
+    """
+    On-disk segments followed by the in-memory buffer segments, with
+    per-segment liveness masks and corpus statistics.
+
+    `shadow` holds every segment's mask from shadowing alone. The writer
+    updates it incrementally as segments are added and merged, so only the
+    tombstones are applied per snapshot.
+    """
+
+    def __init__(self, disk_segments: List[_Segment], buffer: List[_Segment], tombstones: set,
+                 shadow: Optional[List[np.ndarray]] = None):
+        self.disk_segments = disk_segments
+        self.buffer = buffer
+        self.segments = disk_segments + buffer
+        self.shadow = shadow if shadow is not None else _shadow_masks(self.segments)
+        self.live = _mask_ids(self.segments, self.shadow, tombstones)
+
+        self.num_docs = int(sum(mask.sum() for mask in self.live))
+        total_length = sum(int(np.asarray(seg.doc_lengths)[mask].sum())
+                           for seg, mask in zip(self.segments, self.live) if len(seg))
+        self.avg_length = total_length / self.num_docs if self.num_docs else 0.0
+
+
+class SparseIndex:
+    """
+    BM25 inverted index over chunk texts, kept next to the Chroma collection
+    and updated by the ingestion pipeline.
+
+    flush() turns added chunks into a small in-memory buffer segment,
+    appended to the buffer.jsonl log so it survives restarts; small
+    ingests therefore never create an on-disk segment each. Once the buffer
+    holds `buffer_max_docs` chunks it is merged into a new immutable
+    segment. Deletions and replaced chunks are masked out with tombstones.
+
+    Segments are merged with a tiered policy: a segment's tier is
+    log_merge_factor of its live doc count, and `merge_factor` adjacent
+    segments of the same tier are merged into one of the next tier. Each
+    chunk is therefore rewritten about log_merge_factor(N) times in total,
+    instead of on every flush. Merges work on the postings arrays directly.
+    Queries read a snapshot of the memory-mapped segments, so they never
+    block on writers.
+    """
+
+    def __init__(self, path: str = SPARSE_INDEX_DIR, k1: float = 1.2, b: float = 0.75,
+                 merge_factor: int = SPARSE_MERGE_FACTOR, segment_max_docs: int = SPARSE_SEGMENT_MAX_DOCS,
+                 buffer_max_docs: int = SPARSE_BUFFER_MAX_DOCS):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.merge_factor = max(2, merge_factor)
+        self.segment_max_docs = segment_max_docs
+        self.buffer_max_docs = buffer_max_docs
+        os.makedirs(path, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._pending: Dict[str, Tuple[Counter, int]] = {}
+        self._pending_deletes = set()
+        self._manifest = {"segments": [], "tombstones": [], "next_segment": 0}
+        self._manifest_mtime = None
+        self._segments: Dict[str, _Segment] = {}  # loaded segments by name; they never change
+        self._snapshot = _Snapshot([], [], set())
+        self._reload()
+
+    # -------- manifest / snapshot --------
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.path, MANIFEST)
+
+    def _buffer_path(self) -> str:
+        return os.path.join(self.path, BUFFER)
+
+    def _reload(self):
+        path = self._manifest_path()
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            self._manifest = json.load(f)
+        self._manifest_mtime = os.path.getmtime(path)
+
+        names = self._manifest["segments"]
+        self._segments = {
+            name: self._segments.get(name) or _Segment.load(os.path.join(self.path, name)) for name in names
+        }
+        buffer = []
+        if os.path.exists(self._buffer_path()):
+            with open(self._buffer_path(), "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        buffer.append(_Segment.from_docs([(cid, Counter(c), n) for cid, c, n in json.loads(line)]))
+        self._snapshot = _Snapshot([self._segments[name] for name in names], buffer,
+                                   set(self._manifest["tombstones"]))
+
+    def _commit(self, disk_segments: List[_Segment], buffer: List[_Segment], shadow: List[np.ndarray]):
+        """Publish our own manifest change without re-reading it from disk."""
+        self._write_manifest()
+        self._manifest_mtime = os.path.getmtime(self._manifest_path())
+        self._segments = {segment.name: segment for segment in disk_segments}
+        self._snapshot = _Snapshot(disk_segments, buffer, set(self._manifest["tombstones"]), shadow)
+
+    def _maybe_reload(self):
+        """Pick up segments flushed by another process."""
+        path = self._manifest_path()
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return
+        if mtime != self._manifest_mtime:
+            with self._lock:
+                self._reload()
+
+    def _write_manifest(self):
+        tmp = self._manifest_path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f)
+        os.replace(tmp, self._manifest_path())
+
+    def __len__(self):
+        return self._snapshot.num_docs
+
+    # -------- writes --------
+
+    def add(self, ids: List[str], documents: List[str]):
+        """Index (or re-index) chunks; visible to queries after flush()."""
+        with self._lock:
+            for chunk_id, text in zip(ids, documents):
+                tokens = tokenize(text)
+                self._pending[chunk_id] = (Counter(tokens), len(tokens))
+                self._pending_deletes.discard(chunk_id)
+            if len(self._pending) >= self.segment_max_docs:
+                self.flush()
+
+    def delete(self, ids: Iterable[str]):
+        with self._lock:
+            for chunk_id in ids:
+                self._pending.pop(chunk_id, None)
+                self._pending_deletes.add(chunk_id)
+
+    def flush(self, force: bool = False):
+        """
+        Make pending additions and deletions durable and searchable. The
+        buffer becomes an on-disk segment once it is full, or with `force`.
+        """
+        with self._lock:
+            if not self._pending and not self._pending_deletes and not (force and self._snapshot.buffer):
+                return
+
+            # Another process may have flushed since we last looked
+            self._maybe_reload()
+            snapshot = self._snapshot
+            disk, buffer, shadow = list(snapshot.disk_segments), list(snapshot.buffer), list(snapshot.shadow)
+            manifest = self._manifest
+            tombstones = (set(manifest["tombstones"]) | self._pending_deletes) - set(self._pending)
+
+            if self._pending:
+                docs = [(chunk_id, counts, length) for chunk_id, (counts, length) in self._pending.items()]
+                segment = _Segment.from_docs(docs)
+                with open(self._buffer_path(), "a", encoding="utf-8") as f:
+                    f.write(json.dumps([[cid, counts, length] for cid, counts, length in docs]) + "\n")
+                shadow = _mask_ids(disk + buffer, shadow, segment.chunk_ids) + [np.ones(len(segment), dtype=bool)]
+                buffer.append(segment)
+
+            manifest["tombstones"] = sorted(tombstones)
+            self._pending, self._pending_deletes = {}, set()
+
+            if buffer and (force or sum(len(segment) for segment in buffer) >= self.buffer_max_docs):
+                live = _mask_ids(buffer, shadow[len(disk):], tombstones)
+                merged = _Segment.merged(buffer, live)
+                shadow = shadow[:len(disk)]
+                if len(merged):
+                    name = f"seg_{manifest['next_segment']:06d}"
+                    merged.save(os.path.join(self.path, name))
+                    manifest["segments"].append(name)
+                    manifest["next_segment"] += 1
+                    disk.append(_Segment.load(os.path.join(self.path, name)))
+                    shadow.append(np.ones(len(merged), dtype=bool))
+                buffer = []
+                self._commit(disk, buffer, shadow)
+                # Only once the segment is in the manifest
+                open(self._buffer_path(), "w").close()
+                self._merge_tiers()
+            else:
+                # The buffer log is already written; the manifest's mtime is what other processes watch
+                self._commit(disk, buffer, shadow)
+
+    def _tier(self, live_docs: int) -> int:
+        return int(math.log(max(live_docs, 1), self.merge_factor))
+
+    def _merge_tiers(self):
+        """Merge runs of `merge_factor` adjacent same-tier segments until none are left."""
+        while True:
+            snapshot = self._snapshot
+            tiers = [self._tier(int(mask.sum())) for mask in snapshot.live[:len(snapshot.disk_segments)]]
+            for start in range(len(tiers) - self.merge_factor + 1):
+                if len(set(tiers[start:start + self.merge_factor])) == 1:
+                    self._merge_run(start, start + self.merge_factor)
+                    break
+            else:
+                return
+
+    def _merge_run(self, start: int, end: int):
+        """
+        Rewrite on-disk segments [start, end) as one segment in their place,
+        dropping shadowed and deleted chunks.
+        """
+        snapshot = self._snapshot
+        merged = _Segment.merged(snapshot.disk_segments[start:end], snapshot.live[start:end])
+
+        # Merged docs are all live, and other segments are shadowed exactly as before
+        disk, shadow = list(snapshot.disk_segments), list(snapshot.shadow)
+        old = [segment.name for segment in disk[start:end]]
+        replacement, replacement_shadow = [], []
+        if len(merged):
+            name = f"seg_{self._manifest['next_segment']:06d}"
+            merged.save(os.path.join(self.path, name))
+            self._manifest["next_segment"] += 1
+            replacement = [_Segment.load(os.path.join(self.path, name))]
+            replacement_shadow = [np.ones(len(merged), dtype=bool)]
+        disk[start:end] = replacement
+        shadow[start:end] = replacement_shadow
+        self._manifest["segments"] = [segment.name for segment in disk]
+
+        # Tombstones only matter while some segment still holds the chunk
+        remaining = disk + snapshot.buffer
+        self._manifest["tombstones"] = [
+            cid for cid in self._manifest["tombstones"] if any(cid in seg.positions for seg in remaining)
+        ]
+        self._commit(disk, snapshot.buffer, shadow)
+
+        # Open snapshots keep their mappings; unlinking is safe
+        for old_name in old:
+            shutil.rmtree(os.path.join(self.path, old_name), ignore_errors=True)
+
+    def merge(self):
+        """Rewrite all on-disk segments as one, dropping shadowed and deleted chunks."""
+        with self._lock:
+            if len(self._snapshot.disk_segments) <= 1 and not self._manifest["tombstones"]:
+                return
+            self._merge_run(0, len(self._snapshot.disk_segments))
+
+    def rebuild(self, collection, page_size: int = 1000) -> int:
+        """Index every chunk already in `collection` (bootstrap for existing KBs)."""
+        with self._lock:
+            offset = 0
+            while True:
+                page = collection.get(include=["documents"], limit=page_size, offset=offset)
+                if not page["ids"]:
+                    break
+                self.add(page["ids"], page["documents"])
+                offset += len(page["ids"])
+            self.flush(force=True)
+            self.merge()
+            return offset
+
+    # -------- queries --------
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        return self.search_many([query], top_k)[0]
+
+    def search_many(self, queries: List[str], top_k: int = 10) -> List[List[Tuple[str, float]]]:
+        """BM25 top-k (chunk_id, score) per query, best first."""
+        self._maybe_reload()
+        snapshot = self._snapshot
+        return [self._search(snapshot, query, top_k) for query in queries]
+
+    def _search(self, snapshot: _Snapshot, query: str, top_k: int) -> List[Tuple[str, float]]:
+        if not snapshot.num_docs:
+            return []
+
+        scores: Dict[int, np.ndarray] = {}
+        for term in set(tokenize(query)):
+            matches, df = [], 0
+            for i, segment in enumerate(snapshot.segments):
+                entry = segment.vocab.get(term)
+                if entry is None:
+                    continue
+                offset, length = entry
+                docs = np.asarray(segment.doc_ids[offset:offset + length])
+                live = snapshot.live[i][docs]
+                docs = docs[live]
+                if docs.size:
+                    matches.append((i, docs, np.asarray(segment.tfs[offset:offset + length])[live].astype(np.float32)))
+                    df += docs.size
+            if not df:
+                continue
+
+            idf = math.log(1 + (snapshot.num_docs - df + 0.5) / (df + 0.5))
+            for i, docs, tfs in matches:
+                segment = snapshot.segments[i]
+                lengths = np.asarray(segment.doc_lengths)[docs]
+                norm = self.k1 * (1 - self.b + self.b * lengths / snapshot.avg_length)
+                if i not in scores:
+                    scores[i] = np.zeros(len(segment), dtype=np.float32)
+                np.add.at(scores[i], docs, idf * tfs * (self.k1 + 1) / (tfs + norm))
+
+        candidates = []
+        for i, segment_scores in scores.items():
+            nonzero = np.flatnonzero(segment_scores)
+            if nonzero.size > top_k:
+                nonzero = nonzero[np.argpartition(-segment_scores[nonzero], top_k - 1)[:top_k]]
+            candidates.extend((float(segment_scores[d]), snapshot.segments[i].chunk_ids[d]) for d in nonzero)
+
+        candidates.sort(reverse=True)
+        return [(chunk_id, score) for score, chunk_id in candidates[:top_k]]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_sparse_index() -> SparseIndex:
+    """Return the process-wide sparse index, loading it on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SparseIndex()
+    return _index
@@ -0,0 +1,408 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import requests
+
+from backend.core.telemetry import get_logger, span
+from backend.config.settings import (
+    CHROMA_DB_PATH,
+    SO_BACKEND,
+    SO_API_KEY,
+    SO_CACHE_TTL,
+    SO_STALE_TTL,
+    SO_MIN_QUOTA,
+    SO_TIMEOUT,
+    SO_FIXTURE_PATH,
+)
+
+SO_CACHE_PATH = os.path.join(os.path.dirname(CHROMA_DB_PATH), "stackoverflow_cache.sqlite3")
+API_URL = "https://api.stackexchange.com/2.3/search/advanced"
+DEFAULT_FILTER = "!9_bDDxJY5"  # Includes question body
+
+logger = get_logger(__name__)
+
+
+def search_params(query: str, pagesize: int = 5, filter: str = DEFAULT_FILTER) -> dict:
+    """/search/advanced parameters: the most upvoted StackOverflow questions matching `query`."""
+    return {
+        "order": "desc",
+        "sort": "votes",
+        "q": query,
+        "site": "stackoverflow",
+        "pagesize": pagesize,
+        "filter": filter,
+    }
+
+
+def request_key(params: dict) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _utc_day(timestamp: float) -> str:
+    # The API's daily quota resets at midnight UTC
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d")
+
+
+class StackExchangeError(Exception):
+    def __init__(self, message: str, backoff: Optional[float] = None):
+        super().__init__(message)
+        self.backoff = backoff
+
+
+class StackExchangeBackend:
+    """The live API over one pooled session; search() returns the decoded response wrapper."""
+
+    def __init__(self, api_key: str = SO_API_KEY, timeout: float = SO_TIMEOUT):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def search(self, params: dict) -> dict:
+        if self.api_key:
+            params = dict(params, key=self.api_key)
+        response = self.session.get(API_URL, params=params, timeout=self.timeout)
+        try:
+            data = response.json()
+        except ValueError:
+            response.raise_for_status()
+            raise
+        # Errors come back as a wrapper too, e.g. throttle_violation, sometimes with a backoff
+        if "error_id" in data:
+            raise StackExchangeError(
+                f"{data.get('error_name')}: {data.get('error_message')}", backoff=data.get("backoff")
+            )
+        response.raise_for_status()
+        return data
+
+    def close(self):
+        self.session.close()
+
+
+class FixtureBackend:
+    """
+    Recorded API responses in a JSON file, keyed by request_key().
+
+    Without `upstream` it replays them and never touches the network;
+    requests that were not recorded get an empty result. With `upstream`
+    (record mode) unrecorded requests go to it and their responses are
+    added to the file.
+    """
+
+    def __init__(self, path: str = SO_FIXTURE_PATH, upstream=None):
+        self.path = path
+        self.upstream = upstream
+        self._lock = threading.Lock()
+        self.responses = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.responses = json.load(f)
+
+    def search(self, params: dict) -> dict:
+        key = request_key(params)
+        with self._lock:
+            recorded = self.responses.get(key)
+        if recorded is not None:
+            return recorded["response"]
+        if self.upstream is None:
+            logger.debug("📼 No recorded StackOverflow response for %r", params.get("q"))
+            return {"items": [], "has_more": False}
+
+        data = self.upstream.search(params)
+        with self._lock:
+            self.responses[key] = {"params": params, "response": data}
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.responses, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        return data
+
+    def close(self):
+        if self.upstream is not None:
+            self.upstream.close()
+
+
+class StackOverflowCache:
+    """
+    Local SQLite store of StackOverflow search results, keyed by the full
+    request (query, filter, page size, sort), in front of a backend.
+
+    - younger than `ttl`: served from the store, no request
+    - up to `stale_ttl` older: served as is, and refreshed in the background
+      (one refresh per request in flight)
+    - older or missing: fetched before returning
+
+    Requests go out one at a time. After a response carrying `backoff` no
+    request is sent until it has passed, and once `quota_remaining` drops
+    below `min_quota` none are sent until the daily quota resets (both are
+    persisted across restarts). While blocked, a stored result of any age
+    is served, or an empty list if there is none.
+    """
+
+    def __init__(self, backend, path: str = SO_CACHE_PATH, ttl: float = SO_CACHE_TTL,
+                 stale_ttl: float = SO_STALE_TTL, min_quota: int = SO_MIN_QUOTA,
+                 max_backoff_wait: float = SO_TIMEOUT):
+        self.backend = backend
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.min_quota = min_quota
+        # Longest a caller waits out a backoff rather than taking stale or no results
+        self.max_backoff_wait = max_backoff_wait
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._request_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                filter TEXT,
+                params TEXT NOT NULL,
+                items TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS api_state (
+                name TEXT PRIMARY KEY,
+                value TEXT
+            );
+            """
+        )
+        self._conn.commit()
+        state = dict(self._conn.execute("SELECT name, value FROM api_state").fetchall())
+        self._backoff_until = float(state.get("backoff_until") or 0)
+        self._quota_remaining = int(state["quota_remaining"]) if state.get("quota_remaining") else None
+        self._quota_day = state.get("quota_day")
+
+        self._refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="so-refresh")
+        self._refreshing = set()
+        self._stats = {"fresh_hits": 0, "stale_hits": 0, "misses": 0, "api_calls": 0, "blocked": 0, "errors": 0}
+
+    # -------- store --------
+
+    def _load(self, keys: List[str]) -> Dict[str, dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, items, fetched_at FROM results WHERE key IN ({','.join('?' * len(keys))})", keys
+            ).fetchall()
+        return {key: {"items": json.loads(items), "fetched_at": fetched_at} for key, items, fetched_at in rows}
+
+    def _store(self, key: str, params: dict, items: list):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, query, filter, params, items, fetched_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, params["q"], params.get("filter"), json.dumps(params), json.dumps(items), time.time()),
+            )
+            self._conn.commit()
+
+    def _save_state(self):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO api_state (name, value) VALUES (?, ?)",
+                [
+                    ("backoff_until", str(self._backoff_until)),
+                    ("quota_remaining", None if self._quota_remaining is None else str(self._quota_remaining)),
+                    ("quota_day", self._quota_day),
+                ],
+            )
+            self._conn.commit()
+
+    # -------- API access --------
+
+    def _quota_exhausted(self) -> bool:
+        return (self._quota_remaining is not None and self._quota_remaining < self.min_quota
+                and self._quota_day == _utc_day(time.time()))
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._stats[name] += n
+
+    def _request(self, params: dict, wait: bool) -> Optional[list]:
+        """One backend call under the backoff/quota rules; None when blocked or failed."""
+        while True:
+            with self._request_lock:
+                if self._quota_exhausted():
+                    self._count("blocked")
+                    return None
+                delay = self._backoff_until - time.time()
+                if delay <= 0:
+                    return self._call(params)
+                if not wait and delay > self.max_backoff_wait:
+                    self._count("blocked")
+                    return None
+            # Sleep without the lock so blocked callers can still give up or serve stale results;
+            # the backoff may have moved meanwhile, so it is checked again afterwards
+            logger.debug("⏳ StackExchange backoff: waiting %.1fs", delay)
+            time.sleep(delay)
+
+    def _call(self, params: dict) -> Optional[list]:
+        """Send one request and record backoff/quota; the caller holds _request_lock."""
+        self._count("api_calls")
+        try:
+            with span("stackoverflow_fetch"):
+                data = self.backend.search(params)
+        except StackExchangeError as e:
+            self._count("errors")
+            if e.backoff:
+                self._backoff_until = time.time() + float(e.backoff)
+                self._save_state()
+            logger.warning("⚠️  StackOverflow API error: %s", e)
+            return None
+        except Exception as e:
+            self._count("errors")
+            logger.warning("⚠️  StackOverflow API error: %s", e)
+            return None
+
+        if data.get("backoff"):
+            self._backoff_until = time.time() + float(data["backoff"])
+        if data.get("quota_remaining") is not None:
+            self._quota_remaining = int(data["quota_remaining"])
+            self._quota_day = _utc_day(time.time())
+            if self._quota_remaining < self.min_quota:
+                logger.warning("⚠️  StackExchange quota nearly used up (%d left); serving cached results",
+                               self._quota_remaining)
+        if data.get("backoff") or data.get("quota_remaining") is not None:
+            self._save_state()
+        return data.get("items", [])
+
+    def _fetch(self, key: str, params: dict, wait: bool) -> Optional[list]:
+        items = self._request(params, wait=wait)
+        if items is not None:
+            self._store(key, params, items)
+        return items
+
+    def refresh_many(self, queries: List[str], pagesize: int = 5, filter: str = DEFAULT_FILTER) -> int:
+        """
+        Re-fetch `queries` one after another, waiting out any backoff and
+        stopping early if the quota runs low. Returns how many were refreshed.
+        """
+        refreshed = 0
+        for query in dict.fromkeys(queries):
+            if self._quota_exhausted():
+                break
+            params = search_params(query, pagesize, filter)
+            if self._fetch(request_key(params), params, wait=True) is not None:
+                refreshed += 1
+        return refreshed
+
+    def _refresh_in_background(self, pending: Dict[str, dict]):
+        with self._lock:
+            pending = {key: params for key, params in pending.items() if key not in self._refreshing}
+            self._refreshing.update(pending)
+        if not pending:
+            return
+
+        def refresh():
+            try:
+                for key, params in pending.items():
+                    self._fetch(key, params, wait=True)
+            finally:
+                with self._lock:
+                    self._refreshing.difference_update(pending)
+
+        self._refresher.submit(refresh)
+
+    # -------- lookups --------
+
+    def search_many(self, queries: List[str], pagesize: int = 5,
+                    filter: str = DEFAULT_FILTER) -> Dict[str, list]:
+        """Question items for each query, read from the store in one batch."""
+        params = {query: search_params(query, pagesize, filter) for query in dict.fromkeys(queries)}
+        keys = {query: request_key(p) for query, p in params.items()}
+        stored = self._load(list(keys.values())) if keys else {}
+        now = time.time()
+
+        results, stale, missing = {}, {}, []
+        for query, key in keys.items():
+            entry = stored.get(key)
+            age = now - entry["fetched_at"] if entry else None
+            if entry is not None and age < self.ttl:
+                results[query] = entry["items"]
+            elif entry is not None and age < self.ttl + self.stale_ttl:
+                results[query] = entry["items"]
+                stale[key] = params[query]
+            else:
+                missing.append(query)
+        with self._lock:
+            self._stats["fresh_hits"] += len(results) - len(stale)
+            self._stats["stale_hits"] += len(stale)
+            self._stats["misses"] += len(missing)
+
+        if stale:
+            self._refresh_in_background(stale)
+        for query in missing:
+            items = self._fetch(keys[query], params[query], wait=False)
+            if items is None:
+                # Blocked or failed: anything stored beats nothing
+                entry = stored.get(keys[query])
+                items = entry["items"] if entry else []
+            results[query] = items
+
+        logger.debug("🗂️  StackOverflow lookups: %d queries, %d stale, %d fetched",
+                     len(keys), len(stale), len(missing))
+        return {query: results[query] for query in keys}
+
+    def search(self, query: str, pagesize: int = 5, filter: str = DEFAULT_FILTER) -> list:
+        return self.search_many([query], pagesize, filter)[query]
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            stats = dict(self._stats)
+            refreshing = len(self._refreshing)
+        stats.update(
+            entries=entries,
+            refreshing=refreshing,
+            backend=type(self.backend).__name__,
+            quota_remaining=self._quota_remaining,
+            backoff_seconds=round(max(0.0, self._backoff_until - time.time()), 1),
+        )
+        return stats
+
+    def close(self):
+        self._refresher.shutdown(wait=True)
+        self.backend.close()
+        with self._lock:
+            self._conn.close()
+
+
+def make_backend(kind: str = SO_BACKEND):
+    if kind == "replay":
+        return FixtureBackend()
+    if kind == "record":
+        return FixtureBackend(upstream=StackExchangeBackend())
+    if kind == "api":
+        return StackExchangeBackend()
+    raise ValueError(f"Unknown SO_BACKEND: {kind} (expected api, record or replay)")
+
+
+_stackoverflow_cache = None
+_stackoverflow_cache_lock = threading.Lock()
+
+
+def get_stackoverflow_cache() -> StackOverflowCache:
+    """Return the process-wide StackOverflow cache (backend chosen by SO_BACKEND)."""
+    global _stackoverflow_cache
+    with _stackoverflow_cache_lock:
+        if _stackoverflow_cache is None:
+            _stackoverflow_cache = StackOverflowCache(make_backend())
+        return _stackoverflow_cache
+
+
+def close_stackoverflow_cache():
+    """Close the process-wide cache; the next get_stackoverflow_cache() reopens it."""
+    global _stackoverflow_cache
+    with _stackoverflow_cache_lock:
+        if _stackoverflow_cache is not None:
+            _stackoverflow_cache.close()
+            _stackoverflow_cache = None
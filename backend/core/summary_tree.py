@@ -0,0 +1,243 @@
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from backend.core.chunking import approx_token_count
+from backend.core.concurrency import bounded_map
+from backend.core.telemetry import get_logger
+from backend.config.settings import (
+    CHROMA_DB_PATH,
+    SUMMARY_BATCH_TOKENS,
+    SUMMARY_MAX_FANOUT,
+    SUMMARY_MAX_WORKERS,
+)
+
+SUMMARY_TREE_PATH = os.path.join(os.path.dirname(CHROMA_DB_PATH), "summary_tree.sqlite3")
+
+logger = get_logger(__name__)
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut `text` to about `max_tokens` approximate tokens, on a word boundary."""
+    if approx_token_count(text) <= max_tokens:
+        return text
+    words, used = [], 0
+    for word in text.split():
+        used += approx_token_count(word)
+        if used > max_tokens and words:
+            break
+        words.append(word)
+    return " ".join(words)
+
+
+def pack(items: List[tuple], budget: int, fanout: int) -> List[List[tuple]]:
+    """
+    Split (key, text, tokens) items, in order, into consecutive groups of at
+    most `fanout` items and `budget` tokens. Group sizes are balanced, so a
+    level never ends with a near-empty call.
+    """
+    if not items:
+        return []
+    total = sum(tokens for _, _, tokens in items)
+    n_groups = max(math.ceil(len(items) / fanout), math.ceil(total / budget))
+    size = max(1, math.ceil(len(items) / n_groups))
+
+    groups, group, used = [], [], 0
+    for item in items:
+        if group and (len(group) >= size or used + item[2] > budget):
+            groups.append(group)
+            group, used = [], 0
+        group.append(item)
+        used += item[2]
+    groups.append(group)
+    return groups
+
+
+class SummaryCheckpoint:
+    """
+    Finished tree nodes in a local SQLite file, keyed by the hash of their
+    inputs, so an interrupted run resumes where it stopped and unchanged
+    subtrees are never summarized twice.
+    """
+
+    def __init__(self, path: str = SUMMARY_TREE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS nodes (
+                key TEXT PRIMARY KEY,
+                level INTEGER NOT NULL,
+                summary TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, summary FROM nodes WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def put(self, key: str, level: int, summary: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO nodes (key, level, summary, created_at) VALUES (?, ?, ?, ?)",
+                (key, level, summary, time.time()),
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM nodes")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM nodes").fetchone()[0]
+        return {"path": self.path, "nodes": count}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class TreeSummarizer:
+    """
+    Hierarchical map-reduce summaries over whole documents.
+
+    Each document is a list of (key, text) leaves, e.g. its chunks keyed by
+    content hash. Leaves are packed into batches of about `batch_tokens`
+    and each batch is summarized with `leaf_prompt`; the summaries are then
+    packed and summarized with `reduce_prompt`, level by level, until one
+    remains. A call merges at most `max_fanout` inputs, so a document of N
+    leaf batches needs about N / (fanout - 1) calls over
+    ceil(log_fanout(N)) levels, and fewer when summaries are short enough
+    to fill a batch.
+
+    All documents of a summarize() call advance one level at a time through
+    one pool of `max_workers` threads, which bounds concurrent LLM calls
+    however many documents there are. Every node is checkpointed as soon as
+    it finishes, keyed by the model, prompt and child keys.
+    """
+
+    def __init__(self, llm, checkpoint: Optional[SummaryCheckpoint] = None,
+                 batch_tokens: int = SUMMARY_BATCH_TOKENS, max_fanout: int = SUMMARY_MAX_FANOUT,
+                 max_workers: int = SUMMARY_MAX_WORKERS):
+        self.llm = llm
+        self.checkpoint = checkpoint
+        self.batch_tokens = batch_tokens
+        self.max_fanout = max(2, max_fanout)
+        self.max_workers = max_workers
+        self.model = getattr(llm, "model", type(llm).__name__)
+        self.stats = {"llm_calls": 0, "reused_nodes": 0}
+
+    def _node_key(self, prompt: str, level: int, child_keys: List[str]) -> str:
+        blob = json.dumps([self.model, prompt, level, child_keys])
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def _items(self, leaves: List[Tuple[str, str]], max_tokens: int) -> List[tuple]:
+        items = []
+        for key, text in leaves:
+            text = truncate_tokens(text, max_tokens)
+            items.append((key, text, approx_token_count(text)))
+        return items
+
+    def summarize(self, documents: Dict[str, List[Tuple[str, str]]], leaf_prompt: str,
+                  reduce_prompt: str, on_done: Optional[Callable] = None) -> Dict[str, tuple]:
+        """
+        Summarize every document; returns {name: (summary, error)}.
+        `on_done(name, summary, error)` runs in the calling thread as each
+        document finishes. A failed call fails only its own document.
+        """
+        results = {}
+        # name -> items of the level being built; leaves may fill a batch on their own
+        levels = {}
+        for name, leaves in documents.items():
+            if leaves:
+                levels[name] = self._items(leaves, self.batch_tokens)
+            else:
+                results[name] = ("", None)
+                if on_done is not None:
+                    on_done(name, "", None)
+
+        level = 0
+        while levels:
+            prompt = leaf_prompt if level == 0 else reduce_prompt
+            nodes = []  # (name, key, text)
+            keys = {}  # name -> node keys of this level, in order
+            for name, items in levels.items():
+                for group in pack(items, self.batch_tokens, self.max_fanout):
+                    key = self._node_key(prompt, level, [k for k, _, _ in group])
+                    nodes.append((name, key, "\n\n".join(text for _, text, _ in group)))
+                    keys.setdefault(name, []).append(key)
+
+            done = self.checkpoint.get_many(key for _, key, _ in nodes) if self.checkpoint else {}
+            self.stats["reused_nodes"] += sum(1 for _, key, _ in nodes if key in done)
+            pending = [node for node in nodes if node[1] not in done]
+            logger.info("🌳 Summary tree level %d: %d documents, %d nodes (%d checkpointed)",
+                        level, len(levels), len(nodes), len(nodes) - len(pending))
+
+            failed = {}
+
+            def call(node):
+                name, key, text = node
+                if name in failed:
+                    return None, None
+                try:
+                    return self.llm(prompt + "\n" + text), None
+                except Exception as e:
+                    return None, e
+
+            def node_done(i, node, result):
+                name, key, _ = node
+                summary, error = result
+                if error is not None:
+                    if name not in failed:
+                        failed[name] = error
+                        logger.error("❌ Summary tree node failed for %s: %s", name, error)
+                elif summary is not None:
+                    self.stats["llm_calls"] += 1
+                    done[key] = summary
+                    if self.checkpoint is not None:
+                        self.checkpoint.put(key, level, summary)
+
+            bounded_map(call, pending, max_workers=self.max_workers, on_result=node_done)
+
+            next_levels = {}
+            for name in levels:
+                if name in failed:
+                    results[name] = (f"Error generating summary: {failed[name]}", failed[name])
+                    if on_done is not None:
+                        on_done(name, *results[name])
+                    continue
+                summaries = [(key, done[key]) for key in keys[name]]
+                if len(summaries) == 1:
+                    results[name] = (summaries[0][1], None)
+                    if on_done is not None:
+                        on_done(name, summaries[0][1], None)
+                else:
+                    # Halve the per-input cap so every reduce call merges at least two summaries
+                    next_levels[name] = self._items(summaries, self.batch_tokens // 2)
+            levels = next_levels
+            level += 1
+
+        return results
@@ -0,0 +1,200 @@
+import contextvars
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from backend.config.settings import LOG_LEVEL, LOG_SAMPLE_RATE, METRICS_ENABLED
+
+# Seconds; tuned for spans from sub-millisecond cache hits to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+# -------- logging --------
+
+class _SampleFilter(logging.Filter):
+    """Lets INFO and above through; keeps DEBUG records with probability `rate`."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+_logging_configured = False
+_logging_lock = threading.Lock()
+
+
+def _configure_logging():
+    global _logging_configured
+    with _logging_lock:
+        if _logging_configured:
+            return
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        handler.addFilter(_SampleFilter(LOG_SAMPLE_RATE))
+        logger = logging.getLogger("backend")
+        logger.setLevel(LOG_LEVEL)
+        logger.addHandler(handler)
+        logger.propagate = False
+        _logging_configured = True
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Logger under the "backend" hierarchy (pass __name__). Per-request detail
+    goes to debug(), which is free when LOG_LEVEL is above DEBUG and sampled
+    at LOG_SAMPLE_RATE otherwise.
+    """
+    if not _logging_configured:
+        _configure_logging()
+    return logging.getLogger(name)
+
+
+# -------- metrics --------
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels) + "}"
+
+
+class Histogram:
+    """Thread-safe cumulative histogram with fixed buckets, one series per label set."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            labels = tuple(zip(self.labelnames, key))
+            for bound, count in zip(self.buckets, values):
+                lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', repr(bound)),))} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {values[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {values[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {values[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        """Get or create the histogram `name`."""
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram(name, documentation, labelnames, buckets)
+            return self._histograms[name]
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            histograms = list(self._histograms.values())
+        return "\n".join(line for histogram in histograms for line in histogram.render()) + "\n"
+
+
+metrics = MetricsRegistry()
+
+SPAN_SECONDS = metrics.histogram(
+    "assistant_span_duration_seconds",
+    "Duration of instrumented hot-path operations.",
+    ("span",),
+)
+REQUEST_SECONDS = metrics.histogram(
+    "assistant_http_request_duration_seconds",
+    "HTTP request duration by route template.",
+    ("method", "route", "status"),
+)
+
+
+# -------- spans --------
+
+class RequestTimings:
+    """Per-request span totals (seconds), shared by the threads serving the request."""
+
+    def __init__(self):
+        self._totals: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            self._totals[name] = self._totals.get(name, 0.0) + seconds
+
+    def items(self) -> List[Tuple[str, float]]:
+        with self._lock:
+            return list(self._totals.items())
+
+    def server_timing(self, total: Optional[float] = None) -> str:
+        """Server-Timing header value, durations in milliseconds."""
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.items()]
+        if total is not None:
+            parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+# Context variables are copied into asyncio.to_thread / run_in_threadpool
+# workers, so spans recorded there land in the same RequestTimings
+_request_timings: contextvars.ContextVar = contextvars.ContextVar("request_timings", default=None)
+
+
+def start_request() -> Tuple[RequestTimings, contextvars.Token]:
+    timings = RequestTimings()
+    return timings, _request_timings.set(timings)
+
+
+def end_request(token: contextvars.Token):
+    _request_timings.reset(token)
+
+
+def record_span(name: str, seconds: float):
+    if METRICS_ENABLED:
+        SPAN_SECONDS.observe(seconds, span=name)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def span(name: str):
+    """
+    Time the enclosed block as span `name` ("embed", "vector_query",
+    "prompt_build", "llm", "json_parse", "file_write", ...): observed in
+    the span histogram and added to the current request's breakdown.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - start)
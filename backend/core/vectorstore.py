@@ -6,3 +6,25 @@ def get_chroma_client(persist_path: str):
         path=persist_path
     )
     return client
+
+
+def open_collection(client, name: str, embedding_function, create: bool = False):
+    """
+    Open collection `name` with our embedding function registered, so
+    `query_texts=` and documents added without embeddings use the same model
+    as ingestion.
+
+    Collections created before that were persisted with Chroma's "default"
+    embedding function, which Chroma refuses to swap out. Those are opened
+    as-is with that default; every write and query in this codebase passes
+    embeddings from our model explicitly, so the collection's own function
+    is never used for them.
+    """
+    try:
+        if create:
+            return client.get_or_create_collection(name=name, embedding_function=embedding_function)
+        return client.get_collection(name, embedding_function=embedding_function)
+    except ValueError as e:
+        if "Embedding function conflict" not in str(e):
+            raise
+        return client.get_collection(name)
@@ -1,19 +1,62 @@
-from fastapi import FastAPI, UploadFile, File, Form
-from pydantic import BaseModel
+from fastapi import FastAPI, UploadFile, File, Form, Depends, Request, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+import json
 import os
-from typing import List, Optional
-from PyPDF2 import PdfReader
+import shutil
+import time
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
-from backend.agents.ingestion_agent import IngestionAgent
 from backend.agents.summary_agent import SummaryAgent
 from backend.agents.faq_agent import FAQAgent
 from backend.agents.rag_agent import RAGAgent
-from backend.core.llm import get_llm
+from backend.core.jobs import JobManager
+from backend.core.kb_export import fetch_chunks, iter_chunks, parse_fields
+from backend.core.registry import ServiceRegistry, get_registry
+from backend.core.telemetry import REQUEST_SECONDS, end_request, metrics, span, start_request
+from backend.config.settings import WARMUP_ON_STARTUP, METRICS_ENABLED, TIMING_HEADER_ENABLED
 
 
-app = FastAPI(title="FastAPI Knowledge Assistant")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build clients, models and agents once and share them across requests
+    registry = get_registry()
+    await run_in_threadpool(registry.start)
+    if WARMUP_ON_STARTUP:
+        await run_in_threadpool(registry.warm_up)
+    app.state.registry = registry
+    yield
+    registry.close()
+
+
+UPLOAD_COPY_BUFFER = 1024 * 1024
+
+
+app = FastAPI(title="FastAPI Knowledge Assistant", lifespan=lifespan)
+
+
+def registry_dep(request: Request) -> ServiceRegistry:
+    return request.app.state.registry
+
+
+def summary_agent_dep(registry: ServiceRegistry = Depends(registry_dep)) -> SummaryAgent:
+    return registry.summary_agent
+
+
+def faq_agent_dep(registry: ServiceRegistry = Depends(registry_dep)) -> FAQAgent:
+    return registry.faq_agent
+
+
+def rag_agent_dep(registry: ServiceRegistry = Depends(registry_dep)) -> RAGAgent:
+    return registry.rag_agent
+
+
+def job_manager_dep(registry: ServiceRegistry = Depends(registry_dep)) -> JobManager:
+    return registry.job_manager
 
 # Allow CORS
 app.add_middleware(
@@ -24,6 +67,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+
+@app.middleware("http")
+async def request_telemetry(request: Request, call_next):
+    """
+    Per-route latency histogram, plus (TIMING_HEADER_ENABLED) a Server-Timing
+    header breaking the request down into embed / vector_query / llm / ...
+    spans. For streaming responses both cover the time to the first byte.
+    """
+    timings, token = start_request()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        end_request(token)
+        if METRICS_ENABLED:
+            # Route templates, not raw paths, keep the label set bounded
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe(elapsed, method=request.method, route=route, status=status)
+    if TIMING_HEADER_ENABLED:
+        response.headers["Server-Timing"] = timings.server_timing(total=elapsed)
+    return response
+
+
 # Serve static files from the 'data' directory
 app.mount("/data", StaticFiles(directory="backend/data"), name="data")
 
@@ -31,12 +101,21 @@ app.mount("/data", StaticFiles(directory="backend/data"), name="data")
 def health_check():
     return {"status": "ok", "message": "Backend is running"}
 
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Request and span latency histograms in Prometheus text format."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/ingest")
 def ingest_docs(
     urls: Optional[List[str]] = Form(None),
     pdf_files: Optional[List[UploadFile]] = None,
     html_files: Optional[List[UploadFile]] = None,
     raw_texts: Optional[List[str]] = Form(None),
+    jobs: JobManager = Depends(job_manager_dep),
 ):
     """
     Enhanced ingestion endpoint to handle multiple input types:
@@ -44,35 +123,95 @@ def ingest_docs(
     - PDF files: Extract and store text.
     - HTML files: Extract and store content.
     - Raw texts: Directly store provided text.
+
+    Ingestion runs as a background job; poll /jobs/{job_id} for progress.
     """
-    agent = IngestionAgent()
+    job_id = jobs.new_job_id()
+    upload_dir = jobs.upload_dir_for(job_id)
+
+    # Spool uploads to disk so the job can be resumed after a restart
+    files = []
+    for kind, uploads in (("pdf", pdf_files), ("html", html_files)):
+        for upload in uploads or []:
+            os.makedirs(upload_dir, exist_ok=True)
+            filename = os.path.basename(upload.filename or f"upload.{kind}")
+            path = os.path.join(upload_dir, f"{len(files):04d}_{filename}")
+            # Copied in fixed-size blocks; uploads are never held in memory whole
+            with span("file_write"), open(path, "wb") as out:
+                shutil.copyfileobj(upload.file, out, UPLOAD_COPY_BUFFER)
+            files.append({"path": path, "filename": filename, "kind": kind})
+
+    payload = {"urls": urls or [], "files": files, "raw_texts": raw_texts or []}
+    total = len(payload["urls"]) + len(files) + len(payload["raw_texts"])
+    job = jobs.submit("ingest", payload, total=total, job_id=job_id)
+
+    return {
+        "status": "accepted",
+        "message": "Ingestion job queued.",
+        "job_id": job["id"],
+        "job": _job_view(job),
+    }
+
+
+def _job_view(job: dict, include_result: bool = True) -> dict:
+    """Job row as returned by the API (the payload can be large, so it is left out)."""
+    view = {
+        "id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "total": job["total"],
+        "message": job["message"],
+        "error": job["error"],
+        "cancel_requested": job["cancel_requested"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+    if include_result:
+        view["result"] = job["result"]
+    return view
+
+
+@app.get("/jobs")
+def list_jobs(limit: int = 50, jobs: JobManager = Depends(job_manager_dep)):
+    return {"status": "success", "data": [_job_view(job, include_result=False) for job in jobs.store.list(limit)]}
 
-    if urls:
-        for url in urls:
-            agent.ingest_url(url)
 
-    if pdf_files:
-        for pdf in pdf_files:
-            pdf_reader = PdfReader(pdf.file)
-            text = "\n".join(page.extract_text() for page in pdf_reader.pages)
-            agent.ingest_text(text, source=pdf.filename)
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str, jobs: JobManager = Depends(job_manager_dep)):
+    job = jobs.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"status": "success", "data": _job_view(job)}
 
-    if html_files:
-        for html in html_files:
-            content = html.file.read().decode("utf-8")
-            agent.ingest_text(content, source=html.filename)
 
-    if raw_texts:
-        for text in raw_texts:
-            agent.ingest_text(text, source="raw_input")
+@app.get("/jobs/{job_id}/progress")
+def get_job_progress(job_id: str, jobs: JobManager = Depends(job_manager_dep)):
+    """Lightweight polling endpoint: status and counters only."""
+    job = jobs.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "status": "success",
+        "data": {key: job[key] for key in ("id", "status", "progress", "total", "message")},
+    }
+
 
-    return {"status": "success", "message": "Data ingested successfully."}
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str, jobs: JobManager = Depends(job_manager_dep)):
+    """Request cancellation; a running job stops before its next document."""
+    job = jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"status": "success", "data": _job_view(job, include_result=False)}
 
 @app.post("/summarize")
-def summarize_docs():
-    agent = SummaryAgent()
-    agent.run()
-    return {"status": "success", "message": "Summaries generated"}
+def summarize_docs(
+    incremental: bool = Query(False, description="Only re-summarize sections whose content changed"),
+    agent: SummaryAgent = Depends(summary_agent_dep),
+):
+    result = agent.run(incremental=incremental)
+    return {"status": "success", "message": "Summaries generated", "data": result}
 
 
 class FAQRequest(BaseModel):
@@ -81,8 +220,7 @@ class FAQRequest(BaseModel):
 
 
 @app.post("/faqs")
-def generate_faqs(payload: FAQRequest = None):
-    agent = FAQAgent()
+def generate_faqs(payload: FAQRequest = None, agent: FAQAgent = Depends(faq_agent_dep)):
     custom_topics = payload.custom_topics if payload else None
     strict_mode = payload.strict_mode if payload else True
     result = agent.run(custom_topics=custom_topics, strict_mode=strict_mode)
@@ -93,19 +231,24 @@ def generate_faqs(payload: FAQRequest = None):
     }
 
 
+RetrievalMode = Literal["dense", "sparse", "hybrid"]
+
+
 class AskRequest(BaseModel):
     question: str
+    # None uses the server default (RETRIEVAL_MODE)
+    retrieval_mode: Optional[RetrievalMode] = None
 
 @app.post("/ask")
-def ask_question(payload: AskRequest):
+async def ask_question(payload: AskRequest, agent: RAGAgent = Depends(rag_agent_dep)):
     try:
-        agent = RAGAgent()
-        result = agent.run(payload.question)
+        result = await agent.arun(payload.question, mode=payload.retrieval_mode)
         return {
             "status": "success",
             "question": result["question"],
             "answer": result["answer"],
-            "sources": result.get("sources", [])
+            "sources": result.get("sources", []),
+            "cached": result.get("cached")
         }
     except Exception as e:
         return {
@@ -115,15 +258,99 @@ def ask_question(payload: AskRequest):
         }
 
 
+class BatchAskRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1, max_length=100)
+    retrieval_mode: Optional[RetrievalMode] = None
+
+
+@app.post("/ask/batch")
+async def ask_questions_batch(payload: BatchAskRequest, agent: RAGAgent = Depends(rag_agent_dep)):
+    """
+    Answer many questions at once: one batched embedding + Chroma query,
+    then concurrent generation.
+    """
+    try:
+        results = await agent.arun_many(payload.questions, mode=payload.retrieval_mode)
+        return {
+            "status": "success",
+            "results": [
+                {
+                    "question": result["question"],
+                    "answer": result["answer"],
+                    "sources": result.get("sources", []),
+                    "cached": result.get("cached")
+                }
+                for result in results
+            ]
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "questions": payload.questions,
+            "error": str(e)
+        }
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/ask/stream")
+async def ask_question_stream(payload: AskRequest, agent: RAGAgent = Depends(rag_agent_dep)):
+    """
+    Server-sent events version of /ask. Emits a `sources` event as soon as
+    retrieval finishes, then one `token` event per generated token, then
+    `done` (or `error`).
+    """
+    async def events():
+        try:
+            async for kind, value in agent.astream(payload.question, mode=payload.retrieval_mode):
+                if kind == "sources":
+                    yield _sse("sources", {"question": payload.question, "sources": value})
+                else:
+                    yield _sse("token", {"token": value})
+            yield _sse("done", {"status": "success"})
+        except Exception as e:
+            yield _sse("error", {"status": "error", "error": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/cache/stats")
+def answer_cache_stats(registry: ServiceRegistry = Depends(registry_dep)):
+    """Hit/miss counters for the /ask answer cache."""
+    if registry.answer_cache is None:
+        return {"status": "disabled"}
+    return {"status": "success", "data": registry.answer_cache.stats()}
+
+
+@app.get("/rerank/stats")
+def rerank_stats(registry: ServiceRegistry = Depends(registry_dep)):
+    """Cross-encoder rerank timings and score-cache counters."""
+    if registry.reranker is None:
+        return {"status": "disabled"}
+    return {"status": "success", "data": registry.reranker.stats()}
+
+
+@app.get("/stackoverflow/stats")
+def stackoverflow_stats(registry: ServiceRegistry = Depends(registry_dep)):
+    """StackOverflow cache hits, API calls and the last seen quota/backoff."""
+    return {"status": "success", "data": registry.stackoverflow.stats()}
+
+
 @app.post("/test-llm")
-def test_llm_connection():
+def test_llm_connection(registry: ServiceRegistry = Depends(registry_dep)):
     """
     Test endpoint to verify OpenRouter API connection with minimal token usage.
     Returns the LLM response to a simple prompt.
     """
     try:
-        # Get the LLM instance
-        llm = get_llm()
+        # Get the shared LLM instance
+        llm = registry.llm
 
         # Simple test prompt (uses minimal tokens)
         test_prompt = "Say 'API Working' if you can read this."
@@ -135,7 +362,7 @@ def test_llm_connection():
             "status": "success",
             "message": "OpenRouter API is working correctly",
             "llm_response": response,
-            "api_key_prefix": os.getenv("OPENROUTER_API_KEY", "")[:20] + "...",
+            "api_key_set": bool(os.getenv("OPENROUTER_API_KEY")),
             "model": os.getenv("LLM_MODEL", "arcee-ai/trinity-mini:free"),
             "using_mock": os.getenv("USE_MOCK_LLM", "false").lower() == "true"
         }
@@ -144,36 +371,40 @@ def test_llm_connection():
             "status": "error",
             "message": str(e),
             "error_type": type(e).__name__,
-            "api_key_prefix": os.getenv("OPENROUTER_API_KEY", "")[:20] + "...",
+            "api_key_set": bool(os.getenv("OPENROUTER_API_KEY")),
             "model": os.getenv("LLM_MODEL", "arcee-ai/trinity-mini:free"),
             "using_mock": os.getenv("USE_MOCK_LLM", "false").lower() == "true"
         }
 
 @app.get("/get-data")
-def get_data():
+def get_data(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="comma-separated: documents, metadatas, embeddings"),
+    registry: ServiceRegistry = Depends(registry_dep),
+):
     """
-    Endpoint to retrieve all data stored in the ChromaDB collection.
-    Returns the documents, metadata, and other details.
+    One page of the ChromaDB collection, in chunk id order. Pass the
+    returned `next_cursor` as `cursor` for the next page (null on the last
+    one). Use /export to stream everything.
     """
     try:
-        # Initialize the ChromaDB client and collection
-        from backend.core.vectorstore import get_chroma_client
-        from backend.config.settings import CHROMA_DB_PATH
-
-        client = get_chroma_client(CHROMA_DB_PATH)
-        collection = client.get_or_create_collection(name="fastapi_docs")
+        include = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        # Fetch all data from the collection
-        data = collection.get()
+    try:
+        ids = registry.catalog.chunk_ids_page(after=cursor, limit=limit)
+        data = fetch_chunks(registry.collection, ids, include)
 
         return {
             "status": "success",
             "message": "Data retrieved successfully.",
-            "data": {
-                "documents": data["documents"],
-                "metadatas": data["metadatas"],
-                "ids": data["ids"],
-            },
+            "data": dict(
+                data,
+                next_cursor=ids[-1] if len(ids) == limit else None,
+                total=registry.catalog.summary()["chunks"],
+            ),
         }
     except Exception as e:
         return {
@@ -181,27 +412,42 @@ def get_data():
             "message": str(e),
         }
 
+
+@app.get("/export")
+def export_data(
+    fields: Optional[str] = Query(None, description="comma-separated: documents, metadatas, embeddings"),
+    registry: ServiceRegistry = Depends(registry_dep),
+):
+    """
+    Stream the whole collection as NDJSON, one {"id", "document",
+    "metadata", ...} object per line, reading it in bounded pages.
+    """
+    try:
+        include = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    lines = (
+        json.dumps(row, ensure_ascii=False) + "\n"
+        for row in iter_chunks(registry.collection, registry.catalog, include)
+    )
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
 @app.get("/inspect-kb")
-def inspect_knowledge_base():
+def inspect_knowledge_base(agent: FAQAgent = Depends(faq_agent_dep)):
     """
     Inspect the knowledge base and return available sources/topics
     """
     try:
-        agent = FAQAgent()
         kb_info = agent.inspect_knowledge_base()
-        
+
         return {
             "status": "success",
             "data": {
                 "total_documents": kb_info["total_documents"],
+                "total_bytes": kb_info["total_bytes"],
                 "sources": kb_info["sources"],
-                "sample_content": [
-                    {
-                        "source": meta.get("source", "Unknown"),
-                        "preview": doc[:200]
-                    }
-                    for doc, meta in zip(kb_info["documents"][:5], kb_info["metadatas"][:5])
-                ]
+                "sample_content": kb_info["samples"],
             }
         }
     except Exception as e:
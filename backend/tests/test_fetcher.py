@@ -0,0 +1,205 @@
+"""
+PageFetcher against a local HTTP stand-in for the docs site: conditional
+GETs, retries, per-host concurrency limits and the on-disk HTML cache.
+
+Run from the repository root:
+    python -m pytest backend/tests
+"""
+import asyncio
+import threading
+import time
+from collections import Counter, defaultdict
+
+import pytest
+import uvicorn
+from fastapi import FastAPI, Request, Response
+
+from backend.core.fetcher import PageFetcher
+
+LAST_MODIFIED = "Wed, 01 Jan 2025 00:00:00 GMT"
+
+
+def docs_stub() -> FastAPI:
+    """
+    Docs site stand-in. It records every request in `app.state` and serves:
+      /page/{name}   versioned HTML with ETag/Last-Modified, 304 on a match
+      /flaky/{name}  503 (Retry-After: 0) for the first `app.state.failures` requests
+      /broken        always 500
+      /slow/{name}   answers after 0.1s, tracking concurrent requests per Host
+    """
+    app = FastAPI()
+    app.state.hits = Counter()
+    app.state.headers = defaultdict(list)
+    app.state.versions = defaultdict(lambda: 1)
+    app.state.failures = 2
+    app.state.in_flight = Counter()
+    app.state.peak = Counter()
+
+    def record(request: Request):
+        path = request.url.path
+        app.state.hits[path] += 1
+        app.state.headers[path].append(dict(request.headers))
+
+    @app.get("/page/{name}")
+    async def page(name: str, request: Request):
+        record(request)
+        etag = f'"{name}-v{app.state.versions[name]}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        body = f"<html><body><h1>{name}</h1><p>version {app.state.versions[name]}</p></body></html>"
+        return Response(body, media_type="text/html", headers={"ETag": etag, "Last-Modified": LAST_MODIFIED})
+
+    @app.get("/flaky/{name}")
+    async def flaky(name: str, request: Request):
+        record(request)
+        if app.state.hits[request.url.path] <= app.state.failures:
+            return Response("busy", status_code=503, headers={"Retry-After": "0"})
+        return Response(f"<html><body>{name}</body></html>", media_type="text/html")
+
+    @app.get("/broken")
+    async def broken(request: Request):
+        record(request)
+        return Response("boom", status_code=500)
+
+    @app.get("/slow/{name}")
+    async def slow(name: str, request: Request):
+        record(request)
+        host = request.headers["host"].split(":")[0]
+        app.state.in_flight[host] += 1
+        app.state.peak[host] = max(app.state.peak[host], app.state.in_flight[host])
+        try:
+            await asyncio.sleep(0.1)
+        finally:
+            app.state.in_flight[host] -= 1
+        return Response(f"<html><body>{name}</body></html>", media_type="text/html")
+
+    return app
+
+
+class LocalServer:
+    """Serves an ASGI app with uvicorn on a free local port, in a background thread."""
+
+    def __init__(self, app):
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", lifespan="off"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("Local test server failed to start")
+            time.sleep(0.01)
+        return self
+
+    @property
+    def port(self) -> int:
+        return self.server.servers[0].sockets[0].getsockname()[1]
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+@pytest.fixture(scope="module")
+def server():
+    app = docs_stub()
+    with LocalServer(app) as server:
+        server.app = app
+        yield server
+
+
+@pytest.fixture
+def make_fetcher(tmp_path):
+    fetchers = []
+
+    def make(**kwargs):
+        kwargs.setdefault("cache_dir", str(tmp_path / "html_cache"))
+        kwargs.setdefault("backoff", 0.01)
+        kwargs.setdefault("timeout", 5)
+        fetcher = PageFetcher(**kwargs)
+        fetchers.append(fetcher)
+        return fetcher
+
+    yield make
+    for fetcher in fetchers:
+        fetcher.close()
+
+
+def test_conditional_get_returns_cached_body_on_304(server, make_fetcher):
+    url = f"{server.url}/page/intro"
+    first = make_fetcher().fetch(url)
+    assert first["status"] == 200 and not first["not_modified"] and not first["from_cache"]
+    assert first["etag"] == '"intro-v1"' and first["last_modified"] == LAST_MODIFIED
+
+    # A new fetcher (e.g. after a restart) sends the cached validators on its own
+    second = make_fetcher().fetch(url)
+    assert second["status"] == 304 and second["not_modified"] and second["from_cache"]
+    assert second["html"] == first["html"]
+    sent = server.app.state.headers["/page/intro"][-1]
+    assert sent["if-none-match"] == '"intro-v1"' and sent["if-modified-since"] == LAST_MODIFIED
+
+
+def test_changed_page_is_refetched_and_recached(server, make_fetcher):
+    url = f"{server.url}/page/changed"
+    fetcher = make_fetcher()
+    fetcher.fetch(url)
+    server.app.state.versions["changed"] = 2
+
+    result = fetcher.fetch(url)
+    assert result["status"] == 200 and "version 2" in result["html"]
+    assert result["etag"] == '"changed-v2"'
+    assert fetcher.fetch(url)["not_modified"]
+
+
+def test_304_without_cache_has_no_body(server, make_fetcher):
+    url = f"{server.url}/page/uncached"
+    result = make_fetcher(cache_dir=None).fetch(url, etag='"uncached-v1"')
+    assert result["not_modified"] and result["html"] is None and not result["from_cache"]
+
+
+def test_fetch_many_uses_caller_validators(server, make_fetcher):
+    urls = [f"{server.url}/page/many{i}" for i in range(4)]
+    validators = {urls[0]: ('"many0-v1"', None), urls[1]: ('"stale-etag"', None)}
+    results = {r["url"]: r for r in make_fetcher(cache_dir=None).fetch_many(urls, validators)}
+
+    assert set(results) == set(urls)
+    assert results[urls[0]]["not_modified"]
+    assert [results[url]["status"] for url in urls[1:]] == [200, 200, 200]
+
+
+def test_retries_5xx_then_succeeds(server, make_fetcher):
+    result = make_fetcher(retries=3).fetch(f"{server.url}/flaky/a")
+    assert result["status"] == 200
+    assert server.app.state.hits["/flaky/a"] == 3
+
+
+def test_gives_up_after_retries_and_fetch_many_reports_the_error(server, make_fetcher):
+    fetcher = make_fetcher(retries=2)
+    good = f"{server.url}/page/ok"
+    results = {r["url"]: r for r in fetcher.fetch_many([f"{server.url}/broken", good])}
+
+    assert server.app.state.hits["/broken"] == 3
+    assert "500" in str(results[f"{server.url}/broken"]["error"])
+    assert results[good]["status"] == 200
+
+
+def test_connection_errors_are_retried_then_reported(make_fetcher):
+    with LocalServer(FastAPI()) as closed:
+        url = f"{closed.url}/page/gone"
+    results = list(make_fetcher(retries=1).fetch_many([url]))
+    assert results[0]["url"] == url and "error" in results[0]
+
+
+def test_per_host_limit(server, make_fetcher):
+    fetcher = make_fetcher(max_workers=16, per_host_limit=2, cache_dir=None)
+    # Two host names for the same server get separate limits
+    urls = [f"{host}/slow/{i}" for host in (server.url, f"http://localhost:{server.port}") for i in range(6)]
+    results = list(fetcher.fetch_many(urls))
+
+    assert all(r["status"] == 200 for r in results)
+    assert server.app.state.peak["127.0.0.1"] == 2
+    assert server.app.state.peak["localhost"] == 2
@@ -0,0 +1,161 @@
+"""
+StackOverflowCache in replay mode, against the recorded fixture in
+backend/data: no network is used.
+
+Run from the repository root:
+    python -m pytest backend/tests
+"""
+import json
+import shutil
+
+import pytest
+
+from backend.core.stackoverflow import FixtureBackend, StackOverflowCache, request_key, search_params
+from backend.config.settings import SO_FIXTURE_PATH
+
+TOPICS = ["Getting Started with FastAPI", "Request Validation and Models", "Database Integration"]
+QUERIES = [f"FastAPI {topic}" for topic in TOPICS]
+
+
+class CountingBackend(FixtureBackend):
+    """Replay backend that counts the requests that reach it."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.calls = []
+
+    def search(self, params: dict) -> dict:
+        self.calls.append(params["q"])
+        return super().search(params)
+
+
+def record(path, query: str, response: dict):
+    """Add a recorded response for `query` to the fixture at `path`."""
+    with open(path, "r", encoding="utf-8") as f:
+        responses = json.load(f)
+    params = search_params(query)
+    responses[request_key(params)] = {"params": params, "response": response}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(responses, f)
+
+
+def age(cache: StackOverflowCache, seconds: float):
+    """Make every stored result `seconds` older."""
+    with cache._lock:
+        cache._conn.execute("UPDATE results SET fetched_at = fetched_at - ?", (seconds,))
+        cache._conn.commit()
+
+
+def wait_for_refresh(cache: StackOverflowCache):
+    # The refresher has one worker, so this runs after any queued refresh
+    cache._refresher.submit(lambda: None).result()
+
+
+@pytest.fixture
+def fixture_path(tmp_path):
+    path = tmp_path / "stackoverflow_fixtures.json"
+    shutil.copy(SO_FIXTURE_PATH, path)
+    return str(path)
+
+
+@pytest.fixture
+def make_cache(tmp_path, fixture_path):
+    caches = []
+
+    def make(**kwargs):
+        backend = CountingBackend(fixture_path)
+        cache = StackOverflowCache(backend, path=str(tmp_path / "cache.sqlite3"), ttl=100, stale_ttl=1000,
+                                   max_backoff_wait=0.1, **kwargs)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+def test_fixture_covers_default_faq_topics():
+    backend = FixtureBackend(SO_FIXTURE_PATH)
+    for query in QUERIES + ["FastAPI Authentication", "FastAPI Request Validation"]:
+        items = backend.search(search_params(query))["items"]
+        assert len(items) == 5
+        assert all(item["title"] and item["link"] for item in items)
+
+
+def test_fresh_results_are_served_from_the_store(make_cache):
+    cache = make_cache()
+    first = cache.search_many(QUERIES)
+    assert all(len(first[query]) == 5 for query in QUERIES)
+    assert len(cache.backend.calls) == 3
+
+    assert cache.search_many(QUERIES) == first
+    assert len(cache.backend.calls) == 3
+    stats = cache.stats()
+    assert stats["misses"] == 3 and stats["fresh_hits"] == 3 and stats["api_calls"] == 3
+
+
+def test_stale_results_are_served_then_refreshed(make_cache):
+    cache = make_cache()
+    query = QUERIES[0]
+    expected = cache.search(query)
+    age(cache, 500)  # past ttl, within stale_ttl
+
+    assert cache.search(query) == expected
+    wait_for_refresh(cache)
+    assert cache.backend.calls == [query, query]
+    assert cache.stats()["stale_hits"] == 1
+
+    # The refresh stored a new copy, so the next lookup is fresh again
+    assert cache.search(query) == expected
+    assert len(cache.backend.calls) == 2
+
+
+def test_expired_results_are_fetched_before_returning(make_cache):
+    cache = make_cache()
+    query = QUERIES[1]
+    cache.search(query)
+    age(cache, 5000)  # past ttl + stale_ttl
+
+    assert len(cache.search(query)) == 5
+    assert cache.backend.calls == [query, query]
+    assert cache.stats()["misses"] == 2
+
+
+def test_unrecorded_queries_replay_as_empty(make_cache):
+    cache = make_cache()
+    assert cache.search("FastAPI something never recorded") == []
+
+
+def test_backoff_blocks_requests_and_survives_restart(make_cache, fixture_path):
+    record(fixture_path, "FastAPI throttled", {"items": [{"title": "t", "link": "l"}], "backoff": 60,
+                                               "quota_remaining": 5000})
+    cache = make_cache()
+    assert cache.search("FastAPI throttled") == [{"title": "t", "link": "l"}]
+
+    # Inside the backoff a miss is not sent and comes back empty...
+    assert cache.search(QUERIES[0]) == []
+    assert cache.backend.calls == ["FastAPI throttled"]
+    stats = cache.stats()
+    assert stats["blocked"] == 1 and stats["backoff_seconds"] > 50
+
+    # ...and an expired entry is served rather than refetched
+    age(cache, 5000)
+    assert cache.search("FastAPI throttled") == [{"title": "t", "link": "l"}]
+    assert len(cache.backend.calls) == 1
+
+    cache.close()
+    reopened = make_cache()
+    assert reopened.search(QUERIES[1]) == []
+    assert reopened.backend.calls == []
+    assert reopened.stats()["backoff_seconds"] > 50
+
+
+def test_low_quota_stops_requests(make_cache, fixture_path):
+    record(fixture_path, "FastAPI quota", {"items": [{"title": "q", "link": "l"}], "quota_remaining": 3})
+    cache = make_cache(min_quota=10)
+    assert cache.search("FastAPI quota") == [{"title": "q", "link": "l"}]
+
+    assert cache.search_many(QUERIES) == {query: [] for query in QUERIES}
+    assert cache.backend.calls == ["FastAPI quota"]
+    stats = cache.stats()
+    assert stats["quota_remaining"] == 3 and stats["blocked"] == 3
@@ -789,7 +789,7 @@ function App() {
                   <div className="result-display">
                     <h2>Knowledge Base Contents</h2>
                     <p className="kb-stats">
-                      {kbData?.data?.documents?.length || 0} documents found
+                      {kbData?.data?.total ?? kbData?.data?.documents?.length ?? 0} documents found
                     </p>
                     <div className="kb-data">
                       {renderKnowledgeBase(kbData)}